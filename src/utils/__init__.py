@@ -3,7 +3,7 @@ OldNews FiscalAI - Utilities Package
 """
 
 from .model_manager import ModelManager, get_model_manager
-from .xml_parser import NFeXMLParser, parse_nfe_xml
+from .xml_parser import NFeXMLParser, parse_nfe_xml, parse_nfe_xml_batch
 from .tabelas_fiscais import GerenciadorTabelasFiscais, get_tabelas_fiscais_manager
 
 __all__ = [
@@ -11,6 +11,7 @@ __all__ = [
     "get_model_manager",
     "NFeXMLParser",
     "parse_nfe_xml",
+    "parse_nfe_xml_batch",
     "GerenciadorTabelasFiscais",
     "get_tabelas_fiscais_manager",
 ]
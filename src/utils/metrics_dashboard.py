@@ -13,7 +13,7 @@ import json
 import time
 from pathlib import Path
 
-from .validation_dataset import ValidationDataset
+from .validation_dataset import ValidationDataset, iter_jsonl
 
 
 class MetricsDashboard:
@@ -30,8 +30,7 @@ class MetricsDashboard:
     def load_metrics_history(self):
         """Carrega histórico de métricas"""
         try:
-            with open(self.validation_dataset.performance_metrics_file, 'r', encoding='utf-8') as f:
-                self.metrics_history = json.load(f)
+            self.metrics_history = list(iter_jsonl(self.validation_dataset.performance_metrics_file))
         except FileNotFoundError:
             self.metrics_history = []
     
@@ -70,7 +69,8 @@ class MetricsDashboard:
     def _save_metrics_history(self):
         """Salva histórico de métricas"""
         with open(self.validation_dataset.performance_metrics_file, 'w', encoding='utf-8') as f:
-            json.dump(self.metrics_history, f, indent=2, ensure_ascii=False)
+            for metric_point in self.metrics_history:
+                f.write(json.dumps(metric_point, ensure_ascii=False) + '\n')
     
     def render_dashboard(self):
         """Renderiza o dashboard completo"""
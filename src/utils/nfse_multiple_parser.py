@@ -6,7 +6,7 @@ Processa TODAS as NFS-e do arquivo, não apenas a primeira
 
 import xmltodict
 import lxml.etree as ET
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List
 from datetime import datetime
 from pathlib import Path
 import logging
@@ -46,10 +46,82 @@ class NFeSEMultipleParser:
         if not xml_path.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {xml_path}")
         
-        with open(xml_path, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
+        return list(self.iter_parse_file(str(xml_path)))
+    
+    def iter_parse_file(self, xml_path: str) -> Iterator[NFe]:
+        """
+        Faz parsing incremental de um arquivo XML de NFS-e, nota a nota
+        
+        Cada CompNfse é convertido e descartado da árvore assim que lido, de
+        modo que a memória usada não cresce com o número de notas do arquivo.
+        Como em parse_string, só são lidos os CompNfse de
+        ConsultarNfseResposta/ListaNfse.
+        
+        Args:
+            xml_path: Caminho para o arquivo XML da NFS-e
+        
+        Yields:
+            Objetos NFe, na ordem do arquivo
+        
+        Raises:
+            ValueError: Se XML for inválido ou não tiver nenhuma NFS-e válida
+        """
+        found = 0
+        count = 0
+        try:
+            context = ET.iterparse(
+                str(xml_path),
+                events=('end',),
+                tag='{*}CompNfse',
+                resolve_entities=False,
+                no_network=True
+            )
+            for _, elem in context:
+                # Mesma estrutura do parse_string: ConsultarNfseResposta -> ListaNfse -> CompNfse
+                root = elem.getroottree().getroot()
+                if ET.QName(root).localname != 'ConsultarNfseResposta':
+                    raise ValueError("Estrutura XML inválida: ConsultarNfseResposta não encontrada")
+                parent = elem.getparent()
+                if ET.QName(parent).localname != 'ListaNfse' or parent.getparent() is not root:
+                    continue
+                
+                i = found
+                found += 1
+                
+                # Mesmo tratamento de espaços do parse_string, apenas neste trecho
+                fragment = ' '.join(ET.tostring(elem, encoding='unicode', with_tail=False).split())
+                
+                # Liberar o elemento e os irmãos já processados
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+                
+                try:
+                    comp_item = xmltodict.parse(
+                        fragment,
+                        process_namespaces=False,
+                        disable_entities=True,
+                        process_comments=False,
+                        strip_whitespace=True
+                    )['CompNfse']
+                    nfe = self._build_nfe(comp_item['Nfse']['InfNfse'], i)
+                except Exception as e:
+                    logger.warning(f"Erro ao processar NFS-e {i+1}: {str(e)}")
+                    continue
+                
+                count += 1
+                yield nfe
+            
+            if not found:
+                if ET.QName(context.root).localname != 'ConsultarNfseResposta':
+                    raise ValueError("Estrutura XML inválida: ConsultarNfseResposta não encontrada")
+                raise ValueError("Estrutura XML inválida: ListaNfse não encontrada")
+        
+        except Exception as e:
+            raise ValueError(f"Erro ao fazer parsing do XML NFS-e: {str(e)}")
         
-        return self.parse_string(xml_content)
+        if not count:
+            raise ValueError("Erro ao fazer parsing do XML NFS-e: Nenhuma NFS-e válida encontrada no arquivo")
     
     def parse_string(self, xml_content: str) -> List[NFe]:
         """
@@ -92,17 +164,7 @@ class NFeSEMultipleParser:
                     nfes = []
                     for i, comp_item in enumerate(comp_nfse):
                         try:
-                            nfse_root = comp_item['Nfse']['InfNfse']
-                            
-                            # Extrair dados
-                            nfe_data = self._extract_nfse_data(nfse_root, i)
-                            
-                            # Criar objeto NFe
-                            nfe = NFe(**nfe_data)
-                            nfe.status = StatusProcessamento.CONCLUIDO
-                            nfe.data_processamento = datetime.now()
-                            
-                            nfes.append(nfe)
+                            nfes.append(self._build_nfe(comp_item['Nfse']['InfNfse'], i))
                             
                         except Exception as e:
                             logger.warning(f"Erro ao processar NFS-e {i+1}: {str(e)}")
@@ -120,6 +182,27 @@ class NFeSEMultipleParser:
         except Exception as e:
             raise ValueError(f"Erro ao fazer parsing do XML NFS-e: {str(e)}")
     
+    def _build_nfe(self, nfse_root: Dict[str, Any], index: int) -> NFe:
+        """
+        Cria o objeto NFe de uma InfNfse
+        
+        Args:
+            nfse_root: Dict com dados da raiz InfNfse
+            index: Índice da NFS-e no arquivo (para chave única)
+        
+        Returns:
+            Objeto NFe com status concluído
+        """
+        # Extrair dados
+        nfe_data = self._extract_nfse_data(nfse_root, index)
+        
+        # Criar objeto NFe
+        nfe = NFe(**nfe_data)
+        nfe.status = StatusProcessamento.CONCLUIDO
+        nfe.data_processamento = datetime.now()
+        
+        return nfe
+    
     def _extract_nfse_data(self, nfse_root: Dict[str, Any], index: int = 0) -> Dict[str, Any]:
         """
         Extrai dados estruturados do dict XML NFS-e
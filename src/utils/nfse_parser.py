@@ -279,21 +279,48 @@ class NFeSEXMLParser:
         """
         try:
             tree = ET.parse(xml_path)
-            root = tree.getroot()
+            return self._validate_root(tree.getroot())
             
-            # Verificar elementos obrigatórios para NFS-e
-            required_elements = ['ConsultarNfseResposta', 'ListaNfse']
-            
-            for elem in required_elements:
-                if root.find(f'.//{elem}') is None:
-                    return False, f"Elemento obrigatório não encontrado: {elem}"
-            
-            return True, None
+        except ET.XMLSyntaxError as e:
+            return False, f"Erro de sintaxe XML: {str(e)}"
+        except Exception as e:
+            return False, f"Erro ao validar XML: {str(e)}"
+    
+    def validate_string(self, xml_content: str) -> tuple[bool, Optional[str]]:
+        """
+        Valida estrutura básica de conteúdo XML de NFS-e já em memória
+        
+        Args:
+            xml_content: Conteúdo XML como string
+        
+        Returns:
+            Tuple (is_valid, error_message)
+        """
+        try:
+            return self._validate_root(ET.fromstring(xml_content.encode('utf-8')))
             
         except ET.XMLSyntaxError as e:
             return False, f"Erro de sintaxe XML: {str(e)}"
         except Exception as e:
             return False, f"Erro ao validar XML: {str(e)}"
+    
+    def _validate_root(self, root) -> tuple[bool, Optional[str]]:
+        """
+        Verifica os elementos obrigatórios para NFS-e
+        
+        Args:
+            root: Elemento raiz do XML
+        
+        Returns:
+            Tuple (is_valid, error_message)
+        """
+        required_elements = ['ConsultarNfseResposta', 'ListaNfse']
+        
+        for elem in required_elements:
+            if root.find(f'.//{elem}') is None:
+                return False, f"Elemento obrigatório não encontrado: {elem}"
+        
+        return True, None
 
 
 # Função de conveniência
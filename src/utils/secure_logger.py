@@ -3,18 +3,47 @@ FiscalAI MVP - Logger Seguro e Estruturado
 Sistema de logging seguro para produção e desenvolvimento
 """
 
+import atexit
 import logging
+import logging.handlers
 import json
 import os
+import queue
 import sys
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional, Union
+from functools import cache, cached_property
+from typing import Dict, Any, List, Optional, Union
 from pathlib import Path
 import hashlib
 import re
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Classe de valor dos padrões sensíveis (ex.: [^"\'\s]+), reescrita para JSON
+_VALUE_CLASS_RE = re.compile(r"\[\^\"\\'\\s([^\]]*)\]\+")
+
+# Listener ativo de cada logger (por nome), compartilhado entre instâncias de SecureLogger
+_QUEUE_LISTENERS: Dict[str, logging.handlers.QueueListener] = {}
+_LISTENERS_LOCK = threading.Lock()
+
+def _stop_listener(listener: Optional[logging.handlers.QueueListener]) -> None:
+    """Para o listener (esvaziando a fila) e fecha seus handlers"""
+    if listener is None:
+        return
+    atexit.unregister(listener.stop)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
 class LogLevel(Enum):
     """Níveis de log"""
     DEBUG = "DEBUG"
@@ -52,6 +81,10 @@ class LogEntry:
     cpu_usage_percent: Optional[float] = None
     extra_data: Optional[Dict[str, Any]] = None
     sanitized: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna os campos da entrada sem a cópia profunda de asdict()"""
+        return self.__dict__
 
 class SecureLogger:
     """
@@ -67,12 +100,22 @@ class SecureLogger:
     - Segurança em produção
     """
     
+    # Mapeamento do nível textual para o nível numérico do logging
+    _LEVEL_INT = {
+        "DEBUG": logging.DEBUG,
+        "INFO": logging.INFO,
+        "WARNING": logging.WARNING,
+        "ERROR": logging.ERROR,
+        "CRITICAL": logging.CRITICAL,
+    }
+    
     def __init__(self, 
                  name: str = "fiscalai",
                  log_dir: str = "logs",
                  max_file_size: int = 10 * 1024 * 1024,  # 10MB
                  backup_count: int = 5,
-                 production_mode: bool = False):
+                 production_mode: bool = False,
+                 enable_resource_metrics: bool = True):
         """
         Inicializa o logger seguro
         
@@ -82,24 +125,28 @@ class SecureLogger:
             max_file_size: Tamanho máximo do arquivo de log
             backup_count: Número de backups a manter
             production_mode: Modo de produção (logs mais restritivos)
+            enable_resource_metrics: Coleta memória/CPU (psutil) nos logs de performance
         """
         self.name = name
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
         self.max_file_size = max_file_size
         self.backup_count = backup_count
         self.production_mode = production_mode
+        self.enable_resource_metrics = enable_resource_metrics
         
         # Configurar logger
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
         
-        # Remover handlers existentes
-        for handler in self.logger.handlers[:]:
-            self.logger.removeHandler(handler)
+        # Remover handlers existentes, parando o listener de uma instância anterior
+        with _LISTENERS_LOCK:
+            _stop_listener(_QUEUE_LISTENERS.pop(name, None))
+            for handler in self.logger.handlers[:]:
+                self.logger.removeHandler(handler)
         
-        # Configurar handlers
-        self._setup_handlers()
+        # Handlers são configurados no primeiro log emitido (cold start barato)
+        self._handlers_ready = False
+        self._handlers_lock = threading.Lock()
         
         # Padrões de dados sensíveis para sanitização
         self.sensitive_patterns = [
@@ -121,7 +168,16 @@ class SecureLogger:
         ]
     
     def _setup_handlers(self):
-        """Configura handlers de log"""
+        """
+        Configura handlers de log
+        
+        Os handlers de arquivo/console rodam em uma thread de background
+        (QueueListener); o logger recebe apenas um QueueHandler, de modo que
+        quem loga paga somente o enfileiramento, sem I/O de arquivo.
+        """
+        self.log_dir.mkdir(exist_ok=True)
+        handlers = []
+        
         # Handler para arquivo principal
         main_log_file = self.log_dir / f"{self.name}.log"
         main_handler = logging.handlers.RotatingFileHandler(
@@ -132,7 +188,7 @@ class SecureLogger:
         )
         main_handler.setLevel(logging.DEBUG)
         main_handler.setFormatter(self._create_formatter())
-        self.logger.addHandler(main_handler)
+        handlers.append(main_handler)
         
         # Handler para erros
         error_log_file = self.log_dir / f"{self.name}_error.log"
@@ -144,7 +200,7 @@ class SecureLogger:
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(self._create_formatter())
-        self.logger.addHandler(error_handler)
+        handlers.append(error_handler)
         
         # Handler para segurança
         security_log_file = self.log_dir / f"{self.name}_security.log"
@@ -156,14 +212,30 @@ class SecureLogger:
         )
         security_handler.setLevel(logging.INFO)
         security_handler.setFormatter(self._create_formatter())
-        self.logger.addHandler(security_handler)
+        handlers.append(security_handler)
         
         # Handler para console (apenas em desenvolvimento)
         if not self.production_mode:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setLevel(logging.INFO)
             console_handler.setFormatter(self._create_console_formatter())
-            self.logger.addHandler(console_handler)
+            handlers.append(console_handler)
+        
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        
+        # Um único listener e QueueHandler por logger, mesmo com várias instâncias
+        with _LISTENERS_LOCK:
+            _stop_listener(_QUEUE_LISTENERS.pop(self.name, None))
+            for handler in self.logger.handlers[:]:
+                self.logger.removeHandler(handler)
+            self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            listener.start()
+            atexit.register(listener.stop)
+            _QUEUE_LISTENERS[self.name] = listener
+        self._queue_listener = listener
     
     def _create_formatter(self) -> logging.Formatter:
         """Cria formatter para arquivos"""
@@ -179,36 +251,62 @@ class SecureLogger:
             datefmt='%H:%M:%S'
         )
     
-    def _sanitize_data(self, data: Any) -> Any:
+    @cached_property
+    def _redaction_regex(self) -> re.Pattern:
+        """
+        Regex única aplicada sobre o JSON final do log
+        
+        Combina, em uma alternância, as chaves sensíveis (``"senha": ...``)
+        e os padrões sensíveis adaptados ao texto escapado de strings JSON.
+        """
+        string_body = r'(?:[^"\\]|\\.)*'
+        fields = '|'.join(re.escape(field) for field in self.sensitive_fields)
+        alternatives = [
+            rf'(?P<field>"{string_body}?(?:{fields}){string_body}"\s*:\s*)'
+            rf'(?P<value>"{string_body}"|[^,}}\]\s\[{{]+|(?=[\[{{]))'
+        ]
+        for index, pattern in enumerate(self.sensitive_patterns):
+            # Dentro de uma string JSON as aspas duplas aparecem escapadas (\")
+            pattern = pattern.replace('(?i)', '')
+            pattern = pattern.replace('["\\\']?', '(?:\\\\"|\')?')
+            # Quebras de linha e tabulações do separador aparecem escapadas (\n, \t, \r)
+            pattern = pattern.replace('\\s*', '(?:\\s|\\\\[ntr])*')
+            pattern = _VALUE_CLASS_RE.sub(
+                lambda m: '(?:[^"\'\\s\\\\' + m.group(1) + ']|\\\\\\\\)+', pattern
+            )
+            alternatives.append(f'(?P<pattern{index}>{pattern})')
+        return re.compile('|'.join(alternatives), re.IGNORECASE)
+    
+    def _redact_json(self, text: str) -> str:
         """
-        Sanitiza dados sensíveis
+        Remove dados sensíveis do JSON serializado em uma única passada
         
         Args:
-            data: Dados para sanitizar
+            text: Entrada de log já serializada em JSON
             
         Returns:
-            Dados sanitizados
+            JSON com os valores sensíveis substituídos por [REDACTED]
         """
-        if isinstance(data, str):
-            # Sanitizar padrões de dados sensíveis
-            for pattern in self.sensitive_patterns:
-                data = re.sub(pattern, r'\1: [REDACTED]', data, flags=re.IGNORECASE)
-            return data
-        
-        elif isinstance(data, dict):
-            sanitized = {}
-            for key, value in data.items():
-                if any(sensitive in key.lower() for sensitive in self.sensitive_fields):
-                    sanitized[key] = "[REDACTED]"
-                else:
-                    sanitized[key] = self._sanitize_data(value)
-            return sanitized
-        
-        elif isinstance(data, list):
-            return [self._sanitize_data(item) for item in data]
-        
-        else:
-            return data
+        regex = self._redaction_regex
+        parts = []
+        position = 0
+        match = regex.search(text)
+        while match is not None:
+            parts.append(text[position:match.start()])
+            end = match.end()
+            if match.group('field') is not None:
+                parts.append(match.group('field'))
+                parts.append('"[REDACTED]"')
+                if not match.group('value'):
+                    # Valor é objeto/lista: o decoder (em C) localiza o fim
+                    _, end = _JSON_DECODER.raw_decode(text, end)
+            else:
+                keyword_group = regex.groupindex[match.lastgroup] + 1
+                parts.append(f"{match.group(keyword_group)}: [REDACTED]")
+            position = end
+            match = regex.search(text, position)
+        parts.append(text[position:])
+        return ''.join(parts)
     
     def _create_log_entry(self, 
                          level: LogLevel,
@@ -218,7 +316,8 @@ class SecureLogger:
                          user_id: Optional[str] = None,
                          session_id: Optional[str] = None,
                          request_id: Optional[str] = None,
-                         duration_ms: Optional[float] = None) -> LogEntry:
+                         duration_ms: Optional[float] = None,
+                         include_resource_metrics: bool = False) -> LogEntry:
         """
         Cria entrada de log estruturada
         
@@ -231,6 +330,7 @@ class SecureLogger:
             session_id: ID da sessão
             request_id: ID da requisição
             duration_ms: Duração em milissegundos
+            include_resource_metrics: Inclui uso de memória/CPU (psutil)
             
         Returns:
             Entrada de log estruturada
@@ -241,11 +341,13 @@ class SecureLogger:
         function = frame.f_code.co_name
         line_number = frame.f_lineno
         
-        # Sanitizar dados extras
-        sanitized_extra = None
-        if extra_data:
-            sanitized_extra = self._sanitize_data(extra_data)
+        memory_usage_mb = None
+        cpu_usage_percent = None
+        if include_resource_metrics and self.enable_resource_metrics:
+            memory_usage_mb = self._get_memory_usage()
+            cpu_usage_percent = self._get_cpu_usage()
         
+        # Dados extras são sanitizados na serialização (_redact_json)
         return LogEntry(
             timestamp=datetime.now().isoformat(),
             level=level.value,
@@ -258,9 +360,9 @@ class SecureLogger:
             session_id=session_id,
             request_id=request_id,
             duration_ms=duration_ms,
-            memory_usage_mb=self._get_memory_usage(),
-            cpu_usage_percent=self._get_cpu_usage(),
-            extra_data=sanitized_extra,
+            memory_usage_mb=memory_usage_mb,
+            cpu_usage_percent=cpu_usage_percent,
+            extra_data=extra_data or None,
             sanitized=True
         )
     
@@ -283,21 +385,22 @@ class SecureLogger:
     
     def _log_structured(self, log_entry: LogEntry):
         """Registra log estruturado"""
-        # Converter para JSON
-        log_data = asdict(log_entry)
-        log_json = json.dumps(log_data, ensure_ascii=False, indent=None)
+        if not self._handlers_ready:
+            with self._handlers_lock:
+                if not self._handlers_ready:
+                    self._setup_handlers()
+                    self._handlers_ready = True
+        
+        # Converter para JSON e sanitizar em uma única passada
+        log_data = log_entry.to_dict()
+        if ORJSON_AVAILABLE:
+            log_json = orjson.dumps(log_data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        else:
+            log_json = json.dumps(log_data, ensure_ascii=False, indent=None)
+        log_json = self._redact_json(log_json)
         
         # Log baseado no nível
-        if log_entry.level == "DEBUG":
-            self.logger.debug(log_json)
-        elif log_entry.level == "INFO":
-            self.logger.info(log_json)
-        elif log_entry.level == "WARNING":
-            self.logger.warning(log_json)
-        elif log_entry.level == "ERROR":
-            self.logger.error(log_json)
-        elif log_entry.level == "CRITICAL":
-            self.logger.critical(log_json)
+        self.logger.log(self._LEVEL_INT[log_entry.level], log_json)
     
     def debug(self, message: str, **kwargs):
         """Log de debug"""
@@ -337,6 +440,7 @@ class SecureLogger:
             LogCategory.PERFORMANCE, 
             message, 
             duration_ms=duration_ms,
+            include_resource_metrics=True,
             **kwargs
         )
         self._log_structured(log_entry)
@@ -465,24 +569,17 @@ class PerformanceLogger:
         )
 
 
-# Instâncias globais
-_secure_logger_instance: Optional[SecureLogger] = None
-_performance_logger_instance: Optional[PerformanceLogger] = None
-
+# Instâncias globais (functools.cache garante uma única instância por processo)
+@cache
 def get_secure_logger() -> SecureLogger:
     """Retorna instância global do logger seguro"""
-    global _secure_logger_instance
-    if _secure_logger_instance is None:
-        production_mode = os.getenv('FISCALAI_PRODUCTION', 'false').lower() == 'true'
-        _secure_logger_instance = SecureLogger(production_mode=production_mode)
-    return _secure_logger_instance
+    production_mode = os.getenv('FISCALAI_PRODUCTION', 'false').lower() == 'true'
+    return SecureLogger(production_mode=production_mode)
 
+@cache
 def get_performance_logger() -> PerformanceLogger:
     """Retorna instância global do logger de performance"""
-    global _performance_logger_instance
-    if _performance_logger_instance is None:
-        _performance_logger_instance = PerformanceLogger(get_secure_logger())
-    return _performance_logger_instance
+    return PerformanceLogger(get_secure_logger())
 
 # Funções de conveniência
 def log_debug(message: str, **kwargs):
@@ -5,17 +5,207 @@ Suporta NF-e, NFS-e, CPF, CNPJ com detecção automática
 """
 
 import re
-import hashlib
-from typing import Dict, Any, Optional, Tuple, Union
-from pathlib import Path
+import concurrent.futures
+from typing import Dict, Any, Iterable, Iterator, List, Optional
 import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 
 from .universal_xml_parser import UniversalXMLParser
-from ..models import NFe, ItemNFe, StatusProcessamento
+from ..models import NFe
 
 logger = logging.getLogger(__name__)
 
+# Tabela de str.translate que remove os caracteres não numéricos (Latin-1)
+_NON_DIGIT_TABLE = str.maketrans('', '', ''.join(chr(c) for c in range(256) if not chr(c).isdigit()))
+
+# Despacho por tamanho/tipo de documento (CPF x CNPJ)
+_LEN_TO_TYPE = {11: 'cpf', 14: 'cnpj'}
+_VALID_LEN = {'cpf': 11, 'cnpj': 14}
+_FORMATTERS = {
+    'cpf': lambda d: f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}",
+    'cnpj': lambda d: f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}",
+}
+
+
+@lru_cache(maxsize=4096)
+def _only_digits(document: str) -> str:
+    """Remove caracteres não numéricos de um CPF/CNPJ"""
+    clean_doc = document.translate(_NON_DIGIT_TABLE)
+    if clean_doc.isdecimal():
+        return clean_doc
+    # Caracteres fora do Latin-1 (raro): recorre à regex
+    return re.sub(r'[^\d]', '', clean_doc)
+
+
+@lru_cache(maxsize=4096)
+def _identify_document_type(clean_doc: str) -> str:
+    """
+    Identifica se o documento é CPF ou CNPJ
+    
+    Args:
+        clean_doc: Número do documento, apenas dígitos (ver _only_digits)
+    
+    Returns:
+        'cpf' ou 'cnpj'
+    """
+    length = len(clean_doc)
+    # Tamanhos fora do padrão: identificar pelo contexto (< 14 dígitos → CPF)
+    return _LEN_TO_TYPE.get(length) or ('cpf' if length < 14 else 'cnpj')
+
+
+@lru_cache(maxsize=4096)
+def _format_document(clean_doc: str, doc_type: str) -> str:
+    """
+    Formata documento (CPF ou CNPJ)
+    
+    Args:
+        clean_doc: Número do documento, apenas dígitos (ver _only_digits)
+        doc_type: Tipo do documento
+    
+    Returns:
+        Documento formatado
+    """
+    if len(clean_doc) != _VALID_LEN.get(doc_type):
+        return clean_doc
+    return _FORMATTERS[doc_type](clean_doc)
+
+
+@lru_cache(maxsize=4096)
+def _validate_document_format(clean_doc: str, doc_type: str) -> bool:
+    """
+    Valida formato do documento
+    
+    Args:
+        clean_doc: Número do documento, apenas dígitos (ver _only_digits)
+        doc_type: Tipo do documento
+    
+    Returns:
+        True se formato válido
+    """
+    return len(clean_doc) == _VALID_LEN.get(doc_type) and clean_doc.isdigit()
+
+
+# Último datetime.now() e o instante monotônico (ns) em que foi obtido
+_NOW_CACHE: List[Any] = [0, None]
+
+
+def _cached_now() -> datetime:
+    """datetime.now() reaproveitado entre documentos processados no mesmo milissegundo"""
+    now_ns = time.monotonic_ns()
+    if _NOW_CACHE[1] is None or now_ns - _NOW_CACHE[0] >= 1_000_000:
+        _NOW_CACHE[0] = now_ns
+        _NOW_CACHE[1] = datetime.now()
+    return _NOW_CACHE[1]
+
+
+@dataclass(slots=True)
+class ProcessedItem:
+    """Item normalizado pelo parser inteligente"""
+    numero_item: int
+    descricao: str
+    ncm_declarado: str
+    ncm_predito: Optional[str]
+    cfop: str
+    quantidade: float
+    valor_unitario: float
+    valor_total: float
+    unidade: str
+    codigo_produto: Optional[str]
+    ean: Optional[str]
+    ncm_confianca: Optional[float]
+    item_type: str
+    is_service: bool
+    is_merchandise: bool
+
+
+@dataclass(slots=True, frozen=True)
+class Participants:
+    """Tipos de documento dos participantes e natureza da operação"""
+    emitente_type: str
+    destinatario_type: str
+    is_b2b: bool
+    is_b2c: bool
+
+
+@dataclass(slots=True, frozen=True)
+class FinancialSummary:
+    """Resumo financeiro do documento"""
+    total_value: float
+    tax_percentage: float
+    item_count: int
+
+
+@dataclass(slots=True, frozen=True)
+class QualityIndicators:
+    """Scores de qualidade, conformidade e risco (0-100)"""
+    data_quality_score: int
+    compliance_score: int
+    risk_score: int
+
+
+@dataclass(slots=True, frozen=True)
+class ProcessingFlags:
+    """Sinalizadores derivados dos scores"""
+    requires_attention: bool
+    high_quality: bool
+    compliant: bool
+
+
+@dataclass(slots=True, frozen=True)
+class SmartMetadata:
+    """Metadados inteligentes do documento processado"""
+    description: str
+    emitente_name: str
+    destinatario_name: str
+    fiscal_category: str
+    transaction_type: str
+    participants: Participants
+    financial_summary: FinancialSummary
+    quality_indicators: QualityIndicators
+    processing_flags: ProcessingFlags
+    
+    @property
+    def document_summary(self) -> str:
+        """Resumo textual, montado apenas quando acessado"""
+        return f"{self.description} - {self.emitente_name} → {self.destinatario_name}"
+    
+    def __str__(self) -> str:
+        return self.document_summary
+
+
+@dataclass(slots=True, frozen=True)
+class ProcessingInfo:
+    """Informações sobre o processamento"""
+    timestamp: datetime
+    parser_version: str = '2.0.0'
+    smart_features: bool = True
+
+
+# Instância imutável compartilhada enquanto o timestamp não muda
+_INFO_CACHE: List[Optional[ProcessingInfo]] = [None]
+
+
+def _processing_info() -> ProcessingInfo:
+    """ProcessingInfo do instante atual, reaproveitado entre documentos do mesmo milissegundo"""
+    now = _cached_now()
+    info = _INFO_CACHE[0]
+    if info is None or info.timestamp is not now:
+        info = _INFO_CACHE[0] = ProcessingInfo(timestamp=now)
+    return info
+
+
+@dataclass(slots=True, frozen=True)
+class ProcessingResult:
+    """Resultado de SmartFiscalParser.parse_document"""
+    nfe: NFe
+    document_type: str
+    document_description: str
+    metadata: SmartMetadata
+    processing_info: ProcessingInfo
+
 
 class SmartFiscalParser:
     """
@@ -23,24 +213,19 @@ class SmartFiscalParser:
     e normaliza os dados para processamento unificado
     """
     
+    # Mapeamento de tipos de documento
+    document_types = {
+        'nfe': 'Nota Fiscal Eletrônica',
+        'nfse': 'Nota Fiscal de Serviços Eletrônica',
+        'cte': 'Conhecimento de Transporte Eletrônico',
+        'mdfe': 'Manifesto Eletrônico de Documentos Fiscais'
+    }
+    
     def __init__(self):
         """Inicializa o parser inteligente"""
         self.universal_parser = UniversalXMLParser()
-        
-        # Padrões de identificação
-        self.cpf_pattern = re.compile(r'^\d{11}$')
-        self.cnpj_pattern = re.compile(r'^\d{14}$')
-        self.cpf_cnpj_pattern = re.compile(r'^\d{11,14}$')
-        
-        # Mapeamento de tipos de documento
-        self.document_types = {
-            'nfe': 'Nota Fiscal Eletrônica',
-            'nfse': 'Nota Fiscal de Serviços Eletrônica',
-            'cte': 'Conhecimento de Transporte Eletrônico',
-            'mdfe': 'Manifesto Eletrônico de Documentos Fiscais'
-        }
     
-    def parse_document(self, xml_path: str) -> Dict[str, Any]:
+    def parse_document(self, xml_path: str) -> ProcessingResult:
         """
         Processa documento fiscal com identificação inteligente
         
@@ -48,10 +233,10 @@ class SmartFiscalParser:
             xml_path: Caminho para o arquivo XML
         
         Returns:
-            Dict com dados processados e metadados
+            ProcessingResult com dados processados e metadados
         """
         try:
-            logger.info(f"Iniciando processamento inteligente: {xml_path}")
+            logger.info("Iniciando processamento inteligente: %s", xml_path)
             
             # 1. Detectar e fazer parsing do documento
             nfe, doc_type, doc_description = self.universal_parser.parse_file(xml_path)
@@ -65,22 +250,18 @@ class SmartFiscalParser:
             # 4. Gerar metadados inteligentes
             metadata = self._generate_smart_metadata(validated_data, doc_type)
             
-            logger.info(f"Processamento concluído: {doc_type} - {metadata['document_summary']}")
+            logger.info("Processamento concluído: %s - %s", doc_type, metadata)
             
-            return {
-                'nfe': validated_data['nfe'],
-                'document_type': doc_type,
-                'document_description': doc_description,
-                'metadata': metadata,
-                'processing_info': {
-                    'timestamp': datetime.now(),
-                    'parser_version': '2.0.0',
-                    'smart_features': True
-                }
-            }
+            return ProcessingResult(
+                nfe=validated_data['nfe'],
+                document_type=doc_type,
+                document_description=doc_description,
+                metadata=metadata,
+                processing_info=_processing_info()
+            )
             
         except Exception as e:
-            logger.error(f"Erro no processamento inteligente: {e}")
+            logger.error("Erro no processamento inteligente: %s", e)
             raise ValueError(f"Erro no processamento do documento: {str(e)}")
     
     def _process_document_data(self, nfe: NFe, doc_type: str, doc_description: str) -> Dict[str, Any]:
@@ -95,8 +276,19 @@ class SmartFiscalParser:
         Returns:
             Dict com dados processados
         """
+        if not nfe.itens:
+            return self._empty_document_data(nfe, doc_type, doc_description)
+        
+        # NCM iniciado em '00' indica serviço (calculado uma vez por item)
+        ncm_is_service = [item.ncm_declarado.startswith('00') for item in nfe.itens]
+        
+        # Médias por item, compartilhadas pelo tipo fiscal e pelas métricas
+        n = len(nfe.itens)
+        avg = nfe.valor_total / n if n else 0
+        avg_prod = nfe.valor_produtos / n if n else 0
+        
         # Identificar tipo de documento fiscal
-        fiscal_type = self._identify_fiscal_type(nfe, doc_type)
+        fiscal_type = self._identify_fiscal_type(nfe, doc_type, ncm_is_service, n, avg)
         
         # Normalizar dados do emitente
         emitente_data = self._normalize_emitente_data(nfe)
@@ -105,10 +297,10 @@ class SmartFiscalParser:
         destinatario_data = self._normalize_destinatario_data(nfe)
         
         # Processar itens
-        itens_data = self._process_items(nfe.itens, doc_type)
+        itens_data = self._process_items(nfe.itens, doc_type, ncm_is_service)
         
         # Calcular métricas fiscais
-        fiscal_metrics = self._calculate_fiscal_metrics(nfe, doc_type)
+        fiscal_metrics = self._calculate_fiscal_metrics(nfe, doc_type, n, avg, avg_prod)
         
         return {
             'nfe': nfe,
@@ -121,40 +313,77 @@ class SmartFiscalParser:
             'document_description': doc_description
         }
     
-    def _identify_fiscal_type(self, nfe: NFe, doc_type: str) -> Dict[str, Any]:
+    def _empty_document_data(self, nfe: NFe, doc_type: str, doc_description: str) -> Dict[str, Any]:
+        """
+        Dados processados de documento sem itens (ex.: NFS-e sem discriminação, cancelamentos)
+        
+        Args:
+            nfe: Objeto NFe parseado
+            doc_type: Tipo do documento
+            doc_description: Descrição do documento
+        
+        Returns:
+            Dict com dados processados e métricas de itens zeradas
+        """
+        return {
+            'nfe': nfe,
+            'fiscal_type': self._identify_fiscal_type(nfe, doc_type, [], 0, 0),
+            'emitente': self._normalize_emitente_data(nfe),
+            'destinatario': self._normalize_destinatario_data(nfe),
+            'itens': {
+                'items': [],
+                'total_items': 0,
+                'total_value': 0,
+                'average_value': 0,
+                'has_services': False,
+                'has_merchandise': False,
+                'all_values_positive': True
+            },
+            'metrics': self._calculate_fiscal_metrics(nfe, doc_type, 0, 0, 0),
+            'document_type': doc_type,
+            'document_description': doc_description
+        }
+    
+    def _identify_fiscal_type(self, nfe: NFe, doc_type: str, ncm_is_service: List[bool],
+                              n: int, avg: float) -> Dict[str, Any]:
         """
         Identifica o tipo fiscal do documento
         
         Args:
             nfe: Objeto NFe
             doc_type: Tipo do documento
+            ncm_is_service: Por item, se o NCM declarado indica serviço
+            n: Quantidade de itens
+            avg: Valor total médio por item
         
         Returns:
             Dict com informações do tipo fiscal
         """
+        total = nfe.valor_total
+        
         fiscal_type = {
             'category': doc_type,
             'description': self.document_types.get(doc_type, 'Documento fiscal'),
             'is_service': doc_type == 'nfse',
             'is_merchandise': doc_type == 'nfe',
             'is_transport': doc_type in ['cte', 'mdfe'],
-            'has_items': len(nfe.itens) > 0,
-            'total_value': nfe.valor_total,
+            'has_items': n > 0,
+            'total_value': total,
             'tax_value': nfe.valor_impostos or 0
         }
         
         # Identificar características específicas
         if doc_type == 'nfse':
             fiscal_type['service_indicators'] = {
-                'has_service_codes': any(item.ncm_declarado.startswith('00') for item in nfe.itens),
-                'average_service_value': nfe.valor_total / len(nfe.itens) if nfe.itens else 0,
-                'service_count': len(nfe.itens)
+                'has_service_codes': any(ncm_is_service),
+                'average_service_value': avg,
+                'service_count': n
             }
         elif doc_type == 'nfe':
             fiscal_type['merchandise_indicators'] = {
-                'has_ncm_codes': any(not item.ncm_declarado.startswith('00') for item in nfe.itens),
-                'average_item_value': nfe.valor_total / len(nfe.itens) if nfe.itens else 0,
-                'item_count': len(nfe.itens)
+                'has_ncm_codes': n > 0 and not all(ncm_is_service),
+                'average_item_value': avg,
+                'item_count': n
             }
         
         return fiscal_type
@@ -170,7 +399,8 @@ class SmartFiscalParser:
             Dict com dados normalizados do emitente
         """
         cnpj = nfe.cnpj_emitente
-        document_type = self._identify_document_type(cnpj)
+        clean_doc = _only_digits(cnpj)
+        document_type = _identify_document_type(clean_doc)
         
         return {
             'cnpj': cnpj,
@@ -178,9 +408,9 @@ class SmartFiscalParser:
             'is_cpf': document_type == 'cpf',
             'is_cnpj': document_type == 'cnpj',
             'razao_social': nfe.razao_social_emitente or 'Não informado',
-            'formatted_document': self._format_document(cnpj, document_type),
+            'formatted_document': _format_document(clean_doc, document_type),
             'document_length': len(cnpj),
-            'is_valid_format': self._validate_document_format(cnpj, document_type)
+            'is_valid_format': _validate_document_format(clean_doc, document_type)
         }
     
     def _normalize_destinatario_data(self, nfe: NFe) -> Dict[str, Any]:
@@ -194,7 +424,8 @@ class SmartFiscalParser:
             Dict com dados normalizados do destinatário
         """
         cnpj = nfe.cnpj_destinatario
-        document_type = self._identify_document_type(cnpj)
+        clean_doc = _only_digits(cnpj)
+        document_type = _identify_document_type(clean_doc)
         
         return {
             'cnpj': cnpj,
@@ -202,74 +433,93 @@ class SmartFiscalParser:
             'is_cpf': document_type == 'cpf',
             'is_cnpj': document_type == 'cnpj',
             'razao_social': nfe.razao_social_destinatario or 'Não informado',
-            'formatted_document': self._format_document(cnpj, document_type),
+            'formatted_document': _format_document(clean_doc, document_type),
             'document_length': len(cnpj),
-            'is_valid_format': self._validate_document_format(cnpj, document_type)
+            'is_valid_format': _validate_document_format(clean_doc, document_type)
         }
     
-    def _process_items(self, itens: list, doc_type: str) -> Dict[str, Any]:
+    def _process_items(self, itens: list, doc_type: str, ncm_is_service: List[bool]) -> Dict[str, Any]:
         """
         Processa itens do documento
         
         Args:
             itens: Lista de itens
             doc_type: Tipo do documento
+            ncm_is_service: Por item, se o NCM declarado indica serviço
         
         Returns:
             Dict com dados processados dos itens
         """
         processed_items = []
-        
-        for item in itens:
-            item_data = {
-                'numero_item': item.numero_item,
-                'descricao': item.descricao,
-                'ncm_declarado': item.ncm_declarado,
-                'ncm_predito': item.ncm_predito,
-                'cfop': item.cfop,
-                'quantidade': item.quantidade,
-                'valor_unitario': item.valor_unitario,
-                'valor_total': item.valor_total,
-                'unidade': item.unidade,
-                'codigo_produto': item.codigo_produto,
-                'ean': item.ean,
-                'ncm_confianca': item.ncm_confianca
-            }
-            
-            # Identificar tipo do item
-            item_data['item_type'] = self._identify_item_type(item, doc_type)
-            item_data['is_service'] = item_data['item_type'] == 'service'
-            item_data['is_merchandise'] = item_data['item_type'] == 'merchandise'
+        total_value = 0
+        has_services = False
+        has_merchandise = False
+        all_values_positive = True
+        
+        for item, is_service_ncm in zip(itens, ncm_is_service):
+            item_type = self._identify_item_type(is_service_ncm, doc_type)
+            item_data = ProcessedItem(
+                numero_item=item.numero_item,
+                descricao=item.descricao,
+                ncm_declarado=item.ncm_declarado,
+                ncm_predito=item.ncm_predito,
+                cfop=item.cfop,
+                quantidade=item.quantidade,
+                valor_unitario=item.valor_unitario,
+                valor_total=item.valor_total,
+                unidade=item.unidade,
+                codigo_produto=item.codigo_produto,
+                ean=item.ean,
+                ncm_confianca=item.ncm_confianca,
+                item_type=item_type,
+                is_service=item_type == 'service',
+                is_merchandise=item_type == 'merchandise'
+            )
             
             processed_items.append(item_data)
+            total_value += item.valor_total
+            has_services = has_services or item_data.is_service
+            has_merchandise = has_merchandise or item_data.is_merchandise
+            all_values_positive = all_values_positive and item.valor_total > 0
+        
+        item_count = len(processed_items)
         
         return {
             'items': processed_items,
-            'total_items': len(processed_items),
-            'total_value': sum(item.valor_total for item in itens),
-            'average_value': sum(item.valor_total for item in itens) / len(itens) if itens else 0,
-            'has_services': any(self._identify_item_type(item, doc_type) == 'service' for item in itens),
-            'has_merchandise': any(self._identify_item_type(item, doc_type) == 'merchandise' for item in itens)
+            'total_items': item_count,
+            'total_value': total_value,
+            'average_value': total_value / item_count if item_count else 0,
+            'has_services': has_services,
+            'has_merchandise': has_merchandise,
+            'all_values_positive': all_values_positive
         }
     
-    def _calculate_fiscal_metrics(self, nfe: NFe, doc_type: str) -> Dict[str, Any]:
+    def _calculate_fiscal_metrics(self, nfe: NFe, doc_type: str, n: int,
+                                  avg: float, avg_prod: float) -> Dict[str, Any]:
         """
         Calcula métricas fiscais do documento
         
         Args:
             nfe: Objeto NFe
             doc_type: Tipo do documento
+            n: Quantidade de itens
+            avg: Valor total médio por item
+            avg_prod: Valor de produtos médio por item
         
         Returns:
             Dict com métricas fiscais
         """
+        total = nfe.valor_total
+        produtos = nfe.valor_produtos
+        tax = nfe.valor_impostos or 0
+        
         metrics = {
-            'total_value': nfe.valor_total,
-            'product_value': nfe.valor_produtos,
-            'tax_value': nfe.valor_impostos or 0,
-            'tax_percentage': (nfe.valor_impostos / nfe.valor_total * 100) if nfe.valor_impostos and nfe.valor_total > 0 else 0,
-            'item_count': len(nfe.itens),
-            'average_item_value': nfe.valor_total / len(nfe.itens) if nfe.itens else 0,
+            'total_value': total,
+            'product_value': produtos,
+            'tax_value': tax,
+            'tax_percentage': (tax / total * 100) if tax and total > 0 else 0,
+            'item_count': n,
+            'average_item_value': avg,
             'document_type': doc_type,
             'processing_date': nfe.data_emissao,
             'key_access': nfe.chave_acesso
@@ -278,89 +528,25 @@ class SmartFiscalParser:
         # Métricas específicas por tipo
         if doc_type == 'nfse':
             metrics['service_metrics'] = {
-                'service_count': len(nfe.itens),
-                'total_service_value': nfe.valor_total,
-                'average_service_value': nfe.valor_total / len(nfe.itens) if nfe.itens else 0
+                'service_count': n,
+                'total_service_value': total,
+                'average_service_value': avg
             }
         elif doc_type == 'nfe':
             metrics['merchandise_metrics'] = {
-                'item_count': len(nfe.itens),
-                'total_merchandise_value': nfe.valor_produtos,
-                'average_item_value': nfe.valor_produtos / len(nfe.itens) if nfe.itens else 0
+                'item_count': n,
+                'total_merchandise_value': produtos,
+                'average_item_value': avg_prod
             }
         
         return metrics
     
-    def _identify_document_type(self, document: str) -> str:
-        """
-        Identifica se o documento é CPF ou CNPJ
-        
-        Args:
-            document: Número do documento
-        
-        Returns:
-            'cpf' ou 'cnpj'
-        """
-        # Limpar documento
-        clean_doc = re.sub(r'[^\d]', '', document)
-        
-        if len(clean_doc) == 11:
-            return 'cpf'
-        elif len(clean_doc) == 14:
-            return 'cnpj'
-        else:
-            # Tentar identificar pelo contexto
-            if len(clean_doc) < 14:
-                return 'cpf'
-            else:
-                return 'cnpj'
-    
-    def _format_document(self, document: str, doc_type: str) -> str:
-        """
-        Formata documento (CPF ou CNPJ)
-        
-        Args:
-            document: Número do documento
-            doc_type: Tipo do documento
-        
-        Returns:
-            Documento formatado
-        """
-        clean_doc = re.sub(r'[^\d]', '', document)
-        
-        if doc_type == 'cpf' and len(clean_doc) == 11:
-            return f"{clean_doc[:3]}.{clean_doc[3:6]}.{clean_doc[6:9]}-{clean_doc[9:]}"
-        elif doc_type == 'cnpj' and len(clean_doc) == 14:
-            return f"{clean_doc[:2]}.{clean_doc[2:5]}.{clean_doc[5:8]}/{clean_doc[8:12]}-{clean_doc[12:]}"
-        else:
-            return clean_doc
-    
-    def _validate_document_format(self, document: str, doc_type: str) -> bool:
-        """
-        Valida formato do documento
-        
-        Args:
-            document: Número do documento
-            doc_type: Tipo do documento
-        
-        Returns:
-            True se formato válido
-        """
-        clean_doc = re.sub(r'[^\d]', '', document)
-        
-        if doc_type == 'cpf':
-            return len(clean_doc) == 11 and clean_doc.isdigit()
-        elif doc_type == 'cnpj':
-            return len(clean_doc) == 14 and clean_doc.isdigit()
-        else:
-            return False
-    
-    def _identify_item_type(self, item: ItemNFe, doc_type: str) -> str:
+    def _identify_item_type(self, is_service_ncm: bool, doc_type: str) -> str:
         """
         Identifica tipo do item (serviço ou mercadoria)
         
         Args:
-            item: Item da NF-e
+            is_service_ncm: Se o NCM do item começa com '00'
             doc_type: Tipo do documento
         
         Returns:
@@ -370,7 +556,7 @@ class SmartFiscalParser:
             return 'service'
         elif doc_type == 'nfe':
             # Verificar se NCM indica serviço (códigos que começam com 00)
-            if item.ncm_declarado.startswith('00'):
+            if is_service_ncm:
                 return 'service'
             else:
                 return 'merchandise'
@@ -387,19 +573,21 @@ class SmartFiscalParser:
         Returns:
             Dados validados e enriquecidos
         """
+        nfe = data['nfe']
+        
         # Validar dados críticos
         validation_results = {
             'emitente_valid': data['emitente']['is_valid_format'],
             'destinatario_valid': data['destinatario']['is_valid_format'],
-            'values_consistent': abs(data['nfe'].valor_total - (data['nfe'].valor_produtos + (data['nfe'].valor_impostos or 0))) < 0.01,
-            'has_items': len(data['nfe'].itens) > 0,
-            'items_valid': all(item.valor_total > 0 for item in data['nfe'].itens)
+            'values_consistent': abs(nfe.valor_total - (nfe.valor_produtos + (nfe.valor_impostos or 0))) < 0.01,
+            'has_items': data['itens']['total_items'] > 0,
+            'items_valid': data['itens']['all_values_positive']
         }
         
         # Enriquecer com informações adicionais
         enrichment = {
             'risk_indicators': self._calculate_risk_indicators(data),
-            'compliance_checks': self._perform_compliance_checks(data),
+            'compliance_checks': self._perform_compliance_checks(data, validation_results),
             'data_quality_score': self._calculate_data_quality_score(validation_results)
         }
         
@@ -428,51 +616,45 @@ class SmartFiscalParser:
             'risk_score': 0
         }
         
-        # Calcular score de risco
-        risk_score = 0
-        if risk_indicators['high_value_transaction']:
-            risk_score += 20
-        if risk_indicators['unusual_item_count']:
-            risk_score += 15
-        if risk_indicators['missing_document_info']:
-            risk_score += 25
-        if risk_indicators['cpf_destinatario']:
-            risk_score += 10
-        if risk_indicators['service_without_tax']:
-            risk_score += 30
+        # Calcular score de risco (soma ponderada dos indicadores)
+        risk_score = (
+            20 * bool(risk_indicators['high_value_transaction'])
+            + 15 * bool(risk_indicators['unusual_item_count'])
+            + 25 * bool(risk_indicators['missing_document_info'])
+            + 10 * bool(risk_indicators['cpf_destinatario'])
+            + 30 * bool(risk_indicators['service_without_tax'])
+        )
         
         risk_indicators['risk_score'] = min(risk_score, 100)
         
         return risk_indicators
     
-    def _perform_compliance_checks(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _perform_compliance_checks(self, data: Dict[str, Any], validation: Dict[str, bool]) -> Dict[str, Any]:
         """
         Realiza verificações de conformidade
         
         Args:
             data: Dados processados
+            validation: Resultados de validação já calculados em _validate_and_enrich
         
         Returns:
             Dict com verificações de conformidade
         """
         compliance = {
-            'document_format_valid': data['emitente']['is_valid_format'] and data['destinatario']['is_valid_format'],
-            'values_consistent': abs(data['nfe'].valor_total - (data['nfe'].valor_produtos + (data['nfe'].valor_impostos or 0))) < 0.01,
+            'document_format_valid': validation['emitente_valid'] and validation['destinatario_valid'],
+            'values_consistent': validation['values_consistent'],
             'has_required_fields': bool(data['nfe'].chave_acesso and data['nfe'].numero and data['nfe'].data_emissao),
             'items_have_codes': all(item.ncm_declarado for item in data['nfe'].itens),
             'compliance_score': 0
         }
         
-        # Calcular score de conformidade
-        compliance_score = 0
-        if compliance['document_format_valid']:
-            compliance_score += 30
-        if compliance['values_consistent']:
-            compliance_score += 25
-        if compliance['has_required_fields']:
-            compliance_score += 25
-        if compliance['items_have_codes']:
-            compliance_score += 20
+        # Calcular score de conformidade (soma ponderada das verificações)
+        compliance_score = (
+            30 * bool(compliance['document_format_valid'])
+            + 25 * bool(compliance['values_consistent'])
+            + 25 * bool(compliance['has_required_fields'])
+            + 20 * bool(compliance['items_have_codes'])
+        )
         
         compliance['compliance_score'] = compliance_score
         
@@ -492,7 +674,7 @@ class SmartFiscalParser:
         passed_checks = sum(1 for v in validation.values() if v)
         return int((passed_checks / total_checks) * 100) if total_checks > 0 else 0
     
-    def _generate_smart_metadata(self, data: Dict[str, Any], doc_type: str) -> Dict[str, Any]:
+    def _generate_smart_metadata(self, data: Dict[str, Any], doc_type: str) -> SmartMetadata:
         """
         Gera metadados inteligentes
         
@@ -501,38 +683,53 @@ class SmartFiscalParser:
             doc_type: Tipo do documento
         
         Returns:
-            Dict com metadados inteligentes
-        """
-        return {
-            'document_summary': f"{data['fiscal_type']['description']} - {data['emitente']['razao_social']} → {data['destinatario']['razao_social']}",
-            'fiscal_category': data['fiscal_type']['category'],
-            'transaction_type': 'service' if data['fiscal_type']['is_service'] else 'merchandise',
-            'participants': {
-                'emitente_type': data['emitente']['document_type'],
-                'destinatario_type': data['destinatario']['document_type'],
-                'is_b2b': data['emitente']['is_cnpj'] and data['destinatario']['is_cnpj'],
-                'is_b2c': data['emitente']['is_cnpj'] and data['destinatario']['is_cpf']
-            },
-            'financial_summary': {
-                'total_value': data['nfe'].valor_total,
-                'tax_percentage': data['metrics']['tax_percentage'],
-                'item_count': data['metrics']['item_count']
-            },
-            'quality_indicators': {
-                'data_quality_score': data['enrichment']['data_quality_score'],
-                'compliance_score': data['enrichment']['compliance_checks']['compliance_score'],
-                'risk_score': data['enrichment']['risk_indicators']['risk_score']
-            },
-            'processing_flags': {
-                'requires_attention': data['enrichment']['risk_indicators']['risk_score'] > 50,
-                'high_quality': data['enrichment']['data_quality_score'] > 80,
-                'compliant': data['enrichment']['compliance_checks']['compliance_score'] > 70
-            }
-        }
+            SmartMetadata com metadados inteligentes
+        """
+        emitente = data['emitente']
+        destinatario = data['destinatario']
+        enrichment = data['enrichment']
+        data_quality_score = enrichment['data_quality_score']
+        compliance_score = enrichment['compliance_checks']['compliance_score']
+        risk_score = enrichment['risk_indicators']['risk_score']
+        
+        return SmartMetadata(
+            description=data['fiscal_type']['description'],
+            emitente_name=emitente['razao_social'],
+            destinatario_name=destinatario['razao_social'],
+            fiscal_category=data['fiscal_type']['category'],
+            transaction_type='service' if data['fiscal_type']['is_service'] else 'merchandise',
+            participants=Participants(
+                emitente_type=emitente['document_type'],
+                destinatario_type=destinatario['document_type'],
+                is_b2b=emitente['is_cnpj'] and destinatario['is_cnpj'],
+                is_b2c=emitente['is_cnpj'] and destinatario['is_cpf']
+            ),
+            financial_summary=FinancialSummary(
+                total_value=data['nfe'].valor_total,
+                tax_percentage=data['metrics']['tax_percentage'],
+                item_count=data['metrics']['item_count']
+            ),
+            quality_indicators=QualityIndicators(
+                data_quality_score=data_quality_score,
+                compliance_score=compliance_score,
+                risk_score=risk_score
+            ),
+            processing_flags=ProcessingFlags(
+                requires_attention=risk_score > 50,
+                high_quality=data_quality_score > 80,
+                compliant=compliance_score > 70
+            )
+        )
+
+
+@lru_cache(maxsize=1)
+def _get_parser() -> SmartFiscalParser:
+    """Retorna o parser compartilhado pelas funções de conveniência"""
+    return SmartFiscalParser()
 
 
 # Função de conveniência
-def parse_fiscal_document_smart(xml_path: str) -> Dict[str, Any]:
+def parse_fiscal_document_smart(xml_path: str) -> ProcessingResult:
     """
     Função de conveniência para processamento inteligente de documento fiscal
     
@@ -540,7 +737,27 @@ def parse_fiscal_document_smart(xml_path: str) -> Dict[str, Any]:
         xml_path: Caminho para o arquivo XML
     
     Returns:
-        Dict com dados processados e metadados
+        ProcessingResult com dados processados e metadados
+    """
+    return _get_parser().parse_document(xml_path)
+
+
+def parse_fiscal_documents_smart(xml_paths: Iterable[str],
+                                 workers: Optional[int] = None,
+                                 chunksize: int = 16) -> Iterator[ProcessingResult]:
+    """
+    Processa vários documentos fiscais em paralelo (um processo por núcleo)
+    
+    Cada processo reutiliza seu próprio parser (ver _get_parser). Os
+    resultados são produzidos na mesma ordem de xml_paths.
+    
+    Args:
+        xml_paths: Caminhos dos arquivos XML
+        workers: Número de processos (padrão: número de CPUs)
+        chunksize: Quantidade de arquivos enviada por vez a cada processo
+    
+    Yields:
+        ProcessingResult de cada documento
     """
-    parser = SmartFiscalParser()
-    return parser.parse_document(xml_path)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(parse_fiscal_document_smart, xml_paths, chunksize=chunksize)
@@ -3,24 +3,302 @@ FiscalAI MVP - Gerenciador de Tabelas Fiscais
 Integra o ncm_cfop_reader.py com a aplicação
 """
 
-import sys
+import csv
+import hashlib
+import json
+import os
+import threading
+import zipfile
 from pathlib import Path
+import numpy as np
 import pandas as pd
-from typing import Optional, Dict, Any
+from types import MappingProxyType
+from typing import Optional, Callable, Dict, Any, List, Mapping, Tuple
 import logging
 
-# Adicionar o diretório atual ao path para importar ncm_cfop_reader
-sys.path.insert(0, str(Path(__file__).parent))
-
 try:
-    from ncm_cfop_reader import LeitorTabelasFiscais
+    from .ncm_cfop_reader import LeitorTabelasFiscais
     NCM_CFOP_READER_AVAILABLE = True
 except ImportError:
     NCM_CFOP_READER_AVAILABLE = False
     logging.warning("ncm_cfop_reader.py não encontrado. Tabelas fiscais não estarão disponíveis.")
 
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Diretórios base, resolvidos uma única vez na importação
+_MODULE_DIR = Path(__file__).resolve().parent
+_REPO_ROOT = _MODULE_DIR.parent.parent
+_SIBLING_ROOT = _REPO_ROOT.parent
+
+# Locais onde as tabelas são procuradas, em ordem de prioridade
+_CAMINHOS_NCM = (
+    # FiscalAI_MVP
+    _REPO_ROOT / "data" / "tables" / "BaseDESC_NCM.csv",
+    _REPO_ROOT / "data" / "tables" / "BaseDESC_NCM.zip",
+    
+    # Eleven base
+    _SIBLING_ROOT / "Eleven base" / "BaseDESC_NCM.csv",
+    _SIBLING_ROOT / "Eleven base" / "BaseDESC_NCM.zip",
+    
+    # Outros locais possíveis
+    _REPO_ROOT / "BaseDESC_NCM.csv",
+    _REPO_ROOT / "BaseDESC_NCM.zip",
+)
+
+_CAMINHOS_CFOP = (
+    # FiscalAI_MVP
+    _REPO_ROOT / "data" / "tables" / "CFOPcpoy.xlsx",
+    _REPO_ROOT / "data" / "tables" / "Tabela_CFOPOperacoesGeradorasCreditos.xls",
+    
+    # Eleven base
+    _SIBLING_ROOT / "Eleven base" / "CFOPcpoy.xlsx",
+    _SIBLING_ROOT / "Eleven base" / "Tabela_CFOPOperacoesGeradorasCreditos.xls",
+    
+    # Outros locais possíveis
+    _REPO_ROOT / "CFOPcpoy.xlsx",
+    _REPO_ROOT / "Tabela_CFOPOperacoesGeradorasCreditos.xls",
+)
+
+
+def _primeiro_existente(possiveis_caminhos) -> Optional[str]:
+    """Primeiro caminho existente da lista de candidatos"""
+    for caminho in possiveis_caminhos:
+        if caminho.exists():
+            return str(caminho)
+    return None
+
+
+# Tabelas mock para testes: código -> (descricao, categoria)
+_NCM_MOCK: Mapping[str, Tuple[str, None]] = MappingProxyType({
+    '12345678': ('Produto eletrônico genérico', None),
+    '87654321': ('Componente mecânico', None),
+    '11111111': ('Material de construção', None),
+    '22222222': ('Produto químico', None),
+    '33333333': ('Alimento processado', None),
+    '44444444': ('Têxtil', None),
+    '55555555': ('Produto farmacêutico', None),
+    '66666666': ('Equipamento industrial', None),
+    '77777777': ('Produto agrícola', None),
+    '88888888': ('Produto mineral', None),
+})
+
+_CFOP_MOCK: Mapping[str, Tuple[str, None]] = MappingProxyType({
+    '1101': ('Compra para comercialização', None),
+    '1102': ('Compra para industrialização', None),
+    '1201': ('Venda de mercadoria', None),
+    '1202': ('Venda de produto industrializado', None),
+    '2101': ('Compra para uso', None),
+    '2102': ('Compra para consumo', None),
+    '2201': ('Venda de ativo imobilizado', None),
+    '2202': ('Venda de mercadoria', None),
+    '3101': ('Entrada de mercadoria', None),
+    '3102': ('Saída de mercadoria', None),
+})
+
+
+# Nomes aceitos para cada coluna usada nas consultas (mesmos do ncm_cfop_reader)
+_COLUNAS_NCM = {
+    'ncm': 'ncm', 'codigo': 'ncm', 'cod': 'ncm', 'código': 'ncm',
+    'codigo_ncm': 'ncm', 'co_ncm': 'ncm', 'co_sh': 'ncm',
+    'descricao': 'descricao', 'xprod': 'descricao', 'produto': 'descricao', 'desc': 'descricao',
+    'categoria': 'categoria',
+}
+
+
+def _ler_csv_ncm(fonte) -> pd.DataFrame:
+    """Lê de um arquivo binário apenas as colunas de código, descrição e categoria"""
+    cabecalho = fonte.readline().decode('utf-8-sig', errors='ignore').rstrip('\r\n')
+    fonte.seek(0)
+    
+    separador = '\t'
+    if '\t' not in cabecalho:
+        separador = next((sep for sep in (';', ',', '|') if sep in cabecalho), '\t')
+    
+    # Cabeçalho lido como CSV: nomes entre aspas valem como no pd.read_csv
+    colunas = {}
+    for coluna in next(csv.reader([cabecalho], delimiter=separador), []):
+        destino = _COLUNAS_NCM.get(coluna.strip().lower())
+        if destino and destino not in colunas.values():
+            colunas[coluna] = destino
+    if 'ncm' not in colunas.values():
+        raise ValueError("Coluna de código NCM não encontrada")
+    
+    df = pd.read_csv(
+        fonte,
+        sep=separador,
+        usecols=list(colunas),
+        dtype='string',
+        encoding='utf-8-sig',
+        on_bad_lines='skip',
+        engine='pyarrow' if PYARROW_AVAILABLE else 'c'
+    ).rename(columns=colunas)
+    
+    return _indexar_ncm(df)
+
+
+def _indexar_ncm(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Indexa a tabela NCM pelo código normalizado
+    
+    Args:
+        df: Tabela com coluna de código NCM (qualquer nome de _COLUNAS_NCM)
+        
+    Returns:
+        Tabela indexada por 'ncm', só com códigos de 8 dígitos
+    """
+    colunas = {}
+    for coluna in df.columns:
+        destino = _COLUNAS_NCM.get(str(coluna).strip().lower())
+        if destino and destino not in colunas.values():
+            colunas[coluna] = destino
+    if 'ncm' not in colunas.values():
+        raise ValueError("Coluna de código NCM não encontrada")
+    df = df.rename(columns=colunas)
+    
+    df['ncm'] = df['ncm'].astype('string').str.replace(r'\D', '', regex=True).str.zfill(8)
+    return df[df['ncm'].str.len() == 8].set_index('ncm')
+
+
+def _carregar_ncm_rapido(caminho: str) -> pd.DataFrame:
+    """
+    Carrega a tabela NCM lendo só as colunas consultadas
+    
+    Arquivos .zip são lidos direto do membro CSV/TXT, sem extração em disco.
+    
+    Args:
+        caminho: Caminho para arquivo CSV, TXT ou ZIP
+        
+    Returns:
+        DataFrame indexado por NCM
+    """
+    if caminho.lower().endswith('.zip'):
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            nome = next(n for n in arquivo_zip.namelist() if n.lower().endswith(('.csv', '.txt')))
+            with arquivo_zip.open(nome) as fonte:
+                return _ler_csv_ncm(fonte)
+    
+    with open(caminho, 'rb') as fonte:
+        return _ler_csv_ncm(fonte)
+
+# Snapshots das tabelas já processadas, reaproveitados entre execuções
+_CACHE_DIR = _REPO_ROOT / "data" / "cache" / "tabelas"
+# Muda quando o formato do snapshot muda, invalidando os antigos
+_VERSAO_SNAPSHOT = 2
+
+
+def _caminhos_snapshot(nome: str, caminho: str) -> Tuple[Path, Path]:
+    """Arquivos de snapshot (tabela, mapa) para a versão atual do arquivo de origem"""
+    st = os.stat(caminho)
+    identidade = f"{_VERSAO_SNAPSHOT}|{os.path.abspath(caminho)}|{st.st_mtime_ns}|{st.st_size}"
+    chave = hashlib.sha1(identidade.encode('utf-8')).hexdigest()[:16]
+    return _CACHE_DIR / f"{nome}-{chave}.parquet", _CACHE_DIR / f"{nome}-{chave}.mapa.json"
+
+
+def _descartar_snapshot(arquivo_tabela: Path) -> None:
+    """Remove a tabela e o mapa de um snapshot"""
+    for arquivo in (arquivo_tabela, arquivo_tabela.with_suffix('.mapa.json')):
+        try:
+            arquivo.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Não foi possível remover snapshot {arquivo.name}: {e}")
+
+
+def _podar_snapshots(nome: str, atuais: Tuple[Path, ...]) -> None:
+    """Remove snapshots de versões anteriores da tabela (temporários em uso ficam)"""
+    for arquivo in _CACHE_DIR.glob(f"{nome}-*"):
+        if arquivo in atuais or not arquivo.name.endswith(('.parquet', '.json', '.pkl')):
+            continue
+        try:
+            arquivo.unlink()
+        except OSError as e:
+            logger.warning(f"Não foi possível remover snapshot antigo {arquivo.name}: {e}")
+
+
+def _gravar_atomico(destino: Path, gravar: Callable[[Path], None]) -> None:
+    """Grava em arquivo temporário e o move para o destino com os.replace"""
+    temporario = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+    try:
+        gravar(temporario)
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+def _abrir_snapshot(nome: str, caminho: str) -> Optional[Tuple[Path, Mapping[str, Tuple[Any, Any]], List[str]]]:
+    """
+    Procura snapshot válido da tabela
+    
+    Args:
+        nome: 'ncm' ou 'cfop'
+        caminho: Arquivo de origem da tabela
+        
+    Returns:
+        (arquivo da tabela, mapa de consulta, colunas da tabela) ou None se não houver snapshot
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    
+    try:
+        arquivo_tabela, arquivo_mapa = _caminhos_snapshot(nome, caminho)
+    except OSError:
+        return None
+    
+    # A tabela é gravada por último: se existe, o mapa está completo
+    if not arquivo_tabela.exists():
+        return None
+    
+    try:
+        with open(arquivo_mapa, 'r', encoding='utf-8') as f:
+            conteudo = json.load(f)
+        mapa = {codigo: (descricao, categoria) for codigo, (descricao, categoria) in conteudo['mapa'].items()}
+        return arquivo_tabela, mapa, list(conteudo['colunas'])
+    except Exception as e:
+        logger.warning(f"Snapshot de {nome} inválido, descartado: {e}")
+        _descartar_snapshot(arquivo_tabela)
+        return None
+
+
+def _salvar_snapshot(nome: str, caminho: str, df: pd.DataFrame,
+                     mapa: Mapping[str, Tuple[Any, Any]]) -> None:
+    """
+    Grava tabela (parquet/zstd) e mapa de consulta (JSON), removendo snapshots antigos
+    
+    Sem pyarrow não há snapshot: a tabela é sempre lida da origem.
+    """
+    if not PYARROW_AVAILABLE:
+        return
+    
+    try:
+        arquivo_tabela, arquivo_mapa = _caminhos_snapshot(nome, caminho)
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        conteudo = {"colunas": [str(coluna) for coluna in df.columns], "mapa": mapa}
+        
+        def gravar_mapa(destino: Path) -> None:
+            with open(destino, 'w', encoding='utf-8') as f:
+                json.dump(conteudo, f, ensure_ascii=False)
+        
+        _gravar_atomico(arquivo_mapa, gravar_mapa)
+        _gravar_atomico(arquivo_tabela, lambda destino: df.to_parquet(destino, compression='zstd', index=True))
+        _podar_snapshots(nome, (arquivo_tabela, arquivo_mapa))
+    except Exception as e:
+        logger.warning(f"Não foi possível gravar snapshot de {nome}: {e}")
+
+
+def _ler_tabela_snapshot(arquivo: Path) -> pd.DataFrame:
+    """Lê a tabela gravada por _salvar_snapshot"""
+    return pd.read_parquet(arquivo, engine='pyarrow')
+
+
+def _valores(serie: pd.Series) -> List[Any]:
+    """Valores da coluna como objetos Python, com None no lugar de NA"""
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
 class GerenciadorTabelasFiscais:
     """Gerenciador centralizado de tabelas fiscais NCM e CFOP"""
     
@@ -29,7 +307,21 @@ class GerenciadorTabelasFiscais:
         self.df_ncm = None
         self.df_cfop = None
         self.df_cfop_categorizado = None
+        # código -> (descricao, categoria), para consultas sem .loc (None = ainda não montado)
+        self._ncm_map: Optional[Mapping[str, Tuple[Any, Any]]] = None
+        self._cfop_map: Optional[Mapping[str, Tuple[Any, Any]]] = None
+        # Caminhos encontrados automaticamente (None = ainda não procurados)
+        self._caminho_ncm: Optional[str] = None
+        self._caminho_cfop: Optional[str] = None
+        # Snapshots cuja tabela ainda não foi lida ('ncm'/'cfop' -> (arquivo, origem))
+        self._snapshots: Dict[str, Tuple[Path, str]] = {}
+        # Estatísticas registradas no carregamento ('ncm'/'cfop' -> total e colunas)
+        self._estatisticas: Dict[str, Dict[str, Any]] = {}
         self._inicializado = False
+        # Evita repetir uma inicialização que já falhou a cada consulta
+        self._init_attempted = False
+        self._ncm_mock_cached: Optional[pd.DataFrame] = None
+        self._cfop_mock_cached: Optional[pd.DataFrame] = None
         
         if NCM_CFOP_READER_AVAILABLE:
             self.leitor = LeitorTabelasFiscais()
@@ -48,8 +340,7 @@ class GerenciadorTabelasFiscais:
             True se inicializado com sucesso
         """
         if not NCM_CFOP_READER_AVAILABLE:
-            logger.error("ncm_cfop_reader.py não está disponível")
-            return False
+            logger.warning("ncm_cfop_reader.py não está disponível; apenas NCM em CSV/TXT/ZIP será carregado")
         
         try:
             # Caminhos padrão
@@ -59,22 +350,11 @@ class GerenciadorTabelasFiscais:
             if caminho_cfop is None:
                 caminho_cfop = self._encontrar_arquivo_cfop()
             
-            # Carregar tabelas
-            if caminho_ncm and Path(caminho_ncm).exists():
-                logger.info(f"Carregando tabela NCM: {caminho_ncm}")
-                self.df_ncm = self.leitor.carregar_ncm(caminho_ncm)
-                logger.info(f"Tabela NCM carregada: {len(self.df_ncm)} registros")
-            else:
-                logger.warning("Arquivo NCM não encontrado, usando dados mock")
-                self.df_ncm = self._criar_tabela_ncm_mock()
-            
-            if caminho_cfop and Path(caminho_cfop).exists():
-                logger.info(f"Carregando tabela CFOP: {caminho_cfop}")
-                self.df_cfop = self.leitor.carregar_cfop_estruturado(caminho_cfop)
-                logger.info(f"Tabela CFOP carregada: {len(self.df_cfop)} registros")
-            else:
-                logger.warning("Arquivo CFOP não encontrado, usando dados mock")
-                self.df_cfop = self._criar_tabela_cfop_mock()
+            # Carregar tabelas (sem arquivo, as consultas usam direto o dict mock)
+            self.df_ncm, self._ncm_map = self._carregar_tabela(
+                'ncm', caminho_ncm, self._ler_ncm, _NCM_MOCK)
+            self.df_cfop, self._cfop_map = self._carregar_tabela(
+                'cfop', caminho_cfop, self.leitor and self._ler_cfop, _CFOP_MOCK)
             
             self._inicializado = True
             logger.info("Tabelas fiscais inicializadas com sucesso")
@@ -83,87 +363,253 @@ class GerenciadorTabelasFiscais:
         except Exception as e:
             logger.error(f"Erro ao inicializar tabelas fiscais: {e}")
             return False
+        
+        finally:
+            self._init_attempted = True
     
-    def _encontrar_arquivo_ncm(self) -> Optional[str]:
-        """Encontra arquivo NCM automaticamente"""
-        possiveis_caminhos = [
-            # FiscalAI_MVP
-            Path(__file__).parent.parent.parent / "data" / "tables" / "BaseDESC_NCM.csv",
-            Path(__file__).parent.parent.parent / "data" / "tables" / "BaseDESC_NCM.zip",
-            
-            # Eleven base
-            Path(__file__).parent.parent.parent.parent / "Eleven base" / "BaseDESC_NCM.csv",
-            Path(__file__).parent.parent.parent.parent / "Eleven base" / "BaseDESC_NCM.zip",
+    def _ler_ncm(self, caminho: str) -> pd.DataFrame:
+        """Lê a tabela NCM com o leitor adequado ao arquivo, indexada por código"""
+        if self.leitor is None or caminho.lower().endswith(('.zip', '.csv', '.txt')):
+            try:
+                return _carregar_ncm_rapido(caminho)
+            except Exception as e:
+                # Arquivo fora do formato esperado: o leitor completo é mais tolerante
+                if self.leitor is None or caminho.lower().endswith('.zip'):
+                    raise
+                logger.warning(f"Leitura rápida da tabela NCM falhou ({e}), usando o leitor completo")
+        return _indexar_ncm(self.leitor.carregar_ncm(caminho))
+    
+    def _ler_cfop(self, caminho: str) -> pd.DataFrame:
+        """Lê a tabela CFOP estruturada, indexada por código"""
+        return self.leitor.carregar_cfop_estruturado(caminho).set_index('codigo_cfop')
+    
+    def _carregar_tabela(self, nome: str, caminho: Optional[str],
+                         ler: Optional[Callable[[str], pd.DataFrame]],
+                         mock: Mapping[str, Tuple[Any, Any]]) -> Tuple[Optional[pd.DataFrame], Mapping[str, Tuple[Any, Any]]]:
+        """
+        Carrega uma tabela, usando o snapshot em cache quando válido
+        
+        Args:
+            nome: 'ncm' ou 'cfop'
+            caminho: Arquivo de origem (ou None)
+            ler: Função de leitura do arquivo (None se indisponível)
+            mock: Mapa usado quando não há arquivo
             
-            # Outros locais possíveis
-            Path(__file__).parent.parent.parent / "BaseDESC_NCM.csv",
-            Path(__file__).parent.parent.parent / "BaseDESC_NCM.zip",
-        ]
+        Returns:
+            (tabela, mapa de consulta); a tabela é None quando não há arquivo
+            ou quando veio de snapshot (lida depois, sob demanda)
+        """
+        rotulo = nome.upper()
+        if ler is None or not caminho or not Path(caminho).exists():
+            logger.warning(f"Arquivo {rotulo} não encontrado, usando dados mock")
+            self._registrar_estatisticas(nome, len(mock), ['descricao'])
+            return None, mock
         
-        for caminho in possiveis_caminhos:
-            if caminho.exists():
-                return str(caminho)
+        snapshot = _abrir_snapshot(nome, caminho)
+        if snapshot is not None:
+            arquivo_tabela, mapa, colunas = snapshot
+            self._snapshots[nome] = (arquivo_tabela, caminho)
+            logger.info(f"Tabela {rotulo} carregada do cache: {len(mapa)} códigos")
+            # Índice único: um código por registro
+            self._registrar_estatisticas(nome, len(mapa), colunas)
+            return None, mapa
         
-        return None
+        logger.info(f"Carregando tabela {rotulo}: {caminho}")
+        df = self._otimizar_colunas(self._normalizar_indice(ler(caminho)))
+        logger.info(f"Tabela {rotulo} carregada: {len(df)} registros")
+        self._registrar_estatisticas(nome, len(df), list(df.columns))
+        
+        mapa = self._construir_mapa(df)
+        _salvar_snapshot(nome, caminho, df, mapa)
+        return df, mapa
+    
+    def _registrar_estatisticas(self, nome: str, total: int, colunas: List[str]) -> None:
+        """Guarda total de registros e colunas para obter_estatisticas"""
+        self._estatisticas[nome] = {
+            "total_registros": total,
+            "colunas": list(colunas) if total else []
+        }
+    
+    def _encontrar_arquivo_ncm(self) -> Optional[str]:
+        """Encontra arquivo NCM automaticamente"""
+        if self._caminho_ncm is not None:
+            return self._caminho_ncm or None
+        
+        # '' registra que a busca já foi feita sem sucesso
+        self._caminho_ncm = _primeiro_existente(_CAMINHOS_NCM) or ''
+        return self._caminho_ncm or None
     
     def _encontrar_arquivo_cfop(self) -> Optional[str]:
         """Encontra arquivo CFOP automaticamente"""
-        possiveis_caminhos = [
-            # FiscalAI_MVP
-            Path(__file__).parent.parent.parent / "data" / "tables" / "CFOPcpoy.xlsx",
-            Path(__file__).parent.parent.parent / "data" / "tables" / "Tabela_CFOPOperacoesGeradorasCreditos.xls",
-            
-            # Eleven base
-            Path(__file__).parent.parent.parent.parent / "Eleven base" / "CFOPcpoy.xlsx",
-            Path(__file__).parent.parent.parent.parent / "Eleven base" / "Tabela_CFOPOperacoesGeradorasCreditos.xls",
-            
-            # Outros locais possíveis
-            Path(__file__).parent.parent.parent / "CFOPcpoy.xlsx",
-            Path(__file__).parent.parent.parent / "Tabela_CFOPOperacoesGeradorasCreditos.xls",
-        ]
-        
-        for caminho in possiveis_caminhos:
-            if caminho.exists():
-                return str(caminho)
+        if self._caminho_cfop is not None:
+            return self._caminho_cfop or None
         
-        return None
+        # '' registra que a busca já foi feita sem sucesso
+        self._caminho_cfop = _primeiro_existente(_CAMINHOS_CFOP) or ''
+        return self._caminho_cfop or None
     
     def obter_tabela_ncm(self) -> pd.DataFrame:
         """Retorna tabela NCM"""
-        if not self._inicializado:
+        if not self._init_attempted:
             self.inicializar()
-        return self.df_ncm if self.df_ncm is not None else self._criar_tabela_ncm_mock()
+        if self.df_ncm is None and 'ncm' in self._snapshots:
+            self.df_ncm = self._ler_snapshot_pendente('ncm', self._ler_ncm)
+        if self.df_ncm is not None:
+            return self.df_ncm
+        if self._ncm_mock_cached is None:
+            self._ncm_mock_cached = self._criar_tabela_ncm_mock()
+        return self._ncm_mock_cached
     
     def obter_tabela_cfop(self) -> pd.DataFrame:
         """Retorna tabela CFOP"""
-        if not self._inicializado:
+        if not self._init_attempted:
             self.inicializar()
-        return self.df_cfop if self.df_cfop is not None else self._criar_tabela_cfop_mock()
+        if self.df_cfop is None and 'cfop' in self._snapshots:
+            self.df_cfop = self._ler_snapshot_pendente('cfop', self.leitor and self._ler_cfop)
+        if self.df_cfop is not None:
+            return self.df_cfop
+        if self._cfop_mock_cached is None:
+            self._cfop_mock_cached = self._criar_tabela_cfop_mock()
+        return self._cfop_mock_cached
+    
+    def _ler_snapshot_pendente(self, nome: str,
+                               ler: Optional[Callable[[str], pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        Lê a tabela de um snapshot aberto na inicialização
+        
+        Se o arquivo estiver corrompido, o snapshot é descartado e a tabela
+        é recarregada da origem (gravando um snapshot novo).
+        
+        Args:
+            nome: 'ncm' ou 'cfop'
+            ler: Função de leitura do arquivo de origem
+            
+        Returns:
+            Tabela, ou None se a origem também não puder ser lida
+        """
+        arquivo_tabela, caminho = self._snapshots.pop(nome)
+        try:
+            return _ler_tabela_snapshot(arquivo_tabela)
+        except Exception as e:
+            logger.warning(f"Snapshot de {nome} ilegível, recarregando da origem: {e}")
+            _descartar_snapshot(arquivo_tabela)
+        
+        try:
+            df, _ = self._carregar_tabela(nome, caminho, ler, {})
+            return df
+        except Exception as e:
+            logger.error(f"Erro ao recarregar tabela {nome.upper()}: {e}")
+            return None
+    
+    @staticmethod
+    def _normalizar_indice(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Deixa o índice de código único, ordenado e do tipo string
+        
+        Índices assim usam a hashtable de strings do pandas e a busca
+        monotônica. Códigos repetidos mantêm a primeira ocorrência.
+        
+        Args:
+            df: Tabela indexada pelo código
+            
+        Returns:
+            Tabela com índice normalizado
+        """
+        # Tabelas ainda não indexadas por código ficam como estão
+        if isinstance(df.index, pd.RangeIndex):
+            return df
+        
+        # Converter antes de deduplicar: 1234 e '1234' viram o mesmo código
+        df = df.set_axis(pd.Index(df.index.astype("string"), name=df.index.name))
+        if not df.index.is_unique:
+            df = df[~df.index.duplicated(keep='first')]
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind='stable')
+        return df
+    
+    def _mapa_da_tabela(self, df: Optional[pd.DataFrame],
+                        mock: Mapping[str, Tuple[Any, Any]]) -> Mapping[str, Tuple[Any, Any]]:
+        """Dict de consulta da tabela carregada, ou o mock se não houver tabela"""
+        return self._construir_mapa(df) if df is not None else mock
+    
+    def _obter_mapa_ncm(self) -> Mapping[str, Tuple[Any, Any]]:
+        """Dict de consulta NCM, inicializando as tabelas se necessário"""
+        if self._ncm_map is None:
+            if not self._init_attempted:
+                self.inicializar()
+            if self._ncm_map is None:
+                self._ncm_map = self._mapa_da_tabela(self.df_ncm, _NCM_MOCK)
+        return self._ncm_map
+    
+    def _obter_mapa_cfop(self) -> Mapping[str, Tuple[Any, Any]]:
+        """Dict de consulta CFOP, inicializando as tabelas se necessário"""
+        if self._cfop_map is None:
+            if not self._init_attempted:
+                self.inicializar()
+            if self._cfop_map is None:
+                self._cfop_map = self._mapa_da_tabela(self.df_cfop, _CFOP_MOCK)
+        return self._cfop_map
+    
+    @staticmethod
+    def _otimizar_colunas(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converte as colunas de consulta para tipos compactos
+        
+        'categoria' se repete muito e vira category; 'descricao' vira string
+        (Arrow, quando pyarrow está instalado) em vez de objetos Python.
+        
+        Args:
+            df: Tabela carregada
+            
+        Returns:
+            Tabela com colunas convertidas
+        """
+        tipos = {}
+        if "descricao" in df.columns:
+            tipos["descricao"] = "string[pyarrow]" if PYARROW_AVAILABLE else "string"
+        if "categoria" in df.columns:
+            tipos["categoria"] = "category"
+        return df.astype(tipos) if tipos else df
+    
+    @staticmethod
+    def _construir_mapa(df: Optional[pd.DataFrame]) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Indexa uma tabela por código em um dict
+        
+        Args:
+            df: Tabela indexada pelo código, com coluna 'descricao' e opcionalmente 'categoria'
+            
+        Returns:
+            Dict código -> (descricao, categoria)
+        """
+        if df is None or df.empty:
+            return {}
+        
+        categorias = _valores(df["categoria"]) if "categoria" in df.columns else [None] * len(df)
+        return dict(zip(df.index.astype(str), zip(_valores(df["descricao"]), categorias)))
     
     def buscar_ncm(self, codigo_ncm: str) -> Optional[Dict[str, Any]]:
         """Busca informações de um NCM"""
-        df_ncm = self.obter_tabela_ncm()
-        
-        if df_ncm.empty or codigo_ncm not in df_ncm.index:
+        registro = self._obter_mapa_ncm().get(codigo_ncm)
+        if registro is None:
             return None
         
         return {
             "codigo": codigo_ncm,
-            "descricao": df_ncm.loc[codigo_ncm, "descricao"],
-            "categoria": df_ncm.loc[codigo_ncm, "categoria"] if "categoria" in df_ncm.columns else None
+            "descricao": registro[0],
+            "categoria": registro[1]
         }
     
     def buscar_cfop(self, codigo_cfop: str) -> Optional[Dict[str, Any]]:
         """Busca informações de um CFOP"""
-        df_cfop = self.obter_tabela_cfop()
-        
-        if df_cfop.empty or codigo_cfop not in df_cfop.index:
+        registro = self._obter_mapa_cfop().get(codigo_cfop)
+        if registro is None:
             return None
         
         return {
             "codigo": codigo_cfop,
-            "descricao": df_cfop.loc[codigo_cfop, "descricao"],
-            "categoria": df_cfop.loc[codigo_cfop, "categoria"] if "categoria" in df_cfop.columns else None
+            "descricao": registro[0],
+            "categoria": registro[1]
         }
     
     def validar_ncm(self, codigo_ncm: str) -> bool:
@@ -174,86 +620,161 @@ class GerenciadorTabelasFiscais:
         """Valida se um código CFOP existe"""
         return self.buscar_cfop(codigo_cfop) is not None
     
+    @staticmethod
+    def normalizar_ncm_lote(codigos: List[str]) -> np.ndarray:
+        """
+        Normaliza vários códigos NCM de uma vez (sem laço Python)
+        
+        Remove espaços e separadores ('.', '-') e completa com zeros à esquerda
+        até 8 dígitos, como o ncm_cfop_reader faz ao carregar a tabela.
+        
+        Args:
+            codigos: Códigos NCM como vieram do XML (ex.: '8471.30.12', '4011')
+            
+        Returns:
+            Array de strings com os códigos normalizados
+        """
+        arr = np.char.strip(np.asarray(codigos, dtype=str))
+        for separador in ('.', '-', ' '):
+            arr = np.char.replace(arr, separador, '')
+        return np.char.zfill(arr, 8)
+    
+    def validar_ncm_lote(self, codigos: List[str]) -> np.ndarray:
+        """
+        Valida vários códigos NCM de uma vez
+        
+        Consulta o mesmo dict de buscar_ncm, sem carregar a tabela do snapshot.
+        
+        Args:
+            codigos: Códigos NCM a validar
+            
+        Returns:
+            Array booleano, True onde o código existe
+        """
+        return self._validar_lote(self._obter_mapa_ncm(), codigos)
+    
+    def validar_cfop_lote(self, codigos: List[str]) -> np.ndarray:
+        """
+        Valida vários códigos CFOP de uma vez
+        
+        Consulta o mesmo dict de buscar_cfop, sem carregar a tabela do snapshot.
+        
+        Args:
+            codigos: Códigos CFOP a validar
+            
+        Returns:
+            Array booleano, True onde o código existe
+        """
+        return self._validar_lote(self._obter_mapa_cfop(), codigos)
+    
+    def buscar_ncm_lote(self, codigos: List[str]) -> pd.DataFrame:
+        """
+        Busca vários NCMs de uma vez
+        
+        Args:
+            codigos: Códigos NCM a buscar
+            
+        Returns:
+            DataFrame (descricao, categoria) na ordem de `codigos`, com None nos códigos inexistentes
+        """
+        return self._buscar_lote(self._obter_mapa_ncm(), codigos)
+    
+    def buscar_cfop_lote(self, codigos: List[str]) -> pd.DataFrame:
+        """
+        Busca vários CFOPs de uma vez
+        
+        Args:
+            codigos: Códigos CFOP a buscar
+            
+        Returns:
+            DataFrame (descricao, categoria) na ordem de `codigos`, com None nos códigos inexistentes
+        """
+        return self._buscar_lote(self._obter_mapa_cfop(), codigos)
+    
+    def validar_codigos_itens(self, itens: List[Any]) -> Dict[str, np.ndarray]:
+        """
+        Valida NCM e CFOP de todos os itens de um documento
+        
+        Faz uma consulta em lote por tabela, em vez de uma por item.
+        
+        Args:
+            itens: Itens da NF-e (com ncm_declarado e cfop)
+            
+        Returns:
+            Dict com arrays booleanos 'ncm' e 'cfop', na ordem dos itens
+        """
+        return {
+            "ncm": self.validar_ncm_lote([item.ncm_declarado for item in itens]),
+            "cfop": self.validar_cfop_lote([item.cfop for item in itens])
+        }
+    
+    @staticmethod
+    def _validar_lote(mapa: Mapping[str, Tuple[Any, Any]], codigos: List[str]) -> np.ndarray:
+        """Pertinência de cada código no dict de consulta"""
+        return np.fromiter((codigo in mapa for codigo in codigos), dtype=bool, count=len(codigos))
+    
+    @staticmethod
+    def _buscar_lote(mapa: Mapping[str, Tuple[Any, Any]], codigos: List[str]) -> pd.DataFrame:
+        """Registros do dict de consulta para cada código, como DataFrame"""
+        vazio = (None, None)
+        return pd.DataFrame(
+            [mapa.get(codigo, vazio) for codigo in codigos],
+            columns=["descricao", "categoria"],
+            index=pd.Index(list(codigos), name="codigo"),
+            dtype=object
+        )
+    
     def obter_estatisticas(self) -> Dict[str, Any]:
-        """Retorna estatísticas das tabelas"""
-        df_ncm = self.obter_tabela_ncm()
-        df_cfop = self.obter_tabela_cfop()
+        """
+        Retorna estatísticas das tabelas
+        
+        Usa os valores registrados no carregamento; não dispara a inicialização
+        (antes dela, os totais são zero).
+        """
+        vazio = {"total_registros": 0, "colunas": []}
         
         return {
             "ncm": {
-                "total_registros": len(df_ncm),
-                "colunas": list(df_ncm.columns) if not df_ncm.empty else [],
+                **self._estatisticas.get("ncm", vazio),
                 "inicializado": self._inicializado
             },
             "cfop": {
-                "total_registros": len(df_cfop),
-                "colunas": list(df_cfop.columns) if not df_cfop.empty else [],
+                **self._estatisticas.get("cfop", vazio),
                 "inicializado": self._inicializado
             },
             "ncm_cfop_reader_disponivel": NCM_CFOP_READER_AVAILABLE
         }
     
     def _criar_tabela_ncm_mock(self) -> pd.DataFrame:
-        """Cria tabela NCM mock para testes"""
-        dados = {
-            'ncm': [
-                '12345678', '87654321', '11111111', '22222222', '33333333',
-                '44444444', '55555555', '66666666', '77777777', '88888888'
-            ],
-            'descricao': [
-                'Produto eletrônico genérico',
-                'Componente mecânico',
-                'Material de construção',
-                'Produto químico',
-                'Alimento processado',
-                'Têxtil',
-                'Produto farmacêutico',
-                'Equipamento industrial',
-                'Produto agrícola',
-                'Produto mineral'
-            ]
-        }
-        
-        df = pd.DataFrame(dados)
-        df.set_index('ncm', inplace=True)
-        return df
+        """Cria tabela NCM mock para testes (a partir de _NCM_MOCK)"""
+        df = pd.DataFrame(
+            {'descricao': [descricao for descricao, _ in _NCM_MOCK.values()]},
+            index=pd.Index(list(_NCM_MOCK), name='ncm')
+        )
+        return self._normalizar_indice(df)
     
     def _criar_tabela_cfop_mock(self) -> pd.DataFrame:
-        """Cria tabela CFOP mock para testes"""
-        dados = {
-            'cfop': [
-                '1101', '1102', '1201', '1202', '2101',
-                '2102', '2201', '2202', '3101', '3102'
-            ],
-            'descricao': [
-                'Compra para comercialização',
-                'Compra para industrialização',
-                'Venda de mercadoria',
-                'Venda de produto industrializado',
-                'Compra para uso',
-                'Compra para consumo',
-                'Venda de ativo imobilizado',
-                'Venda de mercadoria',
-                'Entrada de mercadoria',
-                'Saída de mercadoria'
-            ]
-        }
-        
-        df = pd.DataFrame(dados)
-        df.set_index('cfop', inplace=True)
-        return df
+        """Cria tabela CFOP mock para testes (a partir de _CFOP_MOCK)"""
+        df = pd.DataFrame(
+            {'descricao': [descricao for descricao, _ in _CFOP_MOCK.values()]},
+            index=pd.Index(list(_CFOP_MOCK), name='cfop')
+        )
+        return self._normalizar_indice(df)
 
 # Alias para compatibilidade
 TabelasFiscais = GerenciadorTabelasFiscais
 
 # Instância global do gerenciador
 _tabelas_fiscais_manager = None
+_tabelas_fiscais_lock = threading.Lock()
 
 def get_tabelas_fiscais_manager() -> GerenciadorTabelasFiscais:
     """Retorna instância global do gerenciador de tabelas fiscais"""
     global _tabelas_fiscais_manager
     if _tabelas_fiscais_manager is None:
-        _tabelas_fiscais_manager = GerenciadorTabelasFiscais()
+        with _tabelas_fiscais_lock:
+            if _tabelas_fiscais_manager is None:
+                _tabelas_fiscais_manager = GerenciadorTabelasFiscais()
     return _tabelas_fiscais_manager
 
 def inicializar_tabelas_fiscais(caminho_ncm: Optional[str] = None,
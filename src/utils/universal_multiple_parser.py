@@ -4,9 +4,13 @@ Parser universal que detecta automaticamente o tipo de documento fiscal
 e processa múltiplas notas quando aplicável
 """
 
-from typing import Dict, Any, Optional, Tuple, List, Union
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, List, Union
+from functools import lru_cache, partial
 from pathlib import Path
+import concurrent.futures
 import logging
+import os
+import threading
 
 from .xml_type_detector import XMLTypeDetector
 from .xml_parser import NFeXMLParser
@@ -24,16 +28,23 @@ class UniversalMultipleXMLParser:
     e processa múltiplas notas quando aplicável
     """
     
+    # Detector e parsers não guardam estado: compartilhados por todas as instâncias
+    type_detector = XMLTypeDetector()
+    parsers = {
+        'nfe': NFeXMLParserRobusto(),  # Usar parser robusto para NF-e
+        'nfse': NFeSEXMLParser(),  # Parser original para NFS-e única
+    }
+    multiple_parsers = {
+        'nfse': NFeSEMultipleParser(),  # Parser para múltiplas NFS-e
+    }
+    
     def __init__(self):
         """Inicializa o parser universal"""
-        self.type_detector = XMLTypeDetector()
-        self.parsers = {
-            'nfe': NFeXMLParserRobusto(),  # Usar parser robusto para NF-e
-            'nfse': NFeSEXMLParser(),  # Parser original para NFS-e única
-        }
-        self.multiple_parsers = {
-            'nfse': NFeSEMultipleParser(),  # Parser para múltiplas NFS-e
-        }
+        # tipo -> (parser, retorna_lista); parsers de múltiplas notas têm prioridade
+        self._dispatch_multiple = {t: (p, False) for t, p in self.parsers.items()}
+        self._dispatch_multiple.update({t: (p, True) for t, p in self.multiple_parsers.items()})
+        self._dispatch_single = {t: (p, False) for t, p in self.parsers.items()}
+        self._validate_file_cached = lru_cache(maxsize=256)(self._validate_file)
     
     def parse_file(self, xml_path: str, multiple: bool = True) -> Union[NFe, List[NFe], Tuple[NFe, str, str], Tuple[List[NFe], str, str]]:
         """
@@ -54,15 +65,69 @@ class UniversalMultipleXMLParser:
         # Detectar tipo do documento
         doc_type, description, metadata = self.type_detector.detect_type(str(xml_path))
         
+        return self._parse_detected(doc_type, description, multiple,
+                                    lambda parser: parser.parse_file(str(xml_path)))
+    
+    def iter_parse_file(self, xml_path: str) -> Iterator[NFe]:
+        """
+        Faz parsing de um arquivo XML produzindo as notas uma a uma
+        
+        Para parsers com leitura incremental (NFS-e múltiplas) o arquivo nunca
+        é carregado inteiro; para os demais, equivale a parse_file.
+        
+        Args:
+            xml_path: Caminho para o arquivo XML
+        
+        Yields:
+            Objetos NFe com tipo e descrição do documento preenchidos
+        """
+        xml_path = Path(xml_path)
+        if not xml_path.exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {xml_path}")
+        
+        doc_type, description, metadata = self.type_detector.detect_type(str(xml_path))
+        
+        entry = self._dispatch_multiple.get(doc_type)
+        if entry is not None and hasattr(entry[0], 'iter_parse_file'):
+            logger.info(f"Tipo detectado: {doc_type} - {description}")
+            for nfe in entry[0].iter_parse_file(str(xml_path)):
+                nfe.tipo_documento = doc_type
+                nfe.descricao_documento = description
+                yield nfe
+            return
+        
+        nfes, _, _ = self._parse_detected(doc_type, description, True,
+                                          lambda parser: parser.parse_file(str(xml_path)))
+        yield from nfes
+    
+    def _parse_detected(self, doc_type: str, description: str, multiple: bool,
+                        parse: Callable[[Any], Any]) -> Union[Tuple[NFe, str, str], Tuple[List[NFe], str, str]]:
+        """
+        Faz parsing com o parser do tipo já detectado
+        
+        Args:
+            doc_type: Tipo detectado
+            description: Descrição do tipo detectado
+            multiple: Se deve processar múltiplas notas quando possível
+            parse: Recebe o parser escolhido e executa o parsing (arquivo ou string)
+        
+        Returns:
+            Tuple (objeto_nfe ou lista_objetos_nfe, tipo_documento, descricao)
+        """
         logger.info(f"Tipo detectado: {doc_type} - {description}")
         
         if doc_type == 'unknown':
             raise ValueError(f"Tipo de documento não suportado: {description}")
         
-        # Verificar se tem suporte para múltiplas notas
-        if multiple and doc_type in self.multiple_parsers:
-            parser = self.multiple_parsers[doc_type]
-            nfes = parser.parse_file(str(xml_path))
+        # Uma única consulta escolhe o parser e se ele retorna várias notas
+        dispatch = self._dispatch_multiple if multiple else self._dispatch_single
+        entry = dispatch.get(doc_type)
+        if entry is None:
+            raise ValueError(f"Parser não disponível para tipo: {doc_type}")
+        parser, is_multiple = entry
+        
+        if is_multiple:
+            nfes = parse(parser)
             
             # Adicionar metadados sobre o tipo de documento
             for nfe in nfes:
@@ -71,21 +136,16 @@ class UniversalMultipleXMLParser:
             
             return nfes, doc_type, description
         
-        elif doc_type in self.parsers:
-            parser = self.parsers[doc_type]
-            nfe = parser.parse_file(str(xml_path))
-            
-            # Adicionar metadados sobre o tipo de documento
-            nfe.tipo_documento = doc_type
-            nfe.descricao_documento = description
-            
-            if multiple:
-                return [nfe], doc_type, description
-            else:
-                return nfe, doc_type, description
+        nfe = parse(parser)
+        
+        # Adicionar metadados sobre o tipo de documento
+        nfe.tipo_documento = doc_type
+        nfe.descricao_documento = description
         
+        if multiple:
+            return [nfe], doc_type, description
         else:
-            raise ValueError(f"Parser não disponível para tipo: {doc_type}")
+            return nfe, doc_type, description
     
     def parse_string(self, xml_content: str, multiple: bool = True) -> Union[NFe, List[NFe], Tuple[NFe, str, str], Tuple[List[NFe], str, str]]:
         """
@@ -99,17 +159,58 @@ class UniversalMultipleXMLParser:
             Se multiple=True: Lista de objetos NFe ou objeto único
             Se multiple=False: Tuple (objeto_nfe, tipo_documento, descricao)
         """
-        # Salvar conteúdo em arquivo temporário para detecção
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False, encoding='utf-8') as f:
-            f.write(xml_content)
-            temp_path = f.name
+        # Detectar e fazer parsing direto do conteúdo em memória
+        doc_type, description, metadata = self.type_detector.detect_type_string(xml_content)
         
-        try:
-            return self.parse_file(temp_path, multiple)
-        finally:
-            # Limpar arquivo temporário
-            Path(temp_path).unlink(missing_ok=True)
+        return self._parse_detected(doc_type, description, multiple,
+                                    lambda parser: parser.parse_string(xml_content))
+    
+    def parse_files(self, xml_paths: Iterable[str], workers: Optional[int] = None,
+                    multiple: bool = True) -> Iterator[Union[Tuple[NFe, str, str], Tuple[List[NFe], str, str]]]:
+        """
+        Faz parsing de vários arquivos XML em paralelo (um processo por núcleo)
+        
+        Cada processo reutiliza seu próprio parser compartilhado. Os resultados
+        são produzidos na mesma ordem de xml_paths; um arquivo que falha não
+        interrompe os demais.
+        
+        Args:
+            xml_paths: Caminhos dos arquivos XML
+            workers: Número de processos (padrão: número de CPUs)
+            multiple: Se deve processar múltiplas notas quando possível
+        
+        Yields:
+            Resultado de parse_file para cada arquivo, ou ([] / None, 'error',
+            mensagem) para arquivos que não puderam ser processados
+        """
+        xml_paths = [str(path) for path in xml_paths]
+        if not xml_paths:
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(xml_paths) // (workers * 4))
+        
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    initializer=_get_universal_parser) as executor:
+            yield from executor.map(partial(_parse_file_worker, multiple=multiple),
+                                    xml_paths, chunksize=chunksize)
+    
+    def parse_directory(self, root: str, pattern: str = '**/*.xml', workers: Optional[int] = None,
+                        multiple: bool = True) -> Iterator[Union[Tuple[NFe, str, str], Tuple[List[NFe], str, str]]]:
+        """
+        Faz parsing em paralelo de todos os XMLs de um diretório
+        
+        Args:
+            root: Diretório base
+            pattern: Padrão glob relativo a root
+            workers: Número de processos (padrão: número de CPUs)
+            multiple: Se deve processar múltiplas notas quando possível
+        
+        Yields:
+            Resultado de parse_file para cada arquivo, em ordem de caminho
+            (falhas como em parse_files)
+        """
+        return self.parse_files(sorted(Path(root).glob(pattern)), workers, multiple)
     
     def get_supported_types(self) -> Dict[str, str]:
         """
@@ -149,15 +250,55 @@ class UniversalMultipleXMLParser:
         """
         Valida XML e retorna informações sobre o tipo
         
+        O resultado é memorizado por (caminho, mtime, tamanho): validar de novo
+        um arquivo inalterado não relê nem refaz o parsing.
+        
+        Args:
+            xml_path: Caminho para o arquivo XML
+        
+        Returns:
+            Tuple (is_valid, error_message, document_type)
+        """
+        try:
+            st = os.stat(xml_path)
+        except OSError:
+            return self._validate_file(str(xml_path), None, None)
+        
+        return self._validate_file_cached(str(xml_path), st.st_mtime_ns, st.st_size)
+    
+    def _validate_file(self, xml_path: str, mtime_ns: Optional[int], size: Optional[int]) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Lê o arquivo uma única vez e valida o conteúdo
+        
         Args:
             xml_path: Caminho para o arquivo XML
+            mtime_ns: mtime do arquivo (apenas chave do cache)
+            size: Tamanho do arquivo (apenas chave do cache)
+        
+        Returns:
+            Tuple (is_valid, error_message, document_type)
+        """
+        try:
+            with open(xml_path, 'r', encoding='utf-8') as f:
+                xml_content = f.read()
+        except Exception as e:
+            return False, f"Tipo de documento não suportado: Erro na detecção: {str(e)}", None
+        
+        return self.validate_string(xml_content)
+    
+    def validate_string(self, xml_content: str) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Valida conteúdo XML e retorna informações sobre o tipo
+        
+        Args:
+            xml_content: Conteúdo XML como string
         
         Returns:
             Tuple (is_valid, error_message, document_type)
         """
         try:
             # Detectar tipo primeiro
-            doc_type, description, metadata = self.type_detector.detect_type(xml_path)
+            doc_type, description, metadata = self.type_detector.detect_type_string(xml_content)
             
             if doc_type == 'unknown':
                 return False, f"Tipo de documento não suportado: {description}", None
@@ -171,16 +312,13 @@ class UniversalMultipleXMLParser:
             else:
                 parser = self.multiple_parsers[doc_type]
             
-            # Verificar se parser tem método validate_xml
-            if hasattr(parser, 'validate_xml'):
-                is_valid, error_message = parser.validate_xml(xml_path)
+            # Verificar se parser tem método validate_string
+            if hasattr(parser, 'validate_string'):
+                is_valid, error_message = parser.validate_string(xml_content)
             else:
                 # Tentar fazer parsing para validar
                 try:
-                    if doc_type in self.multiple_parsers:
-                        parser.parse_file(xml_path)
-                    else:
-                        parser.parse_file(xml_path)
+                    parser.parse_string(xml_content)
                     is_valid, error_message = True, None
                 except Exception as e:
                     is_valid, error_message = False, str(e)
@@ -191,6 +329,35 @@ class UniversalMultipleXMLParser:
             return False, f"Erro na validação: {str(e)}", None
 
 
+# Instância compartilhada pelas funções de conveniência
+_UNIVERSAL_PARSER: Optional[UniversalMultipleXMLParser] = None
+_UNIVERSAL_PARSER_LOCK = threading.Lock()
+
+
+def _get_universal_parser() -> UniversalMultipleXMLParser:
+    """Retorna o parser universal compartilhado, criando-o na primeira chamada"""
+    global _UNIVERSAL_PARSER
+    if _UNIVERSAL_PARSER is None:
+        with _UNIVERSAL_PARSER_LOCK:
+            if _UNIVERSAL_PARSER is None:
+                _UNIVERSAL_PARSER = UniversalMultipleXMLParser()
+    return _UNIVERSAL_PARSER
+
+
+def _parse_file_worker(xml_path: str, multiple: bool) -> Union[Tuple[Optional[NFe], str, str], Tuple[List[NFe], str, str]]:
+    """
+    Executado nos processos de parse_files com o parser do processo
+    
+    Falhas de um arquivo não interrompem o lote: viram o resultado
+    ([] ou None, 'error', mensagem) na posição do arquivo.
+    """
+    try:
+        return _get_universal_parser().parse_file(xml_path, multiple)
+    except Exception as e:
+        logger.warning(f"Erro ao processar {xml_path}: {e}")
+        return ([] if multiple else None), 'error', f"Erro ao processar {xml_path}: {e}"
+
+
 # Funções de conveniência
 def parse_fiscal_xml_multiple(xml_path: str) -> Tuple[List[NFe], str, str]:
     """
@@ -202,8 +369,7 @@ def parse_fiscal_xml_multiple(xml_path: str) -> Tuple[List[NFe], str, str]:
     Returns:
         Tuple (lista_objetos_nfe, tipo_documento, descricao)
     """
-    parser = UniversalMultipleXMLParser()
-    return parser.parse_file(xml_path, multiple=True)
+    return _get_universal_parser().parse_file(xml_path, multiple=True)
 
 
 def parse_fiscal_xml_single(xml_path: str) -> Tuple[NFe, str, str]:
@@ -216,5 +382,4 @@ def parse_fiscal_xml_single(xml_path: str) -> Tuple[NFe, str, str]:
     Returns:
         Tuple (objeto_nfe, tipo_documento, descricao)
     """
-    parser = UniversalMultipleXMLParser()
-    return parser.parse_file(xml_path, multiple=False)
+    return _get_universal_parser().parse_file(xml_path, multiple=False)
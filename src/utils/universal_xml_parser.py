@@ -7,6 +7,7 @@ e usa o parser apropriado
 from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 import logging
+import threading
 
 from .xml_type_detector import XMLTypeDetector
 from .xml_parser import NFeXMLParser
@@ -53,16 +54,7 @@ class UniversalXMLParser:
         # Detectar tipo do documento
         doc_type, description, metadata = self.type_detector.detect_type(str(xml_path))
         
-        logger.info(f"Tipo detectado: {doc_type} - {description}")
-        
-        if doc_type == 'unknown':
-            raise ValueError(f"Tipo de documento não suportado: {description}")
-        
-        if doc_type not in self.parsers:
-            raise ValueError(f"Parser não disponível para tipo: {doc_type}")
-        
-        # Usar parser apropriado
-        parser = self.parsers[doc_type]
+        parser = self._select_parser(doc_type, description)
         nfe = parser.parse_file(str(xml_path))
         
         # Adicionar metadados sobre o tipo de documento
@@ -84,17 +76,41 @@ class UniversalXMLParser:
         Raises:
             ValueError: Se XML for inválido ou tipo não suportado
         """
-        # Salvar conteúdo em arquivo temporário para detecção
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False, encoding='utf-8') as f:
-            f.write(xml_content)
-            temp_path = f.name
+        # Detectar e fazer parsing direto do conteúdo em memória
+        doc_type, description, metadata = self.type_detector.detect_type_string(xml_content)
         
-        try:
-            return self.parse_file(temp_path)
-        finally:
-            # Limpar arquivo temporário
-            Path(temp_path).unlink(missing_ok=True)
+        parser = self._select_parser(doc_type, description)
+        nfe = parser.parse_string(xml_content)
+        
+        # Adicionar metadados sobre o tipo de documento
+        nfe.tipo_documento = doc_type
+        nfe.descricao_documento = description
+        
+        return nfe, doc_type, description
+    
+    def _select_parser(self, doc_type: str, description: str):
+        """
+        Seleciona o parser para o tipo detectado
+        
+        Args:
+            doc_type: Tipo detectado
+            description: Descrição do tipo detectado
+        
+        Returns:
+            Parser do tipo
+        
+        Raises:
+            ValueError: Se tipo não suportado ou sem parser
+        """
+        logger.info(f"Tipo detectado: {doc_type} - {description}")
+        
+        if doc_type == 'unknown':
+            raise ValueError(f"Tipo de documento não suportado: {description}")
+        
+        if doc_type not in self.parsers:
+            raise ValueError(f"Parser não disponível para tipo: {doc_type}")
+        
+        return self.parsers[doc_type]
     
     def get_supported_types(self) -> Dict[str, str]:
         """
@@ -147,6 +163,21 @@ class UniversalXMLParser:
             return False, f"Erro na validação: {str(e)}", None
 
 
+# Instância compartilhada pela função de conveniência
+_UNIVERSAL_PARSER: Optional[UniversalXMLParser] = None
+_UNIVERSAL_PARSER_LOCK = threading.Lock()
+
+
+def _get_universal_parser() -> UniversalXMLParser:
+    """Retorna o parser universal compartilhado, criando-o na primeira chamada"""
+    global _UNIVERSAL_PARSER
+    if _UNIVERSAL_PARSER is None:
+        with _UNIVERSAL_PARSER_LOCK:
+            if _UNIVERSAL_PARSER is None:
+                _UNIVERSAL_PARSER = UniversalXMLParser()
+    return _UNIVERSAL_PARSER
+
+
 # Função de conveniência
 def parse_fiscal_xml(xml_path: str) -> Tuple[NFe, str, str]:
     """
@@ -158,5 +189,4 @@ def parse_fiscal_xml(xml_path: str) -> Tuple[NFe, str, str]:
     Returns:
         Tuple (objeto_nfe, tipo_documento, descricao)
     """
-    parser = UniversalXMLParser()
-    return parser.parse_file(xml_path)
+    return _get_universal_parser().parse_file(xml_path)
@@ -3,18 +3,114 @@ FiscalAI MVP - Upload Handler para Arquivos Grandes
 Sistema otimizado para upload e processamento de arquivos XML grandes
 """
 
+import io
+import mmap
 import os
+import re
+import sys
 import tempfile
+import time
 import shutil
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
+import chardet  # pyright: ignore[reportMissingImports]
+import lxml.etree as ET
+import pandas as pd
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 import logging
 from datetime import datetime
+from functools import lru_cache
+
+from .csv_encoding_detector import detect_csv_encoding
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Arquivos abaixo deste tamanho não passam pela otimização
+OPTIMIZE_MIN_BYTES = 5 * 1024 * 1024
+
+# Intervalo mínimo (segundos) entre atualizações da barra de progresso
+PROGRESS_UPDATE_INTERVAL = 0.05
+
+# Caracteres permitidos no nome do arquivo temporário
+_UNSAFE_FILENAME_RE = re.compile(r'[^A-Za-z0-9._-]')
+
+# chardet converge em poucos KB; amostra limitada mantém a detecção O(1)
+CHARDET_SAMPLE_BYTES = 64 * 1024
+
+# Valores que pd.read_csv trata como nulos por padrão (o preview Arrow usa os mesmos)
+_PANDAS_NA_VALUES = (
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+)
+
+# Colunas de interesse fiscal (nome contém alguma das palavras-chave)
+FISCAL_KEYWORDS = ('cnpj', 'cpf', 'ncm', 'cfop', 'valor', 'quantidade', 'preco', 'total', 'imposto', 'icms', 'ipi', 'pis', 'cofins')
+FISCAL_RE = re.compile('|'.join(FISCAL_KEYWORDS), re.I)
+
+# Encodings tentados quando a confiança do chardet é baixa
+FALLBACK_ENCODINGS = ('utf-8', 'latin-1', 'cp1252', 'iso-8859-1')
+
+# Otimização textual (fallback para XML que o libxml2 não consegue ler)
+_COMMENT_RE = re.compile(rb'<!--.*?-->', re.DOTALL)
+_WS_RE = re.compile(rb'[ \t\r]*\n\s*')
+
+
+class _XMLNotStreamable(Exception):
+    """XML que a reescrita em streaming não reproduz fielmente (ex.: DTD interno)"""
+
+
+def _get_upload_size(uploaded_file) -> int:
+    """
+    Obtém o tamanho do arquivo enviado sem copiar seu conteúdo
+    
+    Args:
+        uploaded_file: Arquivo enviado pelo Streamlit
+    
+    Returns:
+        Tamanho em bytes
+    """
+    size = getattr(uploaded_file, 'size', None)
+    if size is not None:
+        return size
+    
+    position = uploaded_file.tell()
+    uploaded_file.seek(0, os.SEEK_END)
+    size = uploaded_file.tell()
+    uploaded_file.seek(position)
+    return size
+
+
+class _ProgressReader:
+    """Repassa read() ao arquivo enviado, atualizando a barra de progresso"""
+    
+    def __init__(self, source, total: int, progress_bar, status_text):
+        self._source = source
+        self._total = total or 1
+        self._progress_bar = progress_bar
+        self._status_text = status_text
+        self._bytes_read = 0
+        self._last_update = time.monotonic()
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self._source.read(size)
+        self._bytes_read += len(data)
+        
+        # Atualizações limitadas por tempo, como no upload simples
+        now = time.monotonic()
+        if now - self._last_update > PROGRESS_UPDATE_INTERVAL:
+            self._last_update = now
+            self._progress_bar.progress(min(self._bytes_read / self._total, 1.0))
+            self._status_text.text(f"Upload: {self._bytes_read // 1024}KB / {self._total // 1024}KB")
+        return data
+
 
 class UploadHandler:
     """
@@ -35,69 +131,223 @@ class UploadHandler:
     
     def handle_large_file_upload(self, 
                                 uploaded_file, 
-                                chunk_size: int = 8192) -> Tuple[bool, str, Optional[str]]:
+                                chunk_size: int = 1024 * 1024) -> Tuple[bool, str, Optional[str]]:
         """
         Processa upload de arquivo grande com streaming
         
         Args:
             uploaded_file: Arquivo enviado pelo Streamlit
-            chunk_size: Tamanho do chunk para leitura (padrão: 8KB)
+            chunk_size: Tamanho do chunk para leitura (padrão: 1MB)
         
         Returns:
             Tuple (sucesso, mensagem, caminho_arquivo)
         """
         try:
             # Verificar tamanho
-            file_size = len(uploaded_file.getvalue())
+            file_size = _get_upload_size(uploaded_file)
             
             if file_size > self.max_size_bytes:
                 return False, f"Arquivo muito grande. Máximo permitido: {self.max_size_bytes // (1024*1024)}MB", None
             
-            # Gerar nome único com validação de segurança
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Validar e sanitizar nome do arquivo
-            original_name = uploaded_file.name
-            if not original_name or '..' in original_name or '/' in original_name or '\\' in original_name:
-                raise ValueError("Nome de arquivo inválido - contém caracteres perigosos")
-            
-            # Usar apenas nome base do arquivo (sem path)
-            import os
-            safe_filename = os.path.basename(original_name)
-            filename = f"nfe_{timestamp}_{safe_filename}"
-            temp_path = self.temp_dir / filename
+            fd, temp_path = self._create_temp_file(uploaded_file)
+            filename = os.path.basename(temp_path)
             
             # Upload com progress bar
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            # Escrever arquivo em chunks
-            with open(temp_path, 'wb') as f:
-                uploaded_file.seek(0)  # Voltar ao início
-                
-                bytes_written = 0
-                while True:
-                    chunk = uploaded_file.read(chunk_size)
-                    if not chunk:
-                        break
-                    
-                    f.write(chunk)
-                    bytes_written += len(chunk)
-                    
-                    # Atualizar progress bar
-                    progress = bytes_written / file_size
-                    progress_bar.progress(progress)
-                    status_text.text(f"Upload: {bytes_written // 1024}KB / {file_size // 1024}KB")
+            try:
+                with os.fdopen(fd, 'wb', buffering=1024 * 1024) as f:
+                    uploaded_file.seek(0)  # Voltar ao início
+                    self._copy_upload(uploaded_file, f, file_size, chunk_size, progress_bar, status_text)
+            except Exception:
+                os.unlink(temp_path)
+                raise
             
             progress_bar.empty()
             status_text.empty()
             
-            return True, f"Arquivo salvo: {filename}", str(temp_path)
+            return True, f"Arquivo salvo: {filename}", temp_path
+            
+        except Exception as e:
+            logger.error(f"Erro no upload: {e}")
+            return False, f"Erro no upload: {str(e)}", None
+    
+    def handle_and_optimize(self, uploaded_file) -> Tuple[bool, str, Optional[str]]:
+        """
+        Processa upload gravando o XML já otimizado em uma única passada
+        
+        O conteúdo enviado é lido direto pelo iterparse e escrito otimizado no
+        arquivo temporário, sem gravar o original e relê-lo para otimizar.
+        Se a otimização falhar, o conteúdo original é gravado sem otimização.
+        Arquivos pequenos seguem o upload simples.
+        
+        Args:
+            uploaded_file: Arquivo enviado pelo Streamlit
+        
+        Returns:
+            Tuple (sucesso, mensagem, caminho_arquivo)
+        """
+        try:
+            file_size = _get_upload_size(uploaded_file)
+            
+            if file_size > self.max_size_bytes:
+                return False, f"Arquivo muito grande. Máximo permitido: {self.max_size_bytes // (1024*1024)}MB", None
+            
+            # Se arquivo é pequeno, não precisa otimizar
+            if file_size < OPTIMIZE_MIN_BYTES:
+                return self.handle_large_file_upload(uploaded_file)
+            
+            fd, temp_path = self._create_temp_file(uploaded_file)
+            os.close(fd)
+            filename = os.path.basename(temp_path)
+            
+            # Upload com progress bar
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            
+            try:
+                try:
+                    uploaded_file.seek(0)  # Voltar ao início
+                    self._write_optimized_upload(uploaded_file, temp_path, file_size, progress_bar, status_text)
+                    message = f"Arquivo salvo e otimizado: {filename}"
+                except Exception as e:
+                    # Otimização é opcional: segue com o arquivo original
+                    logger.warning(f"Otimização falhou, salvando arquivo original: {e}")
+                    uploaded_file.seek(0)
+                    out_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(out_fd, 'wb', buffering=1024 * 1024) as f:
+                        self._copy_upload(uploaded_file, f, file_size, 1024 * 1024, progress_bar, status_text)
+                    message = f"Arquivo salvo sem otimização: {filename}"
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            finally:
+                progress_bar.empty()
+                status_text.empty()
+            
+            return True, message, temp_path
             
         except Exception as e:
             logger.error(f"Erro no upload: {e}")
             return False, f"Erro no upload: {str(e)}", None
     
+    def _write_optimized_upload(self, uploaded_file, temp_path: str, file_size: int,
+                                progress_bar, status_text) -> None:
+        """
+        Grava o upload otimizado, com fallback textual para XML malformado
+        
+        Args:
+            uploaded_file: Arquivo enviado (posicionado no início)
+            temp_path: Arquivo de destino
+            file_size: Tamanho total em bytes
+            progress_bar: Barra de progresso do Streamlit
+            status_text: Placeholder de status do Streamlit
+        """
+        try:
+            source = _ProgressReader(uploaded_file, file_size, progress_bar, status_text)
+            self._stream_optimized_xml(source, temp_path)
+        except (ET.XMLSyntaxError, _XMLNotStreamable) as e:
+            logger.warning(f"XML não reescrito em streaming, otimizando como texto: {e}")
+            uploaded_file.seek(0)
+            content = uploaded_file.getbuffer() if hasattr(uploaded_file, 'getbuffer') else uploaded_file.read()
+            out_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(out_fd, 'wb', buffering=1024 * 1024) as f_out:
+                f_out.write(self._optimize_xml_content(content))
+        progress_bar.progress(1.0)
+    
+    def _create_temp_file(self, uploaded_file) -> Tuple[int, str]:
+        """
+        Cria o arquivo temporário de destino do upload
+        
+        Args:
+            uploaded_file: Arquivo enviado pelo Streamlit
+        
+        Returns:
+            Tuple (descritor_aberto, caminho_arquivo)
+        """
+        # Sanitizar nome do arquivo: apenas nome base, sem caracteres de caminho
+        original_name = getattr(uploaded_file, 'name', None) or 'upload.xml'
+        safe_filename = _UNSAFE_FILENAME_RE.sub('_', os.path.basename(original_name))[:128]
+        
+        # Nome único criado atomicamente (sem colisão entre uploads simultâneos)
+        return tempfile.mkstemp(prefix='nfe_', suffix=f"_{safe_filename}", dir=self.temp_dir)
+    
+    def _copy_upload(self, uploaded_file, f, file_size: int, chunk_size: int,
+                     progress_bar, status_text) -> None:
+        """
+        Copia o conteúdo do upload para o arquivo de destino
+        
+        Usa escrita única do buffer em memória (BytesIO/UploadedFile) ou
+        os.sendfile para arquivos em disco; o loop em chunks fica apenas
+        para fontes de streaming.
+        
+        Args:
+            uploaded_file: Arquivo enviado (posicionado no início)
+            f: Arquivo de destino aberto em modo binário
+            file_size: Tamanho total em bytes
+            chunk_size: Tamanho do chunk para o loop de streaming
+            progress_bar: Barra de progresso do Streamlit
+            status_text: Placeholder de status do Streamlit
+        """
+        # Upload em memória: uma única escrita do memoryview, sem cópias
+        if hasattr(uploaded_file, 'getbuffer'):
+            with uploaded_file.getbuffer() as view:
+                f.write(view)
+            progress_bar.progress(1.0)
+            return
+        
+        # Arquivo em disco: cópia feita pelo kernel
+        try:
+            source_fd = uploaded_file.fileno()
+        except (AttributeError, OSError):
+            source_fd = None
+        
+        # sendfile para arquivo regular de destino só é garantido no Linux
+        if source_fd is not None and sys.platform.startswith('linux'):
+            f.flush()
+            offset = 0
+            try:
+                while offset < file_size:
+                    sent = os.sendfile(f.fileno(), source_fd, offset, file_size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+            except OSError as e:
+                # Sistema de arquivos sem suporte: continua a cópia de onde parou
+                logger.debug(f"sendfile falhou, copiando em chunks: {e}")
+                f.seek(offset)
+                uploaded_file.seek(offset)
+                shutil.copyfileobj(uploaded_file, f, chunk_size)
+            progress_bar.progress(1.0)
+            return
+        
+        # Streaming: escrever em chunks
+        # Buffer reaproveitado entre leituras (sem criar bytes por chunk)
+        buffer = memoryview(bytearray(chunk_size))
+        
+        bytes_written = 0
+        # Atualizações da barra limitadas por tempo (~20 por segundo), independente do chunk
+        last_update = time.monotonic()
+        while True:
+            n = uploaded_file.readinto(buffer)
+            if not n:
+                break
+            
+            f.write(buffer[:n])
+            bytes_written += n
+            
+            # Atualizar progress bar
+            now = time.monotonic()
+            if now - last_update > PROGRESS_UPDATE_INTERVAL:
+                last_update = now
+                progress_bar.progress(min(bytes_written / file_size, 1.0))
+                status_text.text(f"Upload: {bytes_written // 1024}KB / {file_size // 1024}KB")
+        
+        progress_bar.progress(1.0)
+        status_text.text(f"Upload: {bytes_written // 1024}KB / {file_size // 1024}KB")
+    
     def optimize_xml_for_processing(self, xml_path: str) -> Tuple[bool, str, Optional[str]]:
         """
         Otimiza XML grande para processamento
@@ -109,57 +359,132 @@ class UploadHandler:
             Tuple (sucesso, mensagem, caminho_otimizado)
         """
         try:
-            xml_path = Path(xml_path)
-            if not xml_path.exists():
+            xml_path = os.fspath(xml_path)
+            try:
+                file_size = os.stat(xml_path).st_size
+            except FileNotFoundError:
                 return False, "Arquivo não encontrado", None
             
-            file_size = xml_path.stat().st_size
-            
             # Se arquivo é pequeno (< 5MB), não precisa otimizar
-            if file_size < 5 * 1024 * 1024:
-                return True, "Arquivo não precisa de otimização", str(xml_path)
+            if file_size < OPTIMIZE_MIN_BYTES:
+                return True, "Arquivo não precisa de otimização", xml_path
             
             # Criar versão otimizada
-            optimized_path = xml_path.parent / f"optimized_{xml_path.name}"
+            directory, name = os.path.split(xml_path)
+            optimized_name = f"optimized_{name}"
+            optimized_path = os.path.join(directory, optimized_name)
             
             with st.spinner("Otimizando arquivo XML..."):
-                # Ler e reescrever XML (remove espaços desnecessários)
-                with open(xml_path, 'r', encoding='utf-8') as f_in:
-                    content = f_in.read()
-                
-                # Otimizações básicas
-                optimized_content = self._optimize_xml_content(content)
-                
-                with open(optimized_path, 'w', encoding='utf-8') as f_out:
-                    f_out.write(optimized_content)
+                try:
+                    # Reescrever XML em streaming (remove espaços e comentários)
+                    self._stream_optimized_xml(xml_path, optimized_path)
+                except (ET.XMLSyntaxError, _XMLNotStreamable) as e:
+                    logger.warning(f"XML não reescrito em streaming, otimizando como texto: {e}")
+                    # Regex direto sobre o arquivo mapeado (sem cópia nem decode)
+                    with open(xml_path, 'rb') as f_in, \
+                            mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                        optimized_content = self._optimize_xml_content(content)
+                    
+                    with open(optimized_path, 'wb', buffering=1024 * 1024) as f_out:
+                        f_out.write(optimized_content)
             
-            return True, f"Arquivo otimizado: {optimized_path.name}", str(optimized_path)
+            return True, f"Arquivo otimizado: {optimized_name}", optimized_path
             
         except Exception as e:
             logger.error(f"Erro na otimização: {e}")
             return False, f"Erro na otimização: {str(e)}", None
     
-    def _optimize_xml_content(self, content: str) -> str:
+    def _stream_optimized_xml(self, source, destination: str) -> None:
+        """
+        Reescreve o XML elemento a elemento, sem carregar o documento inteiro
+        
+        Espaços em branco entre elementos e comentários são descartados pelo
+        próprio libxml2; textos (inclusive o texto da raiz antes do primeiro
+        filho), DOCTYPE e instruções de processamento fora da raiz são
+        mantidos. Cada filho direto da raiz é gravado e liberado assim que termina.
+        
+        Args:
+            source: Caminho ou arquivo aberto (binário) do XML original
+            destination: Caminho do XML otimizado
+        
+        Raises:
+            _XMLNotStreamable: DOCTYPE com subconjunto interno, que não seria
+                reproduzido (use a otimização textual)
+        """
+        events = ET.iterparse(
+            source,
+            events=('start', 'end'),
+            remove_blank_text=True,
+            remove_comments=True,
+            huge_tree=True,
+            resolve_entities=False,
+            no_network=True
+        )
+        
+        try:
+            _, root = next(events)
+            docinfo = root.getroottree().docinfo
+            dtd = docinfo.internalDTD
+            # docinfo.doctype não traz as declarações internas ([<!ENTITY ...>])
+            if dtd is not None and (next(dtd.iterelements(), None) is not None
+                                    or next(dtd.iterentities(), None) is not None):
+                raise _XMLNotStreamable("DOCTYPE com subconjunto interno")
+            
+            with ET.xmlfile(destination, encoding='utf-8') as xf:
+                xf.write_declaration()
+                if docinfo.doctype:
+                    xf.write_doctype(docinfo.doctype)
+                # Instruções de processamento antes da raiz, em ordem de documento
+                for node in reversed(list(root.itersiblings(preceding=True))):
+                    xf.write(node)
+                
+                with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+                    depth = 0
+                    root_text_written = False
+                    for event, elem in events:
+                        if event == 'start':
+                            # Texto da raiz já lido por completo ao começar o primeiro filho
+                            if depth == 0 and not root_text_written:
+                                if root.text:
+                                    xf.write(root.text)
+                                root_text_written = True
+                            depth += 1
+                            continue
+                        
+                        depth -= 1
+                        if depth == 0:
+                            # Inclui o texto após o elemento (tail)
+                            xf.write(elem)
+                            elem.clear()
+                            while elem.getprevious() is not None:
+                                del elem.getparent()[0]
+                        elif depth < 0 and not root_text_written and root.text:
+                            # Raiz sem filhos
+                            xf.write(root.text)
+            
+            # Instruções de processamento após a raiz (o xmlfile não aceita
+            # conteúdo depois do elemento raiz fechado)
+            trailing = [ET.tostring(node) for node in root.itersiblings()]
+            if trailing:
+                with open(destination, 'ab') as f_out:
+                    f_out.write(b''.join(trailing))
+        except Exception:
+            if os.path.exists(destination):
+                os.unlink(destination)
+            raise
+    
+    def _optimize_xml_content(self, content) -> bytes:
         """
         Otimiza conteúdo XML
         
         Args:
-            content: Conteúdo XML original
+            content: Conteúdo XML original (bytes, mmap ou outro objeto bytes-like)
         
         Returns:
             Conteúdo XML otimizado
         """
-        # Remover comentários desnecessários
-        lines = content.split('\n')
-        optimized_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            # Pular linhas vazias e comentários
-            if line and not line.startswith('<!--'):
-                optimized_lines.append(line)
-        
-        return '\n'.join(optimized_lines)
+        # Remover comentários (inclusive os de várias linhas), linhas vazias e indentação
+        return _WS_RE.sub(b'\n', _COMMENT_RE.sub(b'', content)).strip()
     
     def cleanup_temp_files(self, max_age_hours: int = 24):
         """
@@ -169,7 +494,7 @@ class UploadHandler:
             max_age_hours: Idade máxima em horas (padrão: 24h)
         """
         try:
-            current_time = datetime.now().timestamp()
+            current_time = time.time()
             max_age_seconds = max_age_hours * 3600
             cleaned_count = 0
             
@@ -177,25 +502,24 @@ class UploadHandler:
             if not self.temp_dir.exists():
                 return
             
-            for file_path in self.temp_dir.glob("*"):
-                try:
-                    if file_path.is_file():
+            with os.scandir(self.temp_dir) as entries:
+                for entry in entries:
+                    try:
                         # Verificar se arquivo é do FiscalAI (segurança extra)
-                        if not file_path.name.startswith(('nfe_', 'optimized_')):
+                        if not entry.name.startswith(('nfe_', 'optimized_')):
                             continue
-                            
-                        file_age = current_time - file_path.stat().st_mtime
+                        
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        
+                        file_age = current_time - entry.stat(follow_symlinks=False).st_mtime
                         if file_age > max_age_seconds:
-                            # Sobrescrever arquivo antes de deletar (segurança)
-                            with open(file_path, 'wb') as f:
-                                f.write(b'0' * file_path.stat().st_size)
-                            
-                            file_path.unlink()
+                            os.unlink(entry.path)
                             cleaned_count += 1
-                            logger.info(f"Arquivo temporário removido: {file_path.name}")
-                except (OSError, PermissionError) as e:
-                    logger.warning(f"Não foi possível remover {file_path.name}: {e}")
-                    continue
+                            logger.info(f"Arquivo temporário removido: {entry.name}")
+                    except (OSError, PermissionError) as e:
+                        logger.warning(f"Não foi possível remover {entry.name}: {e}")
+                        continue
             
             if cleaned_count > 0:
                 logger.info(f"Limpeza concluída: {cleaned_count} arquivos removidos")
@@ -214,23 +538,117 @@ class UploadHandler:
             Dict com informações do arquivo
         """
         try:
-            path = Path(file_path)
-            if not path.exists():
-                return {"error": "Arquivo não encontrado"}
-            
-            stat = path.stat()
-            
-            return {
-                "name": path.name,
-                "size_bytes": stat.st_size,
-                "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "extension": path.suffix.lower()
-            }
-        
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return {"error": "Arquivo não encontrado"}
         except Exception as e:
             return {"error": str(e)}
+        
+        # Cópia para que o chamador não altere a entrada do cache
+        return dict(_get_file_info_cached(file_path, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size))
+
+
+@lru_cache(maxsize=256)
+def _get_file_info_cached(file_path: str, mtime_ns: int, ctime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    Monta as informações do arquivo (memoizado por caminho, mtime e tamanho)
+    
+    Args:
+        file_path: Caminho para o arquivo
+        mtime_ns: Data de modificação em nanossegundos
+        ctime_ns: Data de criação/alteração de metadados em nanossegundos
+        size: Tamanho em bytes
+    
+    Returns:
+        Dict com informações do arquivo
+    """
+    path = Path(file_path)
+    
+    return {
+        "name": path.name,
+        "size_bytes": size,
+        "size_mb": round(size / (1024 * 1024), 2),
+        "created": datetime.fromtimestamp(ctime_ns / 1e9).isoformat(),
+        "modified": datetime.fromtimestamp(mtime_ns / 1e9).isoformat(),
+        "extension": path.suffix.lower()
+    }
+
+
+def _read_csv_preview(csv_bytes: bytes, encoding: Optional[str], nrows: int) -> pd.DataFrame:
+    """
+    Lê as primeiras linhas de um CSV para preview
+    
+    Com pyarrow disponível, lê apenas o primeiro bloco via leitor de streaming
+    do Arrow, com as mesmas regras de nulos e booleanos do pd.read_csv e sem
+    converter datas/horas (o pandas as mantém como texto). Qualquer falha,
+    texto que não decodifica ou colunas repetidas caem no pandas.
+    
+    Args:
+        csv_bytes: Conteúdo do arquivo CSV
+        encoding: Codificação a usar
+        nrows: Número de linhas do preview
+    
+    Returns:
+        DataFrame com as primeiras linhas
+    
+    Raises:
+        UnicodeDecodeError: Se o conteúdo não puder ser lido com a codificação
+    """
+    if PYARROW_AVAILABLE:
+        try:
+            batch = _read_arrow_batch(csv_bytes, encoding)
+            temporal = {field.name: pa.string() for field in batch.schema if pa.types.is_temporal(field.type)}
+            if temporal:
+                batch = _read_arrow_batch(csv_bytes, encoding, temporal)
+            
+            names = batch.schema.names
+            # Colunas binárias indicam bytes que não decodificaram como texto
+            if len(set(names)) == len(names) and not any(pa.types.is_binary(field.type) for field in batch.schema):
+                return batch.slice(0, nrows).to_pandas()
+        except (pa.ArrowException, LookupError, StopIteration):
+            pass
+    
+    return pd.read_csv(io.BytesIO(csv_bytes), encoding=encoding, nrows=nrows)
+
+
+def _read_arrow_batch(csv_bytes: bytes, encoding: Optional[str], column_types: Optional[Dict] = None):
+    """
+    Lê o primeiro bloco de um CSV com o leitor de streaming do Arrow
+    
+    Args:
+        csv_bytes: Conteúdo do arquivo CSV
+        encoding: Codificação a usar
+        column_types: Tipos forçados por coluna
+    
+    Returns:
+        RecordBatch com as primeiras linhas
+    """
+    reader = pacsv.open_csv(
+        pa.BufferReader(csv_bytes),
+        read_options=pacsv.ReadOptions(block_size=64 * 1024, encoding=encoding or 'utf8'),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            null_values=list(_PANDAS_NA_VALUES),
+            strings_can_be_null=True,
+            true_values=['True', 'TRUE', 'true'],
+            false_values=['False', 'FALSE', 'false'],
+            timestamp_parsers=[]
+        )
+    )
+    return reader.read_next_batch()
+
+
+def _bullet_list(items) -> str:
+    """
+    Monta uma lista markdown para ser enviada em um único st.markdown
+    
+    Args:
+        items: Itens da lista
+    
+    Returns:
+        Lista em markdown (um item por linha)
+    """
+    return "\n".join(f"- {item}" for item in items)
 
 
 def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Optional[UploadedFile]:
@@ -284,29 +702,34 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
             valid_files = []
             total_size = 0
             
-            for i, file in enumerate(uploaded_files):
+            first_bytes = None
+            
+            # Uma passada por arquivo: valida tamanho, lê os bytes uma vez e mostra o preview
+            for file in uploaded_files:
+                file_size_mb = _get_upload_size(file) / (1024 * 1024)
+                total_size += file_size_mb
+                
+                if file_size_mb > max_size_mb:
+                    st.error(f"❌ Arquivo {file.name} muito grande! Máximo permitido: {max_size_mb}MB")
+                    continue
+                
+                # Bytes do arquivo materializados uma única vez
+                csv_bytes = file.getvalue()
+                
                 with st.expander(f"📄 {file.name} ({file.size:,} bytes)"):
                     try:
-                        # Detectar encoding
-                        import chardet
-                        import pandas as pd
-                        
-                        # Ler uma amostra do arquivo para detectar encoding
-                        file.seek(0)
-                        sample = file.read(1024)
-                        file.seek(0)
-                        
-                        result = chardet.detect(sample)
+                        # Detectar encoding a partir de uma amostra
+                        result = chardet.detect(csv_bytes[:4096])
                         encoding = result['encoding']
                         confidence = result['confidence']
                         
                         # Tentar ler com encoding detectado
                         try:
-                            df = pd.read_csv(file, encoding=encoding, nrows=5)
+                            df = _read_csv_preview(csv_bytes, encoding, nrows=5)
                             st.success(f"✅ Encoding detectado: {encoding} (confiança: {confidence:.1%})")
                         except:
                             # Fallback para UTF-8
-                            df = pd.read_csv(file, encoding='utf-8', nrows=5)
+                            df = _read_csv_preview(csv_bytes, 'utf-8', nrows=5)
                             st.warning(f"⚠️ Usando UTF-8 (encoding {encoding} falhou)")
                         
                         # Mostrar preview
@@ -314,28 +737,19 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
                         st.dataframe(df, use_container_width=True)
                         
                         # Detectar colunas de interesse fiscal
-                        fiscal_keywords = ['cnpj', 'cpf', 'ncm', 'cfop', 'valor', 'quantidade', 'preco', 'total', 'imposto', 'icms', 'ipi', 'pis', 'cofins']
-                        potential_fiscal_cols = [col for col in df.columns if any(keyword in col.lower() for keyword in fiscal_keywords)]
+                        potential_fiscal_cols = [col for col in df.columns if FISCAL_RE.search(str(col))]
                         
                         if potential_fiscal_cols:
                             st.write("**Colunas de interesse fiscal:**")
-                            for col in potential_fiscal_cols:
-                                st.write(f"• {col}")
+                            st.markdown(_bullet_list(potential_fiscal_cols))
                         
                     except Exception as e:
                         st.error(f"❌ Erro ao processar {file.name}: {str(e)}")
-                        continue
-            
-            for i, uploaded_file in enumerate(uploaded_files):
-                file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
-                total_size += file_size_mb
-                
-                if file_size_mb > max_size_mb:
-                    st.error(f"❌ Arquivo {uploaded_file.name} muito grande! Máximo permitido: {max_size_mb}MB")
-                    continue
                 
-                valid_files.append(uploaded_file)
-                st.info(f"📄 {uploaded_file.name} ({file_size_mb:.2f} MB)")
+                if first_bytes is None:
+                    first_bytes = csv_bytes
+                valid_files.append(file)
+                st.info(f"📄 {file.name} ({file_size_mb:.2f} MB)")
             
             if not valid_files:
                 st.error("❌ Nenhum arquivo válido foi carregado")
@@ -347,15 +761,10 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
             # Preview do primeiro arquivo
             if valid_files:
                 try:
-                    import pandas as pd
-                    import io
-                    
                     first_file = valid_files[0]
-                    csv_bytes = first_file.getvalue()
                     
                     # Usar detector robusto de codificação para preview
-                    from .csv_encoding_detector import detect_csv_encoding
-                    encoding_used, separator_used, df_preview = detect_csv_encoding(csv_bytes)
+                    encoding_used, separator_used, df_preview = detect_csv_encoding(first_bytes)
                     
                     if df_preview is None:
                         st.warning("⚠️ Erro ao fazer preview do primeiro CSV: Não foi possível detectar a codificação")
@@ -376,7 +785,7 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
             uploaded_file = uploaded_files[0] if isinstance(uploaded_files, list) else uploaded_files
             
             # Verificar tamanho
-            file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+            file_size_mb = _get_upload_size(uploaded_file) / (1024 * 1024)
             
             if file_size_mb > max_size_mb:
                 st.error(f"❌ Arquivo muito grande! Máximo permitido: {max_size_mb}MB")
@@ -388,18 +797,14 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
             
             # Preview do CSV melhorado
             try:
-                import pandas as pd
-                import io
-                import chardet
-                
                 # Detectar encoding com múltiplas tentativas
                 csv_bytes = uploaded_file.getvalue()
-                result = chardet.detect(csv_bytes)
+                result = chardet.detect(csv_bytes[:CHARDET_SAMPLE_BYTES])
                 encoding = result['encoding']
                 confidence = result['confidence']
                 
                 # Tentar encodings comuns se a confiança for baixa
-                encodings_to_try = [encoding] if confidence > 0.7 else ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+                encodings_to_try = (encoding,) if confidence > 0.7 else FALLBACK_ENCODINGS
                 
                 df_preview = None
                 encoding_used = None
@@ -407,7 +812,7 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
                 
                 for enc in encodings_to_try:
                     try:
-                        df_preview = pd.read_csv(io.BytesIO(csv_bytes), encoding=enc, nrows=10)
+                        df_preview = _read_csv_preview(csv_bytes, enc, nrows=10)
                         encoding_used = enc
                         break
                     except UnicodeDecodeError:
@@ -432,14 +837,12 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
                 st.dataframe(df_preview, use_container_width=True)
                 
                 # Detectar colunas de interesse fiscal
-                fiscal_keywords = ['cnpj', 'cpf', 'ncm', 'cfop', 'valor', 'quantidade', 'preco', 'total', 'imposto', 'icms', 'ipi', 'pis', 'cofins']
-                potential_fiscal_cols = [col for col in df_preview.columns if any(keyword in col.lower() for keyword in fiscal_keywords)]
+                potential_fiscal_cols = [col for col in df_preview.columns if FISCAL_RE.search(str(col))]
                 
                 if potential_fiscal_cols:
                     st.subheader("🎯 Colunas de Interesse Fiscal")
                     st.write("As seguintes colunas podem conter dados fiscais relevantes:")
-                    for col in potential_fiscal_cols:
-                        st.write(f"• **{col}**")
+                    st.markdown(_bullet_list(f"**{col}**" for col in potential_fiscal_cols))
                 
                 # Mostrar tipos de dados
                 st.subheader("📊 Tipos de Dados")
@@ -449,8 +852,7 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
                     st.write("**Colunas Numéricas:**")
                     numeric_cols = df_preview.select_dtypes(include=['number']).columns
                     if len(numeric_cols) > 0:
-                        for col in numeric_cols:
-                            st.write(f"• {col}")
+                        st.markdown(_bullet_list(numeric_cols))
                     else:
                         st.write("Nenhuma coluna numérica encontrada")
                 
@@ -458,8 +860,7 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
                     st.write("**Colunas de Texto:**")
                     text_cols = df_preview.select_dtypes(include=['object']).columns
                     if len(text_cols) > 0:
-                        for col in text_cols:
-                            st.write(f"• {col}")
+                        st.markdown(_bullet_list(text_cols))
                     else:
                         st.write("Nenhuma coluna de texto encontrada")
                 
@@ -467,10 +868,10 @@ def create_csv_upload_widget(max_size_mb: int = 50, multiple: bool = True) -> Op
                 null_counts = df_preview.isnull().sum()
                 if null_counts.sum() > 0:
                     st.subheader("⚠️ Valores Nulos")
-                    for col, count in null_counts.items():
-                        if count > 0:
-                            percentage = (count / len(df_preview)) * 100
-                            st.write(f"• **{col}**: {count} valores nulos ({percentage:.1f}%)")
+                    st.markdown(_bullet_list(
+                        f"**{col}**: {count} valores nulos ({(count / len(df_preview)) * 100:.1f}%)"
+                        for col, count in null_counts.items() if count > 0
+                    ))
                 else:
                     st.success("✅ Nenhum valor nulo encontrado no preview")
                 st.success(f"✅ Codificação detectada: {encoding_used} | Separador: '{separator_used}'")
@@ -517,7 +918,7 @@ def create_upload_widget(max_size_mb: int = 200) -> Optional[str]:
     
     if uploaded_file is not None:
         # Mostrar informações do arquivo
-        file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+        file_size_mb = _get_upload_size(uploaded_file) / (1024 * 1024)
         
         col1, col2 = st.columns(2)
         
@@ -530,23 +931,12 @@ def create_upload_widget(max_size_mb: int = 200) -> Optional[str]:
         # Processar upload
         handler = UploadHandler(max_size_mb)
         
-        success, message, file_path = handler.handle_large_file_upload(uploaded_file)
+        # Upload e otimização em uma única passada
+        success, message, file_path = handler.handle_and_optimize(uploaded_file)
         
         if success:
             st.success(f"✅ {message}")
-            
-            # Otimizar se necessário
-            if file_size_mb > 5:
-                opt_success, opt_message, opt_path = handler.optimize_xml_for_processing(file_path)
-                
-                if opt_success:
-                    st.success(f"🚀 {opt_message}")
-                    return opt_path
-                else:
-                    st.warning(f"⚠️ {opt_message}")
-                    return file_path
-            else:
-                return file_path
+            return file_path
         else:
             st.error(f"❌ {message}")
             return None
@@ -3,15 +3,112 @@ FiscalAI MVP - Dataset de Validação
 Cria e gerencia dataset para validação de acurácia das métricas
 """
 
+import csv
 import json
-import pandas as pd
-from typing import Dict, List, Any, Optional
+import numpy as np
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 from datetime import datetime
 from pathlib import Path
 import os
+import logging
 
 from ..models.schemas import NFe, ItemNFe, ClassificacaoNCM, ResultadoAnalise
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Limite de buffers por chamada writev (IOV_MAX do sistema, 1024 no Linux)
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
+
+# Colunas por amostra usadas nas métricas de acurácia (snapshot Parquet)
+_METRIC_COLUMNS = ("processing_time", "fraud_expected", "fraud_detected", "ncm_total", "ncm_correct")
+
+
+def _dumps_line(data: Dict[str, Any]) -> bytes:
+    """
+    Serializa um registro como uma linha JSONL (UTF-8, com quebra de linha no final)
+    
+    Args:
+        data: Registro a serializar
+    
+    Returns:
+        Bytes da linha
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    
+    return (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _sample_metric_counts(sample: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Contribuição de uma amostra para os contadores das métricas de acurácia
+    
+    Args:
+        sample: Registro da amostra (como gravado em nfe_samples.jsonl)
+    
+    Returns:
+        Dict com os incrementos de cada contador
+    """
+    ncm_correct = 0
+    ncm_total = 0
+    
+    expected_classifications = sample.get("expected_classifications")
+    actual_classifications = sample.get("actual_classifications")
+    if actual_classifications and expected_classifications:
+        for item_id, expected_ncm in expected_classifications.items():
+            # No arquivo as chaves são strings; em memória podem ser inteiros
+            actual_classif = actual_classifications.get(str(item_id))
+            if actual_classif:
+                ncm_total += 1
+                if actual_classif["ncm_predito"] == expected_ncm:
+                    ncm_correct += 1
+    
+    expected_frauds = len(sample.get("expected_frauds", []))
+    actual_frauds = (sample.get("actual_result") or {}).get("fraudes_detectadas", 0)
+    
+    return {
+        "ncm_correct": ncm_correct,
+        "ncm_total": ncm_total,
+        "fraud_detected": max(min(actual_frauds, expected_frauds), 0),
+        "fraud_expected": expected_frauds,
+        "pt_sum": sample.get("processing_time", 0),
+        "pt_count": 1
+    }
+
+
+def iter_jsonl(file_path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Itera os registros de um arquivo JSONL (um objeto JSON por linha)
+    
+    Args:
+        file_path: Caminho do arquivo
+    
+    Returns:
+        Iterador com um dict por registro
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
 
 class ValidationDataset:
     """
@@ -28,11 +125,18 @@ class ValidationDataset:
         self.dataset_path = Path(dataset_path)
         self.dataset_path.mkdir(parents=True, exist_ok=True)
         
-        # Arquivos do dataset
-        self.nfe_samples_file = self.dataset_path / "nfe_samples.json"
-        self.ncm_classifications_file = self.dataset_path / "ncm_classifications.json"
-        self.fraud_detections_file = self.dataset_path / "fraud_detections.json"
-        self.performance_metrics_file = self.dataset_path / "performance_metrics.json"
+        # Arquivos do dataset (JSONL: um registro por linha, append O(1))
+        self.nfe_samples_file = self.dataset_path / "nfe_samples.jsonl"
+        self.ncm_classifications_file = self.dataset_path / "ncm_classifications.jsonl"
+        self.fraud_detections_file = self.dataset_path / "fraud_detections.jsonl"
+        self.performance_metrics_file = self.dataset_path / "performance_metrics.jsonl"
+        
+        # Snapshot colunar (Parquet) das métricas por amostra
+        self.metrics_snapshot_file = self.dataset_path / "nfe_samples.metrics.parquet"
+        
+        # Contadores acumulados das métricas, atualizados a cada amostra adicionada
+        self.metrics_state_file = self.dataset_path / "metrics_state.json"
+        self._metrics_state: Optional[Dict[str, Any]] = None
         
         # Inicializar datasets vazios se não existirem
         self._initialize_datasets()
@@ -40,16 +144,52 @@ class ValidationDataset:
     def _initialize_datasets(self):
         """Inicializa datasets vazios se não existirem"""
         datasets = [
-            (self.nfe_samples_file, []),
-            (self.ncm_classifications_file, []),
-            (self.fraud_detections_file, []),
-            (self.performance_metrics_file, [])
+            self.nfe_samples_file,
+            self.ncm_classifications_file,
+            self.fraud_detections_file,
+            self.performance_metrics_file
         ]
         
-        for file_path, default_data in datasets:
+        for file_path in datasets:
             if not file_path.exists():
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(default_data, f, indent=2, ensure_ascii=False)
+                self._migrate_legacy_json(file_path)
+            
+            if not file_path.exists():
+                file_path.touch()
+    
+    def _migrate_legacy_json(self, file_path: Path):
+        """
+        Converte o dataset legado (array JSON em .json) para JSONL
+        
+        Args:
+            file_path: Caminho do arquivo JSONL de destino
+        """
+        legacy_file = file_path.with_suffix('.json')
+        if not legacy_file.exists():
+            return
+        
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            # Arquivo legado ilegível fica intacto; o dataset começa vazio
+            logger.error(f"Não foi possível migrar {legacy_file}: {e}")
+            return
+        
+        if not isinstance(records, list):
+            logger.error(f"Não foi possível migrar {legacy_file}: conteúdo não é uma lista JSON")
+            return
+        
+        # JSONL completo em arquivo temporário, movido atomicamente para o destino
+        tmp_file = file_path.with_suffix('.tmp')
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(b''.join(_dumps_line(record) for record in records))
+            os.replace(tmp_file, file_path)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+        
+        legacy_file.unlink()
     
     def add_nfe_sample(self, 
                       nfe: NFe, 
@@ -69,8 +209,86 @@ class ValidationDataset:
             actual_classifications: Classificações reais (opcional)
             actual_result: Resultado real da análise (opcional)
         """
-        # Dados da NF-e
-        nfe_data = {
+        nfe_data = self._build_sample(nfe, expected_classifications, expected_frauds,
+                                      processing_time, actual_classifications, actual_result)
+        
+        # Salvar amostra e atualizar os contadores das métricas
+        previous_key = self._samples_key()
+        self._append_to_file(self.nfe_samples_file, nfe_data)
+        self._update_metrics_state(previous_key, [nfe_data])
+        
+        # Adicionar métricas de performance
+        if actual_result:
+            self._add_performance_metrics(nfe_data, actual_result)
+    
+    def flush_batch(self, samples: List[Dict[str, Any]]):
+        """
+        Adiciona várias amostras de uma vez, com uma única escrita por arquivo
+        
+        Args:
+            samples: Lista de dicts com os mesmos argumentos de add_nfe_sample
+                     (nfe, expected_classifications, expected_frauds, ...)
+        """
+        records = []
+        metrics = []
+        
+        for sample in samples:
+            nfe_data = self._build_sample(**sample)
+            records.append(nfe_data)
+            
+            actual_result = sample.get("actual_result")
+            if actual_result:
+                metrics.append(self._build_performance_metrics(nfe_data, actual_result))
+        
+        if records:
+            previous_key = self._samples_key()
+            self._append_many(self.nfe_samples_file, records)
+            self._update_metrics_state(previous_key, records)
+        
+        if metrics:
+            self._append_many(self.performance_metrics_file, metrics)
+    
+    def _append_many(self, file_path: Path, records: List[Dict[str, Any]]):
+        """
+        Adiciona vários registros ao arquivo JSONL com escrita vetorizada (writev)
+        
+        Args:
+            file_path: Caminho do arquivo JSONL
+            records: Registros a adicionar
+        """
+        bufs = [_dumps_line(record) for record in records]
+        if not bufs:
+            return
+        
+        if not hasattr(os, 'writev'):
+            with open(file_path, 'ab') as f:
+                f.write(b''.join(bufs))
+            return
+        
+        fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            for start in range(0, len(bufs), IOV_MAX):
+                chunk = bufs[start:start + IOV_MAX]
+                written = os.writev(fd, chunk)
+                
+                # Escrita parcial: completa o restante do lote
+                remaining = sum(len(buf) for buf in chunk) - written
+                if remaining:
+                    view = memoryview(b''.join(chunk))[written:]
+                    while view:
+                        view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+    
+    def _build_sample(self,
+                      nfe: NFe,
+                      expected_classifications: Dict[int, str],
+                      expected_frauds: List[Dict[str, Any]],
+                      processing_time: float,
+                      actual_classifications: Optional[Dict[int, ClassificacaoNCM]] = None,
+                      actual_result: Optional[ResultadoAnalise] = None) -> Dict[str, Any]:
+        """Monta o registro de uma amostra de NF-e"""
+        return {
             "timestamp": datetime.now().isoformat(),
             "chave_acesso": nfe.chave_acesso,
             "numero": nfe.numero,
@@ -93,13 +311,6 @@ class ValidationDataset:
             "actual_classifications": self._serialize_classifications(actual_classifications),
             "actual_result": self._serialize_result(actual_result)
         }
-        
-        # Salvar amostra
-        self._append_to_file(self.nfe_samples_file, nfe_data)
-        
-        # Adicionar métricas de performance
-        if actual_result:
-            self._add_performance_metrics(nfe_data, actual_result)
     
     def _serialize_classifications(self, classifications: Optional[Dict[int, ClassificacaoNCM]]) -> Optional[Dict]:
         """Serializa classificações para JSON"""
@@ -132,8 +343,13 @@ class ValidationDataset:
     
     def _add_performance_metrics(self, nfe_data: Dict, actual_result: ResultadoAnalise):
         """Adiciona métricas de performance"""
-        metrics = {
-            "timestamp": datetime.now().isoformat(),
+        metrics = self._build_performance_metrics(nfe_data, actual_result)
+        self._append_to_file(self.performance_metrics_file, metrics)
+    
+    def _build_performance_metrics(self, nfe_data: Dict, actual_result: ResultadoAnalise) -> Dict[str, Any]:
+        """Monta o registro de métricas de performance de uma amostra"""
+        return {
+            "timestamp": nfe_data["timestamp"],  # mesmo instante da amostra
             "chave_acesso": nfe_data["chave_acesso"],
             "processing_time": nfe_data["processing_time"],
             "num_itens": nfe_data["num_itens"],
@@ -141,31 +357,30 @@ class ValidationDataset:
             "fraudes_detectadas": len(actual_result.fraudes_detectadas),
             "tempo_por_item": nfe_data["processing_time"] / nfe_data["num_itens"] if nfe_data["num_itens"] > 0 else 0
         }
-        
-        self._append_to_file(self.performance_metrics_file, metrics)
     
     def _append_to_file(self, file_path: Path, data: Dict):
-        """Adiciona dados ao arquivo JSON"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
-        
-        existing_data.append(data)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, indent=2, ensure_ascii=False)
+        """Adiciona dados ao arquivo JSONL (uma linha por registro)"""
+        self._append_many(file_path, [data])
     
     def calculate_accuracy_metrics(self) -> Dict[str, float]:
         """
         Calcula métricas de acurácia do dataset
         
+        As métricas saem dos contadores acumulados (metrics_state.json), mantidos
+        por add_nfe_sample. Se o arquivo de amostras mudou por fora (tamanho ou
+        data de modificação diferentes), os contadores são recalculados.
+        
         Returns:
             Dict com métricas de acurácia
         """
-        # Carregar dados
-        with open(self.nfe_samples_file, 'r', encoding='utf-8') as f:
-            samples = json.load(f)
+        key = self._samples_key()
+        state = self._load_metrics_state()
+        
+        if state is None or state.get("source_key") != list(key):
+            state = self._rebuild_metrics_state(key)
         
-        if not samples:
+        pt_count = state["pt_count"]
+        if not pt_count:
             return {
                 "ncm_accuracy": 0.0,
                 "fraud_detection_rate": 0.0,
@@ -173,52 +388,167 @@ class ValidationDataset:
                 "total_samples": 0
             }
         
-        # Calcular acurácia de classificação NCM
-        ncm_correct = 0
-        ncm_total = 0
-        
-        # Calcular taxa de detecção de fraudes
-        fraud_detected = 0
-        fraud_expected = 0
-        
-        # Calcular tempo médio de processamento
-        processing_times = []
-        
-        for sample in samples:
-            # Acurácia NCM
-            if sample.get("actual_classifications") and sample.get("expected_classifications"):
-                for item_id, expected_ncm in sample["expected_classifications"].items():
-                    actual_classif = sample["actual_classifications"].get(item_id)
-                    if actual_classif:
-                        ncm_total += 1
-                        if actual_classif["ncm_predito"] == expected_ncm:
-                            ncm_correct += 1
-            
-            # Detecção de fraudes
-            expected_frauds = len(sample.get("expected_frauds", []))
-            actual_frauds = sample.get("actual_result", {}).get("fraudes_detectadas", 0)
-            
-            fraud_expected += expected_frauds
-            if actual_frauds > 0 and expected_frauds > 0:
-                fraud_detected += min(actual_frauds, expected_frauds)
-            
-            # Tempo de processamento
-            processing_times.append(sample.get("processing_time", 0))
+        ncm_total = state["ncm_total"]
+        fraud_expected = state["fraud_expected"]
         
         # Calcular métricas finais
-        ncm_accuracy = (ncm_correct / ncm_total) * 100 if ncm_total > 0 else 0.0
-        fraud_detection_rate = (fraud_detected / fraud_expected) * 100 if fraud_expected > 0 else 0.0
-        avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0.0
+        ncm_accuracy = (state["ncm_correct"] / ncm_total) * 100 if ncm_total > 0 else 0.0
+        fraud_detection_rate = (state["fraud_detected"] / fraud_expected) * 100 if fraud_expected > 0 else 0.0
+        avg_processing_time = state["pt_sum"] / pt_count
         
         return {
             "ncm_accuracy": round(ncm_accuracy, 2),
             "fraud_detection_rate": round(fraud_detection_rate, 2),
             "avg_processing_time": round(avg_processing_time, 2),
-            "total_samples": len(samples),
+            "total_samples": pt_count,
             "ncm_total_classifications": ncm_total,
             "fraud_expected_total": fraud_expected
         }
     
+    def _samples_key(self) -> Tuple[int, int]:
+        """(tamanho, mtime) do arquivo de amostras, usados para validar estado e snapshot"""
+        st = os.stat(self.nfe_samples_file)
+        return st.st_size, st.st_mtime_ns
+    
+    def _load_metrics_state(self) -> Optional[Dict[str, Any]]:
+        """Contadores das métricas (memória ou metrics_state.json), ou None se não houver"""
+        if self._metrics_state is None and self.metrics_state_file.exists():
+            try:
+                with open(self.metrics_state_file, 'rb') as f:
+                    self._metrics_state = json.loads(f.read())
+            except (OSError, ValueError):
+                return None
+        
+        return self._metrics_state
+    
+    def _save_metrics_state(self, state: Dict[str, Any]):
+        """Grava os contadores das métricas (substituição atômica do arquivo)"""
+        self._metrics_state = state
+        
+        tmp_file = self.metrics_state_file.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(_dumps_line(state))
+        os.replace(tmp_file, self.metrics_state_file)
+    
+    def _update_metrics_state(self, previous_key: Tuple[int, int], records: List[Dict[str, Any]]):
+        """
+        Soma as amostras recém-gravadas aos contadores das métricas
+        
+        Args:
+            previous_key: (tamanho, mtime) do arquivo de amostras antes da gravação
+            records: Amostras gravadas
+        """
+        state = self._load_metrics_state()
+        
+        # Contadores desatualizados: recalculados na próxima consulta
+        if state is None or state.get("source_key") != list(previous_key):
+            return
+        
+        for record in records:
+            for name, value in _sample_metric_counts(record).items():
+                state[name] += value
+        
+        state["source_key"] = list(self._samples_key())
+        self._save_metrics_state(state)
+    
+    def _rebuild_metrics_state(self, key: Tuple[int, int]) -> Dict[str, Any]:
+        """
+        Recalcula os contadores a partir das colunas por amostra
+        
+        As colunas vêm do snapshot Parquet quando ele corresponde à versão
+        atual do arquivo de amostras; caso contrário, o JSONL é percorrido
+        e o snapshot é regravado.
+        
+        Args:
+            key: (tamanho, mtime) do arquivo de amostras
+        
+        Returns:
+            Contadores das métricas
+        """
+        columns = self._read_metrics_snapshot(key)
+        if columns is None:
+            columns = self._scan_metric_columns()
+            self._save_metrics_snapshot(key, columns)
+        
+        state = {
+            "source_key": list(key),
+            "ncm_correct": int(columns["ncm_correct"].sum()),
+            "ncm_total": int(columns["ncm_total"].sum()),
+            "fraud_detected": int(columns["fraud_detected"].sum()),
+            "fraud_expected": int(columns["fraud_expected"].sum()),
+            "pt_sum": float(columns["processing_time"].sum()),
+            "pt_count": len(columns["processing_time"])
+        }
+        self._save_metrics_state(state)
+        return state
+    
+    def _scan_metric_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Percorre as amostras e monta as colunas usadas nas métricas
+        
+        Returns:
+            Dict {coluna: array com um valor por amostra}
+        """
+        columns = {name: [] for name in _METRIC_COLUMNS}
+        
+        # Mesma contagem por amostra usada na atualização incremental
+        for sample in iter_jsonl(self.nfe_samples_file):
+            counts = _sample_metric_counts(sample)
+            columns["processing_time"].append(counts["pt_sum"])
+            columns["fraud_expected"].append(counts["fraud_expected"])
+            columns["fraud_detected"].append(counts["fraud_detected"])
+            columns["ncm_total"].append(counts["ncm_total"])
+            columns["ncm_correct"].append(counts["ncm_correct"])
+        
+        return {
+            name: np.asarray(values, dtype=np.float64 if name == "processing_time" else np.int64)
+            for name, values in columns.items()
+        }
+    
+    def _read_metrics_snapshot(self, key: Tuple[int, int]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Lê as colunas do snapshot Parquet, se ele corresponder à versão atual das amostras
+        
+        Args:
+            key: (tamanho, mtime) do arquivo de amostras
+        
+        Returns:
+            Dict {coluna: array} ou None se não houver snapshot válido
+        """
+        if not PYARROW_AVAILABLE or not self.metrics_snapshot_file.exists():
+            return None
+        
+        try:
+            metadata = pq.read_schema(self.metrics_snapshot_file).metadata or {}
+            if metadata.get(b"source_key") != f"{key[0]}:{key[1]}".encode():
+                return None
+            
+            table = pq.read_table(self.metrics_snapshot_file, columns=list(_METRIC_COLUMNS))
+            return {name: table.column(name).to_numpy() for name in _METRIC_COLUMNS}
+        except (OSError, pa.ArrowException, KeyError):
+            return None
+    
+    def _save_metrics_snapshot(self, key: Tuple[int, int], columns: Dict[str, np.ndarray]):
+        """
+        Grava as colunas das métricas em Parquet (melhor esforço)
+        
+        Args:
+            key: (tamanho, mtime) do arquivo de amostras
+            columns: Colunas calculadas por _scan_metric_columns
+        """
+        if not PYARROW_AVAILABLE:
+            return
+        
+        table = pa.table({name: columns[name] for name in _METRIC_COLUMNS})
+        table = table.replace_schema_metadata({"source_key": f"{key[0]}:{key[1]}"})
+        
+        tmp_file = self.metrics_snapshot_file.with_suffix('.tmp')
+        try:
+            pq.write_table(table, tmp_file, compression='zstd')
+            os.replace(tmp_file, self.metrics_snapshot_file)
+        except (OSError, pa.ArrowException):
+            tmp_file.unlink(missing_ok=True)
+    
     def generate_validation_report(self) -> str:
         """
         Gera relatório de validação
@@ -270,15 +600,14 @@ class ValidationDataset:
     
     def export_to_csv(self, output_path: str = "data/validation/validation_report.csv"):
         """
-        Exporta métricas para CSV
+        Exporta métricas para CSV (acrescenta uma linha ao arquivo existente)
         
         Args:
             output_path: Caminho do arquivo CSV
         """
         metrics = self.calculate_accuracy_metrics()
         
-        # Criar DataFrame
-        df = pd.DataFrame([{
+        row = {
             "timestamp": datetime.now().isoformat(),
             "ncm_accuracy": metrics['ncm_accuracy'],
             "fraud_detection_rate": metrics['fraud_detection_rate'],
@@ -286,10 +615,15 @@ class ValidationDataset:
             "total_samples": metrics['total_samples'],
             "ncm_total_classifications": metrics['ncm_total_classifications'],
             "fraud_expected_total": metrics['fraud_expected_total']
-        }])
+        }
         
-        # Salvar CSV
-        df.to_csv(output_path, index=False)
+        # Salvar CSV (append: uma linha por exportação, cabeçalho só em arquivo novo)
+        header_needed = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        with open(output_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if header_needed:
+                writer.writerow(row.keys())
+            writer.writerow(row.values())
         print(f"Relatório de validação exportado para: {output_path}")
     
     def create_sample_data(self):
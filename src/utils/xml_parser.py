@@ -3,14 +3,59 @@ FiscalAI MVP - XML Parser
 Parser de arquivos XML de Nota Fiscal Eletrônica (NF-e)
 """
 
-import xmltodict
 import lxml.etree as ET
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, List
 from datetime import datetime
 from pathlib import Path
+import concurrent.futures
+import threading
 
 from ..models import NFe, ItemNFe, StatusProcessamento
 
+# Caminhos consultados na extração (relativos ao elemento de partida)
+_ELEMENT_PATHS = ('ide', 'emit', 'dest', 'total/ICMSTot')
+_TEXT_PATHS = ('CNPJ', 'xNome', 'vNF', 'vProd', 'vTotTrib', 'dhEmi', 'dEmi', 'nNF', 'serie')
+
+# Formatos de data/hora aceitos em _parse_datetime
+_DATETIME_FORMATS = {
+    'iso_tz': '%Y-%m-%dT%H:%M:%S%z',  # ISO com timezone (exceto -03:00, removido antes)
+    'iso': '%Y-%m-%dT%H:%M:%S',       # ISO sem timezone
+    'date': '%Y-%m-%d',               # Apenas data
+    'br': '%d/%m/%Y',                 # Formato brasileiro
+}
+
+# Elementos obrigatórios verificados em validate_xml
+_REQUIRED_ELEMENTS = ('ide', 'emit', 'dest', 'det', 'total')
+
+# Instâncias únicas de códigos repetitivos (NCM, CFOP, unidade, EAN) e de CNPJs,
+# compartilhadas entre itens e documentos; limitadas para não crescer sem fim
+_INTERN_MAX_SIZE = 65536
+_CODE_CACHE: Dict[str, str] = {}
+_CNPJ_CACHE: Dict[str, str] = {}
+
+
+def _intern(cache: Dict[str, str], value: Optional[str]) -> Optional[str]:
+    """
+    Retorna a instância compartilhada da string (ou a própria, se o cache estiver cheio)
+    
+    Args:
+        cache: Cache do vocabulário (_CODE_CACHE ou _CNPJ_CACHE)
+        value: String lida do XML
+    
+    Returns:
+        String equivalente, reaproveitada entre chamadas
+    """
+    if not value:
+        return value
+    
+    cached = cache.get(value)
+    if cached is not None:
+        return cached
+    
+    if len(cache) < _INTERN_MAX_SIZE:
+        cache[value] = value
+    return value
+
 
 class NFeXMLParser:
     """
@@ -23,6 +68,85 @@ class NFeXMLParser:
         self.namespaces = {
             'nfe': 'http://www.portalfiscal.inf.br/nfe'
         }
+        
+        # Parsers reaproveitados entre chamadas (proteção contra XXE: sem entidades nem rede)
+        self._parser = ET.XMLParser(
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            huge_tree=False
+        )
+        # Strings já decodificadas são reencodadas em UTF-8, ignorando a declaração do XML
+        self._string_parser = ET.XMLParser(
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            huge_tree=False,
+            encoding='utf-8'
+        )
+        
+        # Consultas XPath compiladas uma única vez, por namespace do documento
+        self._xpaths = {
+            uri: self._compile_xpaths(uri)
+            for uri in ('', *self.namespaces.values())
+        }
+        
+        # Extratores de itens especializados por namespace (ver _build_item_extractor)
+        self._item_extractors: Dict[str, Callable[[Any, int], ItemNFe]] = {}
+        
+        # Verificação de elementos obrigatórios (com e sem namespace)
+        self._xp_required = {
+            elem: (
+                ET.XPath(f'boolean(.//nfe:{elem})', namespaces=self.namespaces),
+                ET.XPath(f'boolean(.//{elem})')
+            )
+            for elem in _REQUIRED_ELEMENTS
+        }
+        # Todos os obrigatórios em uma única avaliação (caminho comum: XML válido)
+        self._xp_all_required = ET.XPath(
+            ' and '.join(f'(boolean(.//nfe:{elem}) or boolean(.//{elem}))' for elem in _REQUIRED_ELEMENTS),
+            namespaces=self.namespaces
+        )
+    
+    def _compile_xpaths(self, uri: str) -> Dict[str, ET.XPath]:
+        """
+        Compila as consultas XPath da extração para um namespace
+        
+        Args:
+            uri: Namespace do documento ('' quando não há namespace)
+        
+        Returns:
+            Dict caminho -> XPath compilado
+        """
+        if uri:
+            namespaces = {'nfe': uri}
+            qualify = lambda path: '/'.join(f'nfe:{step}' for step in path.split('/'))
+        else:
+            namespaces = None
+            qualify = lambda path: path
+        
+        xpaths = {path: ET.XPath(qualify(path), namespaces=namespaces) for path in _ELEMENT_PATHS}
+        xpaths.update({
+            path: ET.XPath(f'string({qualify(path)})', namespaces=namespaces)
+            for path in _TEXT_PATHS
+        })
+        return xpaths
+    
+    def _xpaths_for(self, element) -> Dict[str, ET.XPath]:
+        """
+        Retorna as consultas compiladas para o namespace do elemento
+        
+        Args:
+            element: Elemento do documento
+        
+        Returns:
+            Dict caminho -> XPath compilado
+        """
+        uri = ET.QName(element).namespace or ''
+        xpaths = self._xpaths.get(uri)
+        if xpaths is None:
+            xpaths = self._xpaths[uri] = self._compile_xpaths(uri)
+        return xpaths
     
     def parse_file(self, xml_path: str) -> NFe:
         """
@@ -39,13 +163,19 @@ class NFeXMLParser:
             ValueError: Se XML for inválido ou incompleto
         """
         xml_path = Path(xml_path)
-        if not xml_path.exists():
-            raise FileNotFoundError(f"Arquivo não encontrado: {xml_path}")
-        
-        with open(xml_path, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
         
-        return self.parse_string(xml_content)
+        try:
+            # libxml2 lê o arquivo direto (sem cópias em Python), respeitando o encoding declarado
+            tree = ET.parse(str(xml_path), self._parser)
+            return self._parse_root(tree.getroot())
+            
+        except OSError as e:
+            # Existência só é verificada quando a leitura falha (sem stat extra por arquivo)
+            if not xml_path.exists():
+                raise FileNotFoundError(f"Arquivo não encontrado: {xml_path}")
+            raise ValueError(f"Erro ao fazer parsing do XML: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Erro ao fazer parsing do XML: {str(e)}")
     
     def parse_string(self, xml_content: str) -> NFe:
         """
@@ -61,84 +191,130 @@ class NFeXMLParser:
             ValueError: Se XML for inválido ou incompleto
         """
         try:
-            # Converter XML para dict com proteção contra XXE
-            xml_dict = xmltodict.parse(
-                xml_content,
-                process_namespaces=False,
-                disable_entities=True,
-                process_comments=False,
-                strip_whitespace=True
-            )
-            
-            # Navegar na estrutura do XML
-            # Estrutura típica: nfeProc -> NFe -> infNFe
-            if 'nfeProc' in xml_dict:
-                nfe_root = xml_dict['nfeProc']['NFe']['infNFe']
-            elif 'NFe' in xml_dict:
-                nfe_root = xml_dict['NFe']['infNFe']
-            elif 'infNFe' in xml_dict:
-                nfe_root = xml_dict['infNFe']
-            else:
-                raise ValueError("Estrutura XML inválida: raiz não encontrada")
-            
-            # Extrair dados
-            nfe_data = self._extract_nfe_data(nfe_root)
-            
-            # Criar objeto NFe
-            nfe = NFe(**nfe_data)
-            nfe.status = StatusProcessamento.CONCLUIDO
-            nfe.data_processamento = datetime.now()
+            root = ET.fromstring(xml_content.encode('utf-8'), parser=self._string_parser)
             
-            return nfe
+            return self._parse_root(root)
             
         except Exception as e:
             raise ValueError(f"Erro ao fazer parsing do XML: {str(e)}")
     
-    def _extract_nfe_data(self, nfe_root: Dict[str, Any]) -> Dict[str, Any]:
+    def _parse_root(self, root) -> NFe:
+        """
+        Monta o objeto NFe a partir do elemento raiz do XML
+        
+        Args:
+            root: Elemento raiz (nfeProc, NFe ou infNFe)
+        
+        Returns:
+            Objeto NFe com dados estruturados
+        """
+        # Navegar na estrutura do XML
+        # Estrutura típica: nfeProc -> NFe -> infNFe
+        root_name = ET.QName(root).localname
+        if root_name == 'nfeProc':
+            nfe_root = root.find('{*}NFe/{*}infNFe')
+        elif root_name == 'NFe':
+            nfe_root = root.find('{*}infNFe')
+        elif root_name == 'infNFe':
+            nfe_root = root
+        else:
+            nfe_root = None
+        
+        if nfe_root is None:
+            raise ValueError("Estrutura XML inválida: raiz não encontrada")
+        
+        # Extrair dados
+        nfe_data = self._extract_nfe_data(nfe_root)
+        
+        # Criar objeto NFe
+        nfe = NFe(**nfe_data)
+        nfe.status = StatusProcessamento.CONCLUIDO
+        nfe.data_processamento = datetime.now()
+        
+        return nfe
+    
+    def _child(self, element, path: str, xp: Dict[str, ET.XPath]):
+        """
+        Retorna o subelemento obrigatório indicado pelo caminho
+        
+        Args:
+            element: Elemento de partida
+            path: Caminho relativo (sem prefixo de namespace)
+            xp: Consultas compiladas do namespace do documento
+        
+        Returns:
+            Subelemento encontrado
+        
+        Raises:
+            ValueError: Se o subelemento não existir
+        """
+        found = xp[path](element)
+        if not found:
+            raise ValueError(f"Elemento obrigatório não encontrado: {path}")
+        return found[0]
+    
+    def _text(self, element, path: str, xp: Dict[str, ET.XPath], default: Optional[str] = None) -> Optional[str]:
+        """
+        Lê o texto de um subelemento
+        
+        Args:
+            element: Elemento de partida
+            path: Caminho relativo (sem prefixo de namespace)
+            xp: Consultas compiladas do namespace do documento
+            default: Valor para elemento ausente ou vazio
+        
+        Returns:
+            Texto sem espaços nas pontas ou o valor padrão
+        """
+        value = xp[path](element).strip()
+        return value if value else default
+    
+    def _extract_nfe_data(self, nfe_root) -> Dict[str, Any]:
         """
-        Extrai dados estruturados do dict XML
+        Extrai dados estruturados do elemento infNFe
         
         Args:
-            nfe_root: Dict com dados da raiz infNFe
+            nfe_root: Elemento infNFe
         
         Returns:
             Dict com dados para criar objeto NFe
         """
+        # Consultas do namespace do documento (vazio quando o XML não declara namespace)
+        xp = self._xpaths_for(nfe_root)
+        
         # Identificação da NF-e
-        ide = nfe_root['ide']
-        chave_acesso = nfe_root.get('@Id', '').replace('NFe', '')
+        ide = self._child(nfe_root, 'ide', xp)
+        chave_acesso = nfe_root.get('Id', '').replace('NFe', '')
         
         # Emitente
-        emit = nfe_root['emit']
-        cnpj_emitente = emit.get('CNPJ', '')
-        razao_social_emitente = emit.get('xNome', '')
+        emit = self._child(nfe_root, 'emit', xp)
+        cnpj_emitente = _intern(_CNPJ_CACHE, self._text(emit, 'CNPJ', xp, ''))
+        razao_social_emitente = self._text(emit, 'xNome', xp, '')
         
         # Destinatário
-        dest = nfe_root['dest']
-        cnpj_destinatario = dest.get('CNPJ', '')
-        razao_social_destinatario = dest.get('xNome', '')
+        dest = self._child(nfe_root, 'dest', xp)
+        cnpj_destinatario = _intern(_CNPJ_CACHE, self._text(dest, 'CNPJ', xp, ''))
+        razao_social_destinatario = self._text(dest, 'xNome', xp, '')
         
         # Totais
-        total = nfe_root['total']['ICMSTot']
-        valor_total = float(total.get('vNF', 0))
-        valor_produtos = float(total.get('vProd', 0))
-        valor_impostos = float(total.get('vTotTrib', 0))
+        total = self._child(nfe_root, 'total/ICMSTot', xp)
+        valor_total = float(self._text(total, 'vNF', xp, 0))
+        valor_produtos = float(self._text(total, 'vProd', xp, 0))
+        valor_impostos = float(self._text(total, 'vTotTrib', xp, 0))
         
         # Data de emissão
-        data_emissao_str = ide.get('dhEmi') or ide.get('dEmi')
+        data_emissao_str = self._text(ide, 'dhEmi', xp) or self._text(ide, 'dEmi', xp)
         data_emissao = self._parse_datetime(data_emissao_str)
         
-        # Itens (produtos)
-        det = nfe_root['det']
-        if not isinstance(det, list):
-            det = [det]  # Garantir que seja lista
-        
-        itens = [self._extract_item_data(item, idx + 1) for idx, item in enumerate(det)]
+        # Itens (produtos); NFe exige lista, então o gerador é materializado aqui
+        itens = list(self._iter_items(nfe_root))
+        if not itens:
+            raise ValueError("Elemento obrigatório não encontrado: det")
         
         return {
             'chave_acesso': chave_acesso,
-            'numero': str(ide.get('nNF', '')),
-            'serie': str(ide.get('serie', '')),
+            'numero': self._text(ide, 'nNF', xp, ''),
+            'serie': self._text(ide, 'serie', xp, ''),
             'data_emissao': data_emissao,
             'cnpj_emitente': cnpj_emitente,
             'razao_social_emitente': razao_social_emitente,
@@ -150,46 +326,88 @@ class NFeXMLParser:
             'itens': itens,
         }
     
-    def _extract_item_data(self, item_dict: Dict[str, Any], numero_item: int) -> ItemNFe:
+    def _iter_items(self, nfe_root) -> Iterator[ItemNFe]:
         """
-        Extrai dados de um item (produto) da NF-e
+        Gera os itens da NF-e um a um, liberando cada <det> após a extração
         
         Args:
-            item_dict: Dict com dados do item (tag <det>)
-            numero_item: Número sequencial do item
+            nfe_root: Elemento infNFe
         
         Returns:
-            Objeto ItemNFe
+            Iterador de ItemNFe, na ordem do documento
         """
-        prod = item_dict['prod']
-        
-        # Dados básicos do produto
-        descricao = prod.get('xProd', '')
-        ncm = prod.get('NCM', '')
-        cfop = str(prod.get('CFOP', ''))
-        
-        # Quantidades e valores
-        quantidade = float(prod.get('qCom', 0))
-        valor_unitario = float(prod.get('vUnCom', 0))
-        valor_total = float(prod.get('vProd', 0))
-        unidade = prod.get('uCom', 'UN')
-        
-        # Códigos opcionais
-        codigo_produto = prod.get('cProd')
-        ean = prod.get('cEAN')
-        
-        return ItemNFe(
-            numero_item=numero_item,
-            descricao=descricao,
-            ncm_declarado=ncm,
-            cfop=cfop,
-            quantidade=quantidade,
-            valor_unitario=valor_unitario,
-            valor_total=valor_total,
-            unidade=unidade,
-            codigo_produto=codigo_produto,
-            ean=ean if ean and ean != 'SEM GTIN' else None,
-        )
+        uri = ET.QName(nfe_root).namespace or ''
+        det_tag = f'{{{uri}}}det' if uri else 'det'
+        extract_item = self._item_extractor(uri)
+        
+        for idx, det in enumerate(nfe_root.iterchildren(det_tag)):
+            yield extract_item(det, idx + 1)
+            det.clear()
+    
+    def _item_extractor(self, uri: str) -> Callable[[Any, int], ItemNFe]:
+        """
+        Retorna o extrator de itens especializado para o namespace do documento
+        
+        Args:
+            uri: Namespace do documento ('' quando não há namespace)
+        
+        Returns:
+            Função (elemento <det>, número do item) -> ItemNFe
+        """
+        extractor = self._item_extractors.get(uri)
+        if extractor is None:
+            extractor = self._item_extractors[uri] = self._build_item_extractor(uri)
+        return extractor
+    
+    def _build_item_extractor(self, uri: str) -> Callable[[Any, int], ItemNFe]:
+        """
+        Monta o extrator de itens com as tags do namespace já resolvidas
+        
+        Em vez de uma consulta XPath por campo, cada <prod> é percorrido uma
+        única vez e os campos são lidos de um dict indexado pela tag.
+        
+        Args:
+            uri: Namespace do documento ('' quando não há namespace)
+        
+        Returns:
+            Função (elemento <det>, número do item) -> ItemNFe
+        """
+        qualify = (lambda name: f'{{{uri}}}{name}') if uri else (lambda name: name)
+        prod_tag = qualify('prod')
+        (t_xprod, t_ncm, t_cfop, t_qcom, t_vuncom,
+         t_vprod, t_ucom, t_cprod, t_cean) = map(qualify, (
+            'xProd', 'NCM', 'CFOP', 'qCom', 'vUnCom', 'vProd', 'uCom', 'cProd', 'cEAN'
+        ))
+        
+        def extract_item(item, numero_item: int) -> ItemNFe:
+            prod = item.find(prod_tag)
+            if prod is None:
+                raise ValueError("Elemento obrigatório não encontrado: prod")
+            
+            # Texto de cada filho de <prod> (primeira ocorrência, como no XPath)
+            texts = {}
+            for child in prod:
+                if child.tag not in texts:
+                    value = child.text if len(child) == 0 else ''.join(child.itertext())
+                    texts[child.tag] = value.strip() if value else ''
+            get = texts.get
+            
+            ean = _intern(_CODE_CACHE, get(t_cean) or None)
+            
+            return ItemNFe(
+                numero_item=numero_item,
+                descricao=get(t_xprod) or '',
+                ncm_declarado=_intern(_CODE_CACHE, get(t_ncm) or ''),
+                cfop=_intern(_CODE_CACHE, get(t_cfop) or ''),
+                quantidade=float(get(t_qcom) or 0),
+                valor_unitario=float(get(t_vuncom) or 0),
+                valor_total=float(get(t_vprod) or 0),
+                unidade=_intern(_CODE_CACHE, get(t_ucom) or 'UN'),
+                codigo_produto=get(t_cprod) or None,
+                ean=ean if ean and ean != 'SEM GTIN' else None,
+            )
+        
+        return extract_item
     
     def _parse_datetime(self, dt_str: str) -> datetime:
         """
@@ -204,21 +422,28 @@ class NFeXMLParser:
         if not dt_str:
             return datetime.now()
         
-        # Tentar formatos comuns
-        formats = [
-            '%Y-%m-%dT%H:%M:%S%z',  # ISO com timezone
-            '%Y-%m-%dT%H:%M:%S',     # ISO sem timezone
-            '%Y-%m-%d',               # Apenas data
-            '%d/%m/%Y',               # Formato brasileiro
-        ]
+        # Remover timezone se presente (simplificação)
+        dt_str_clean = dt_str.partition('-03:00')[0].partition('+')[0]
         
-        for fmt in formats:
+        # Caminho rápido: parser ISO em C (datas "AAAA-MM-DD[THH:MM:SS[±HH:MM]]")
+        if '/' not in dt_str_clean[:10]:
             try:
-                # Remover timezone se presente (simplificação)
-                dt_str_clean = dt_str.split('-03:00')[0].split('+')[0]
-                return datetime.strptime(dt_str_clean, fmt)
+                return datetime.fromisoformat(dt_str_clean)
             except ValueError:
-                continue
+                pass
+        
+        # Escolher o formato pelo próprio texto: um único strptime por data
+        if len(dt_str_clean) >= 11 and dt_str_clean[10] == 'T':
+            fmt = _DATETIME_FORMATS['iso_tz' if len(dt_str_clean) > 19 else 'iso']
+        elif '/' in dt_str_clean[:10]:
+            fmt = _DATETIME_FORMATS['br']
+        else:
+            fmt = _DATETIME_FORMATS['date']
+        
+        try:
+            return datetime.strptime(dt_str_clean, fmt)
+        except ValueError:
+            pass
         
         # Fallback
         return datetime.now()
@@ -234,28 +459,16 @@ class NFeXMLParser:
             Tuple (is_valid, error_message)
         """
         try:
-            tree = ET.parse(xml_path)
+            tree = ET.parse(str(xml_path), self._parser)
             root = tree.getroot()
             
-            # Verificar elementos obrigatórios (busca recursiva com namespaces)
-            required_elements = ['ide', 'emit', 'dest', 'det', 'total']
+            # Verificar elementos obrigatórios (busca recursiva, com e sem namespace)
+            if self._xp_all_required(root):
+                return True, None
             
-            for elem in required_elements:
-                # Buscar com e sem namespace
-                found = False
-                
-                # Tentar com namespace
-                for prefix, uri in self.namespaces.items():
-                    if root.find(f'.//{{{uri}}}{elem}') is not None:
-                        found = True
-                        break
-                
-                # Tentar sem namespace
-                if not found:
-                    if root.find(f'.//{elem}') is not None:
-                        found = True
-                
-                if not found:
+            # Falhou: identificar o primeiro elemento ausente
+            for elem, (with_ns, without_ns) in self._xp_required.items():
+                if not (with_ns(root) or without_ns(root)):
                     return False, f"Elemento obrigatório não encontrado: {elem}"
             
             return True, None
@@ -266,6 +479,20 @@ class NFeXMLParser:
             return False, f"Erro ao validar XML: {str(e)}"
 
 
+_NFE_PARSER: Optional[NFeXMLParser] = None
+_NFE_PARSER_LOCK = threading.Lock()
+
+
+def _get_nfe_parser() -> NFeXMLParser:
+    """Retorna o parser compartilhado, criando-o na primeira chamada"""
+    global _NFE_PARSER
+    if _NFE_PARSER is None:
+        with _NFE_PARSER_LOCK:
+            if _NFE_PARSER is None:
+                _NFE_PARSER = NFeXMLParser()
+    return _NFE_PARSER
+
+
 # Função de conveniência
 def parse_nfe_xml(xml_path: str) -> NFe:
     """
@@ -277,6 +504,27 @@ def parse_nfe_xml(xml_path: str) -> NFe:
     Returns:
         Objeto NFe
     """
-    parser = NFeXMLParser()
-    return parser.parse_file(xml_path)
+    return _get_nfe_parser().parse_file(xml_path)
+
 
+def parse_nfe_xml_batch(xml_paths: Iterable[str], max_workers: Optional[int] = None) -> List[NFe]:
+    """
+    Faz parsing de vários arquivos XML de NF-e em paralelo (um processo por núcleo)
+    
+    Cada processo cria seu parser uma única vez. Os resultados seguem a
+    ordem de xml_paths; um arquivo inválido interrompe o lote com ValueError.
+    
+    Args:
+        xml_paths: Caminhos dos arquivos XML
+        max_workers: Número de processos (padrão: número de CPUs)
+    
+    Returns:
+        Lista de objetos NFe
+    """
+    xml_paths = [str(path) for path in xml_paths]
+    if not xml_paths:
+        return []
+    
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers,
+                                                initializer=_get_nfe_parser) as executor:
+        return list(executor.map(parse_nfe_xml, xml_paths, chunksize=16))
@@ -4,17 +4,32 @@ Parser melhorado para arquivos XML de Nota Fiscal Eletrônica (NF-e)
 Com tratamento robusto de diferentes estruturas XML
 """
 
-import xmltodict
+import io
 import lxml.etree as ET
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, IO
 from datetime import datetime
 from pathlib import Path
 import logging
+import threading
 
 from ..models import NFe, ItemNFe, StatusProcessamento
 
 logger = logging.getLogger(__name__)
 
+# Filhos de infNFe usados na extração; o restante do documento é descartado
+_NFE_SECTIONS = frozenset({'ide', 'emit', 'dest', 'total', 'det'})
+
+# Formatos aceitos em _parse_datetime quando a data não é ISO 8601
+_DATETIME_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M:%S'
+)
+
 
 class NFeXMLParserRobusto:
     """
@@ -22,11 +37,10 @@ class NFeXMLParserRobusto:
     Extrai informações estruturadas do XML com tratamento de erros
     """
     
-    def __init__(self):
-        """Inicializa o parser"""
-        self.namespaces = {
-            'nfe': 'http://www.portalfiscal.inf.br/nfe'
-        }
+    # Namespaces conhecidos (constante de classe; o parser não guarda estado por chamada)
+    namespaces = {
+        'nfe': 'http://www.portalfiscal.inf.br/nfe'
+    }
     
     def parse_file(self, xml_path: str) -> NFe:
         """
@@ -46,10 +60,16 @@ class NFeXMLParserRobusto:
         if not xml_path.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {xml_path}")
         
-        with open(xml_path, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
-        
-        return self.parse_string(xml_content)
+        try:
+            # Leitura em streaming direto do disco, respeitando o encoding declarado
+            with open(xml_path, 'rb') as f:
+                nfe_root = self._parse_stream(f)
+            
+            return self._build_nfe(nfe_root)
+            
+        except Exception as e:
+            logger.error(f"Erro ao fazer parsing do XML: {str(e)}")
+            raise ValueError(f"Erro ao fazer parsing do XML: {str(e)}")
     
     def parse_string(self, xml_content: str) -> NFe:
         """
@@ -65,104 +85,129 @@ class NFeXMLParserRobusto:
             ValueError: Se XML for inválido ou incompleto
         """
         try:
-            # Converter XML para dict com proteção contra XXE
-            xml_dict = xmltodict.parse(
-                xml_content,
-                process_namespaces=False,
-                disable_entities=True,
-                process_comments=False,
-                strip_whitespace=True
-            )
-            
-            # Navegar na estrutura do XML com múltiplas tentativas
-            nfe_root = self._find_nfe_root(xml_dict)
-            
-            # Extrair dados com tratamento de erros
-            nfe_data = self._extract_nfe_data_safe(nfe_root)
-            
-            # Criar objeto NFe
-            nfe = NFe(**nfe_data)
-            nfe.status = StatusProcessamento.CONCLUIDO
-            nfe.data_processamento = datetime.now()
+            # Strings já decodificadas são reencodadas em UTF-8, ignorando a declaração do XML
+            nfe_root = self._parse_stream(io.BytesIO(xml_content.encode('utf-8')), encoding='utf-8')
             
-            return nfe
+            return self._build_nfe(nfe_root)
             
         except Exception as e:
             logger.error(f"Erro ao fazer parsing do XML: {str(e)}")
             raise ValueError(f"Erro ao fazer parsing do XML: {str(e)}")
     
-    def _find_nfe_root(self, xml_dict: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_nfe(self, nfe_root: Dict[str, Any]) -> NFe:
         """
-        Encontra a raiz da NF-e em diferentes estruturas XML
+        Cria o objeto NFe a partir das seções extraídas de infNFe
         
         Args:
-            xml_dict: Dict com dados XML parseados
+            nfe_root: Dict com dados da raiz infNFe
         
         Returns:
-            Dict com dados da raiz infNFe
+            Objeto NFe com dados estruturados
         """
-        # Tentar diferentes estruturas possíveis
-        possible_paths = [
-            ['nfeProc', 'NFe', 'infNFe'],
-            ['NFe', 'infNFe'],
-            ['infNFe'],
-            ['nfeProc', 'NFe', 'infNFe', 'infNFe'],  # Estrutura aninhada
-            ['NFe', 'NFe', 'infNFe'],  # Estrutura duplicada
-        ]
-        
-        for path in possible_paths:
-            current = xml_dict
-            try:
-                for key in path:
-                    current = current[key]
-                if isinstance(current, dict):
-                    logger.info(f"Estrutura XML encontrada: {' -> '.join(path)}")
-                    return current
-            except (KeyError, TypeError):
-                continue
+        # Extrair dados com tratamento de erros
+        nfe_data = self._extract_nfe_data_safe(nfe_root)
+        
+        # Criar objeto NFe
+        nfe = NFe(**nfe_data)
+        nfe.status = StatusProcessamento.CONCLUIDO
+        nfe.data_processamento = datetime.now()
         
-        # Se não encontrou, tentar busca recursiva
-        return self._find_nfe_root_recursive(xml_dict)
+        return nfe
     
-    def _find_nfe_root_recursive(self, data: Any, depth: int = 0) -> Dict[str, Any]:
+    def _parse_stream(self, source: IO[bytes], encoding: Optional[str] = None) -> Dict[str, Any]:
         """
-        Busca recursiva pela raiz infNFe
+        Lê o XML em passagem única (iterparse) e monta apenas as seções usadas de infNFe
+        
+        O primeiro infNFe do documento é usado, em qualquer nível (nfeProc,
+        NFe, infNFe na raiz ou lotes). Cada seção vira um dict no formato do
+        xmltodict ('@atributo', '#text', listas para tags repetidas) e é
+        liberada da árvore logo em seguida; a leitura para no fim do infNFe.
         
         Args:
-            data: Dados para buscar
-            depth: Profundidade atual (limite de segurança)
+            source: Arquivo ou buffer binário com o XML
+            encoding: Encoding forçado (None respeita a declaração do XML)
         
         Returns:
             Dict com dados da raiz infNFe
+        
+        Raises:
+            ValueError: Se não houver infNFe no documento
         """
-        if depth > 10:  # Limite de profundidade
-            raise ValueError("Estrutura XML muito profunda ou inválida")
+        context = ET.iterparse(
+            source,
+            events=('start', 'end'),
+            encoding=encoding,
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            remove_blank_text=True,
+            huge_tree=False
+        )
         
-        if isinstance(data, dict):
-            # Se encontrou infNFe, retornar
-            if 'infNFe' in data:
-                return data['infNFe']
+        inf_nfe = None
+        nfe_root: Dict[str, Any] = {}
+        
+        for event, elem in context:
+            if inf_nfe is None:
+                if event == 'start' and ET.QName(elem).localname == 'infNFe':
+                    inf_nfe = elem
+                    nfe_root.update((f'@{ET.QName(key).localname}', value) for key, value in elem.attrib.items())
+                continue
             
-            # Buscar recursivamente em todos os valores
-            for value in data.values():
-                try:
-                    result = self._find_nfe_root_recursive(value, depth + 1)
-                    if result:
-                        return result
-                except ValueError:
-                    continue
+            if elem is inf_nfe:
+                break
+            
+            # Só interessam os filhos diretos de infNFe, ao final de cada um
+            if event != 'end' or elem.getparent() is not inf_nfe:
+                continue
+            
+            name = ET.QName(elem).localname
+            if name == 'det':
+                nfe_root.setdefault('det', []).append(self._element_to_dict(elem))
+            elif name in _NFE_SECTIONS and name not in nfe_root:
+                nfe_root[name] = self._element_to_dict(elem)
+            
+            # Liberar a seção já processada e as anteriores
+            elem.clear()
+            while elem.getprevious() is not None:
+                del inf_nfe[0]
         
-        elif isinstance(data, list):
-            # Buscar em cada item da lista
-            for item in data:
-                try:
-                    result = self._find_nfe_root_recursive(item, depth + 1)
-                    if result:
-                        return result
-                except ValueError:
-                    continue
+        if inf_nfe is None:
+            raise ValueError("Estrutura XML inválida: raiz infNFe não encontrada")
         
-        raise ValueError("Estrutura XML inválida: raiz infNFe não encontrada")
+        return nfe_root
+    
+    def _element_to_dict(self, elem) -> Any:
+        """
+        Converte um elemento no valor equivalente do xmltodict
+        
+        Args:
+            elem: Elemento lxml
+        
+        Returns:
+            Texto (ou None se vazio) para folhas sem atributos, senão dict
+        """
+        text = (elem.text or '').strip()
+        if not len(elem) and not elem.attrib:
+            return text or None
+        
+        result: Dict[str, Any] = {
+            f'@{ET.QName(key).localname}': value for key, value in elem.attrib.items()
+        }
+        for child in elem:
+            key = ET.QName(child).localname
+            value = self._element_to_dict(child)
+            
+            if key not in result:
+                result[key] = value
+            elif isinstance(result[key], list):
+                result[key].append(value)
+            else:
+                result[key] = [result[key], value]
+        
+        if text:
+            result['#text'] = text
+        return result
     
     def _extract_nfe_data_safe(self, nfe_root: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -426,18 +471,13 @@ class NFeXMLParserRobusto:
         if not date_str:
             return datetime.now()
         
-        # Formatos possíveis
-        formats = [
-            '%Y-%m-%dT%H:%M:%S',
-            '%Y-%m-%dT%H:%M:%S.%f',
-            '%Y-%m-%dT%H:%M:%S%z',
-            '%Y-%m-%dT%H:%M:%S.%f%z',
-            '%Y-%m-%d',
-            '%d/%m/%Y',
-            '%d/%m/%Y %H:%M:%S'
-        ]
-        
-        for fmt in formats:
+        # Caminho rápido: ISO 8601 (dhEmi) pelo parser em C
+        try:
+            return datetime.fromisoformat(date_str)
+        except (ValueError, TypeError):
+            pass
+        
+        for fmt in _DATETIME_FORMATS:
             try:
                 return datetime.strptime(date_str, fmt)
             except ValueError:
@@ -448,6 +488,20 @@ class NFeXMLParserRobusto:
         return datetime.now()
 
 
+_PARSER: Optional[NFeXMLParserRobusto] = None
+_PARSER_LOCK = threading.Lock()
+
+
+def _get_parser() -> NFeXMLParserRobusto:
+    """Retorna o parser compartilhado, criando-o na primeira chamada"""
+    global _PARSER
+    if _PARSER is None:
+        with _PARSER_LOCK:
+            if _PARSER is None:
+                _PARSER = NFeXMLParserRobusto()
+    return _PARSER
+
+
 def parse_nfe_xml_robusto(xml_path: str) -> NFe:
     """
     Função de conveniência para parsing robusto de NF-e
@@ -458,8 +512,7 @@ def parse_nfe_xml_robusto(xml_path: str) -> NFe:
     Returns:
         Objeto NFe com dados estruturados
     """
-    parser = NFeXMLParserRobusto()
-    return parser.parse_file(xml_path)
+    return _get_parser().parse_file(xml_path)
 
 
 def parse_nfe_xml_string_robusto(xml_content: str) -> NFe:
@@ -472,5 +525,4 @@ def parse_nfe_xml_string_robusto(xml_content: str) -> NFe:
     Returns:
         Objeto NFe com dados estruturados
     """
-    parser = NFeXMLParserRobusto()
-    return parser.parse_string(xml_content)
+    return _get_parser().parse_string(xml_content)
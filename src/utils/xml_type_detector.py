@@ -3,43 +3,83 @@ FiscalAI MVP - XML Type Detector
 Detector automático do tipo de documento fiscal XML
 """
 
-import xmltodict
-from typing import Dict, Any, Optional, Tuple
+import io
+import lxml.etree as ET
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, IO, Iterator, Mapping
 from pathlib import Path
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Elementos que identificam o tipo em qualquer ponto do documento (em ordem de prioridade)
+_CONTENT_MARKERS = (
+    ('nfse', ('ConsultarNfseResposta', 'ListaNfse')),
+    ('nfe', ('nfeProc', 'infNFe')),
+    ('cte', ('cteProc', 'infCte')),
+    ('mdfe', ('mdfeProc', 'infMDFe')),
+)
+
+
+def _index_types(supported_types: Mapping[str, Mapping[str, Any]], field: str) -> Mapping[str, str]:
+    """
+    Mapeia cada valor de um campo dos tipos suportados para o tipo que o declara
+    
+    Args:
+        supported_types: Tipos suportados (XMLTypeDetector.supported_types)
+        field: 'root_elements' ou 'namespaces'
+    
+    Returns:
+        Mapeamento imutável valor -> tipo (o primeiro tipo que declara o valor)
+    """
+    index: Dict[str, str] = {}
+    for doc_type, type_info in supported_types.items():
+        for value in type_info[field]:
+            index.setdefault(value, doc_type)
+    return MappingProxyType(index)
+
 
 class XMLTypeDetector:
     """
     Detecta automaticamente o tipo de documento fiscal XML
     """
     
+    # Tipos suportados (tabela imutável, compartilhada entre instâncias)
+    supported_types: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+        'nfe': MappingProxyType({
+            'root_elements': ('nfeProc', 'NFe', 'infNFe'),
+            'namespaces': ('http://www.portalfiscal.inf.br/nfe',),
+            'description': 'Nota Fiscal Eletrônica (NF-e)'
+        }),
+        'nfse': MappingProxyType({
+            'root_elements': ('ConsultarNfseResposta', 'ListaNfse', 'CompNfse'),
+            'namespaces': ('http://www.abrasf.org.br/ABRASF/arquivos/nfse.xsd',),
+            'description': 'Nota Fiscal de Serviços Eletrônica (NFS-e)'
+        }),
+        'cte': MappingProxyType({
+            'root_elements': ('cteProc', 'CTe', 'infCte'),
+            'namespaces': ('http://www.portalfiscal.inf.br/cte',),
+            'description': 'Conhecimento de Transporte Eletrônico (CT-e)'
+        }),
+        'mdfe': MappingProxyType({
+            'root_elements': ('mdfeProc', 'MDFe', 'infMDFe'),
+            'namespaces': ('http://www.portalfiscal.inf.br/mdfe',),
+            'description': 'Manifesto Eletrônico de Documentos Fiscais (MDF-e)'
+        })
+    })
+    
+    # Índices: elemento raiz / namespace -> tipo
+    _root_to_type = _index_types(supported_types, 'root_elements')
+    _namespace_to_type = _index_types(supported_types, 'namespaces')
+    # Ordem de prioridade entre tipos com namespaces no mesmo documento
+    _type_priority = tuple(supported_types)
+    
     def __init__(self):
         """Inicializa o detector"""
-        self.supported_types = {
-            'nfe': {
-                'root_elements': ['nfeProc', 'NFe', 'infNFe'],
-                'namespaces': ['http://www.portalfiscal.inf.br/nfe'],
-                'description': 'Nota Fiscal Eletrônica (NF-e)'
-            },
-            'nfse': {
-                'root_elements': ['ConsultarNfseResposta', 'ListaNfse', 'CompNfse'],
-                'namespaces': ['http://www.abrasf.org.br/ABRASF/arquivos/nfse.xsd'],
-                'description': 'Nota Fiscal de Serviços Eletrônica (NFS-e)'
-            },
-            'cte': {
-                'root_elements': ['cteProc', 'CTe', 'infCte'],
-                'namespaces': ['http://www.portalfiscal.inf.br/cte'],
-                'description': 'Conhecimento de Transporte Eletrônico (CT-e)'
-            },
-            'mdfe': {
-                'root_elements': ['mdfeProc', 'MDFe', 'infMDFe'],
-                'namespaces': ['http://www.portalfiscal.inf.br/mdfe'],
-                'description': 'Manifesto Eletrônico de Documentos Fiscais (MDF-e)'
-            }
-        }
+        self._detect_file_cached = lru_cache(maxsize=1024)(self._detect_file)
     
     def detect_type(self, xml_path: str) -> Tuple[str, str, Dict[str, Any]]:
         """
@@ -48,37 +88,76 @@ class XMLTypeDetector:
         Args:
             xml_path: Caminho para o arquivo XML
         
+        Returns:
+            Tuple (tipo, descricao, metadados)
+        """
+        # Memorizado por (caminho, mtime, tamanho): arquivo alterado é detectado de novo
+        try:
+            st = os.stat(xml_path)
+        except OSError:
+            return self._detect_file(str(xml_path), None, None)
+        
+        doc_type, description, metadata = self._detect_file_cached(str(xml_path), st.st_mtime_ns, st.st_size)
+        # Cópia: o resultado em cache é compartilhado entre chamadas
+        return doc_type, description, {key: list(value) for key, value in metadata.items()}
+    
+    def _detect_file(self, xml_path: str, mtime_ns: Optional[int], size: Optional[int]) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Lê o arquivo e detecta o tipo
+        
+        Args:
+            xml_path: Caminho para o arquivo XML
+            mtime_ns: mtime do arquivo (apenas chave do cache)
+            size: Tamanho do arquivo (apenas chave do cache)
+        
+        Returns:
+            Tuple (tipo, descricao, metadados)
+        """
+        try:
+            # Elementos lidos em streaming, sem carregar o arquivo inteiro
+            with open(xml_path, 'rb') as f:
+                return self._detect_stream(f)
+        except OSError as e:
+            logger.error(f"Erro ao detectar tipo do XML: {e}")
+            return 'unknown', f'Erro na detecção: {str(e)}', {}
+    
+    def detect_type_string(self, content: str) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Detecta o tipo de documento fiscal a partir do conteúdo XML em memória
+        
+        Args:
+            content: Conteúdo XML como string
+        
+        Returns:
+            Tuple (tipo, descricao, metadados)
+        """
+        # Strings já decodificadas são reencodadas em UTF-8, ignorando a declaração do XML
+        return self._detect_stream(io.BytesIO(content.encode('utf-8')), encoding='utf-8')
+    
+    def _detect_stream(self, source: IO[bytes], encoding: Optional[str] = None) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Detecta o tipo lendo os elementos do XML em streaming
+        
+        Args:
+            source: Arquivo ou buffer binário com o XML
+            encoding: Encoding forçado (None respeita a declaração do XML)
+        
         Returns:
             Tuple (tipo, descricao, metadados)
         """
         try:
-            # Ler o arquivo completo para análise
-            with open(xml_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Tentar fazer parsing do XML
             try:
-                # Limpar quebras de linha e espaços extras
-                content_clean = ' '.join(content.split())
-                xml_dict = xmltodict.parse(
-                    content_clean,
-                    process_namespaces=False,
-                    disable_entities=True,
-                    process_comments=False,
-                    strip_whitespace=True
-                )
-            except Exception as e:
+                detected_type = self._analyze_structure(self._iter_elements(source, encoding))
+            except ET.XMLSyntaxError as e:
                 logger.warning(f"Erro ao fazer parsing do XML: {e}")
                 return 'unknown', 'Documento XML não reconhecido', {}
             
-            # Analisar estrutura do XML
-            detected_type = self._analyze_structure(xml_dict, content)
-            
             if detected_type in self.supported_types:
                 type_info = self.supported_types[detected_type]
+                # Listas novas: a tabela de tipos guarda tuplas imutáveis
                 return detected_type, type_info['description'], {
-                    'root_elements': type_info['root_elements'],
-                    'namespaces': type_info['namespaces']
+                    'root_elements': list(type_info['root_elements']),
+                    'namespaces': list(type_info['namespaces'])
                 }
             else:
                 return 'unknown', 'Tipo de documento não suportado', {}
@@ -87,52 +166,81 @@ class XMLTypeDetector:
             logger.error(f"Erro ao detectar tipo do XML: {e}")
             return 'unknown', f'Erro na detecção: {str(e)}', {}
     
-    def _analyze_structure(self, xml_dict: Dict[str, Any], content: str) -> str:
+    def _iter_elements(self, source: IO[bytes], encoding: Optional[str] = None) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Gera (nome local, namespace) de cada elemento, na ordem do documento
+        
+        Args:
+            source: Arquivo ou buffer binário com o XML
+            encoding: Encoding forçado (None respeita a declaração do XML)
+        
+        Returns:
+            Iterador de tuplas (nome local, namespace ou None)
+        """
+        context = ET.iterparse(
+            source,
+            events=('start', 'end'),
+            encoding=encoding,
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            huge_tree=False
+        )
+        
+        for event, elem in context:
+            if event == 'start':
+                qname = ET.QName(elem)
+                yield qname.localname, qname.namespace
+            else:
+                # Elemento já visitado: liberar da árvore
+                elem.clear()
+    
+    def _analyze_structure(self, elements: Iterator[Tuple[str, Optional[str]]]) -> str:
         """
         Analisa a estrutura do XML para determinar o tipo
         
+        A leitura para assim que o tipo é definido pelo elemento raiz (caso
+        comum) ou por um namespace do tipo de maior prioridade. Entre vários
+        namespaces conhecidos vale a ordem de supported_types; sem nenhum,
+        vale o primeiro marcador de conteúdo, por ordem de prioridade.
+        
         Args:
-            xml_dict: Dict com dados XML parseados
-            content: Conteúdo XML como string
+            elements: Iterador de (nome local, namespace) em ordem de documento
         
         Returns:
             Tipo detectado
         """
-        # Verificar elementos raiz
-        root_keys = list(xml_dict.keys())
-        
-        # Verificar namespaces no conteúdo
-        namespaces_found = []
-        for namespace in ['http://www.portalfiscal.inf.br/nfe', 
-                         'http://www.abrasf.org.br/ABRASF/arquivos/nfse.xsd',
-                         'http://www.portalfiscal.inf.br/cte',
-                         'http://www.portalfiscal.inf.br/mdfe']:
-            if namespace in content:
-                namespaces_found.append(namespace)
-        
-        # Detectar por elementos raiz
-        for doc_type, type_info in self.supported_types.items():
-            for root_element in type_info['root_elements']:
-                if root_element in root_keys:
-                    logger.info(f"Tipo detectado por elemento raiz: {doc_type} (elemento: {root_element})")
+        markers_found = set()
+        # Tipo -> primeiro namespace encontrado daquele tipo
+        namespaces_found: Dict[str, str] = {}
+        
+        for position, (name, namespace) in enumerate(elements):
+            # Detectar por elemento raiz
+            if position == 0:
+                doc_type = self._root_to_type.get(name)
+                if doc_type:
+                    logger.info(f"Tipo detectado por elemento raiz: {doc_type} (elemento: {name})")
                     return doc_type
+            
+            doc_type = self._namespace_to_type.get(namespace)
+            if doc_type:
+                namespaces_found.setdefault(doc_type, namespace)
+                # Nenhum tipo tem prioridade maior: o resto do documento não muda o resultado
+                if doc_type == self._type_priority[0]:
+                    break
+            
+            markers_found.add(name)
         
         # Detectar por namespace
-        for doc_type, type_info in self.supported_types.items():
-            for namespace in type_info['namespaces']:
-                if namespace in namespaces_found:
-                    logger.info(f"Tipo detectado por namespace: {doc_type} (namespace: {namespace})")
-                    return doc_type
+        for doc_type in self._type_priority:
+            if doc_type in namespaces_found:
+                logger.info(f"Tipo detectado por namespace: {doc_type} (namespace: {namespaces_found[doc_type]})")
+                return doc_type
         
         # Detectar por conteúdo específico
-        if 'ConsultarNfseResposta' in content or 'ListaNfse' in content:
-            return 'nfse'
-        elif 'nfeProc' in content or 'infNFe' in content:
-            return 'nfe'
-        elif 'cteProc' in content or 'infCte' in content:
-            return 'cte'
-        elif 'mdfeProc' in content or 'infMDFe' in content:
-            return 'mdfe'
+        for doc_type, markers in _CONTENT_MARKERS:
+            if any(marker in markers_found for marker in markers):
+                return doc_type
         
         return 'unknown'
     
@@ -160,6 +268,20 @@ class XMLTypeDetector:
         return doc_type != 'unknown'
 
 
+_DETECTOR: Optional[XMLTypeDetector] = None
+_DETECTOR_LOCK = threading.Lock()
+
+
+def _get_detector() -> XMLTypeDetector:
+    """Retorna o detector compartilhado, criando-o na primeira chamada"""
+    global _DETECTOR
+    if _DETECTOR is None:
+        with _DETECTOR_LOCK:
+            if _DETECTOR is None:
+                _DETECTOR = XMLTypeDetector()
+    return _DETECTOR
+
+
 # Função de conveniência
 def detect_xml_type(xml_path: str) -> Tuple[str, str, Dict[str, Any]]:
     """
@@ -171,5 +293,4 @@ def detect_xml_type(xml_path: str) -> Tuple[str, str, Dict[str, Any]]:
     Returns:
         Tuple (tipo, descricao, metadados)
     """
-    detector = XMLTypeDetector()
-    return detector.detect_type(xml_path)
+    return _get_detector().detect_type(xml_path)
@@ -0,0 +1,87 @@
+"""
+FiscalAI MVP - Testes do Parser de Múltiplas NFS-e
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils.nfse_multiple_parser import NFeSEMultipleParser
+
+
+def _comp_nfse(numero: str) -> str:
+    return (
+        f'<CompNfse><Nfse versao="1"><InfNfse Id="n{numero}">'
+        f'<Numero>{numero}</Numero><CodigoVerificacao>AB{numero}</CodigoVerificacao>'
+        '<DataEmissao>2024-03-15T10:30:00</DataEmissao>'
+        '<Servico><Valores><ValorServicos>100.00</ValorServicos><ValorIss>5.00</ValorIss>'
+        '<ValorLiquidoNfse>100.00</ValorLiquidoNfse></Valores>'
+        '<ItemListaServico>0107</ItemListaServico><Discriminacao>Consultoria</Discriminacao></Servico>'
+        '<PrestadorServico><IdentificacaoPrestador><Cnpj>12345678000190</Cnpj></IdentificacaoPrestador>'
+        '<RazaoSocial>Prestador</RazaoSocial></PrestadorServico>'
+        '<TomadorServico><IdentificacaoTomador><CpfCnpj><Cpf>98765432100</Cpf></CpfCnpj></IdentificacaoTomador>'
+        '<RazaoSocial>Tomador</RazaoSocial></TomadorServico>'
+        '</InfNfse></Nfse></CompNfse>'
+    )
+
+
+def _documento(corpo: str, raiz: str = "ConsultarNfseResposta") -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<{raiz} xmlns="http://www.abrasf.org.br/nfse.xsd">{corpo}</{raiz}>'
+    )
+
+
+class TestIterParseFile(unittest.TestCase):
+    """Leitura incremental com a mesma estrutura aceita por parse_string"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.parser = NFeSEMultipleParser()
+
+    def _comparar(self, xml: str):
+        """Resultado (números ou mensagem de erro) do arquivo e da string"""
+        caminho = Path(self.tmp.name) / "nfse.xml"
+        caminho.write_text(xml, encoding="utf-8")
+
+        resultados = []
+        for parse in (lambda: list(self.parser.iter_parse_file(str(caminho))),
+                      lambda: self.parser.parse_string(xml)):
+            try:
+                resultados.append([nfe.numero for nfe in parse()])
+            except ValueError as e:
+                resultados.append(str(e))
+        self.assertEqual(resultados[0], resultados[1])
+        return resultados[0]
+
+    def test_todas_as_notas_da_lista(self):
+        xml = _documento("<ListaNfse>" + "".join(_comp_nfse(n) for n in "123") + "</ListaNfse>")
+        self.assertEqual(self._comparar(xml), ["1", "2", "3"])
+
+    def test_comp_nfse_fora_da_lista_ignorado(self):
+        xml = _documento(
+            f"<Outro>{_comp_nfse('9')}</Outro>"
+            f"<ListaNfse>{_comp_nfse('1')}<Extra>{_comp_nfse('8')}</Extra></ListaNfse>"
+        )
+        self.assertEqual(self._comparar(xml), ["1"])
+
+    def test_raiz_invalida(self):
+        xml = _documento(f"<ListaNfse>{_comp_nfse('1')}</ListaNfse>", raiz="OutraResposta")
+        self.assertIn("ConsultarNfseResposta não encontrada", self._comparar(xml))
+
+    def test_lista_sem_notas(self):
+        xml = _documento("<ListaNfse><MensagemRetorno>Nenhuma nota</MensagemRetorno></ListaNfse>")
+        self.assertIn("ListaNfse não encontrada", self._comparar(xml))
+
+    def test_sem_lista(self):
+        xml = _documento(f"<Outro>{_comp_nfse('1')}</Outro>")
+        self.assertIn("ListaNfse não encontrada", self._comparar(xml))
+
+
+if __name__ == "__main__":
+    unittest.main()
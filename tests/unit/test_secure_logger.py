@@ -0,0 +1,147 @@
+"""
+FiscalAI MVP - Testes do Logger Seguro
+"""
+
+import unittest
+import sys
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils import secure_logger
+from src.utils.secure_logger import SecureLogger
+
+
+# (dados extras, saída da antiga sanitização recursiva _sanitize_data)
+CASOS_SANITIZACAO = [
+    (
+        {"usuario": "ana", "senha": "x1"},
+        {"usuario": "ana", "senha": "[REDACTED]"},
+    ),
+    (
+        {"Api_Key": "k", "nested": {"token": {"a": 1}, "lista": [1, {"cpf": "123"}]}},
+        {"Api_Key": "[REDACTED]", "nested": {"token": "[REDACTED]", "lista": [1, {"cpf": "[REDACTED]"}]}},
+    ),
+    (
+        {"msg": "login senha=abc123 ok", "obs": "password: 'q w'", "x": "email: a@b.com fim"},
+        {"msg": "login senha: [REDACTED] ok", "obs": "password: [REDACTED] w'", "x": "email: [REDACTED] fim"},
+    ),
+    (
+        {"info": ["token=zz9", "nada", 5, None, True]},
+        {"info": ["token: [REDACTED]", "nada", 5, None, True]},
+    ),
+    (
+        {"descricao": "cnpj: 12.345/0001-99", "valor": 10.5},
+        {"descricao": "cnpj: [REDACTED]", "valor": 10.5},
+    ),
+    (
+        {"texto": "aspas \"senha\"=\"s3\" e chave_api=k\\\\2"},
+        {"texto": "aspas \"senha\"=\"s3\" e chave_api: [REDACTED]"},
+    ),
+    (
+        {"emailCliente": ["a", "b"], "telefone_fixo": 123, "ok": {"deep": {"secret_x": "s"}}},
+        {"emailCliente": "[REDACTED]", "telefone_fixo": "[REDACTED]", "ok": {"deep": {"secret_x": "[REDACTED]"}}},
+    ),
+    (
+        {"obs": "credit_card=4111 e cartao_credito: 5555"},
+        {"obs": "credit_card: [REDACTED] e cartao_credito: [REDACTED]"},
+    ),
+    (
+        {"k": "password:\n abc", "t": "password:\tabc"},
+        {"k": "password: [REDACTED]", "t": "password: [REDACTED]"},
+    ),
+    (
+        {"obs": "token\t=\r\n\"zz\" fim", "contato": ["email:\n a@b.com"]},
+        {"obs": "token: [REDACTED] fim", "contato": ["email: [REDACTED]"]},
+    ),
+]
+
+
+class TestRedacaoJSON(unittest.TestCase):
+    """A redação sobre o JSON serializado preserva a sanitização campo a campo"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.logger = SecureLogger(name="teste_redacao", log_dir=self.tmp.name)
+
+    def _redigir(self, dados, **dumps_kwargs):
+        return json.loads(self.logger._redact_json(json.dumps(dados, **dumps_kwargs)))
+
+    def test_redacao_igual_a_sanitizacao_por_campo(self):
+        for dados, esperado in CASOS_SANITIZACAO:
+            with self.subTest(dados=dados):
+                self.assertEqual(self._redigir(dados, ensure_ascii=False), esperado)
+
+    def test_redacao_com_json_compacto(self):
+        """Mesmo resultado com o JSON sem espaços (como o orjson serializa)"""
+        for dados, esperado in CASOS_SANITIZACAO:
+            with self.subTest(dados=dados):
+                self.assertEqual(self._redigir(dados, separators=(",", ":")), esperado)
+
+    @unittest.skipUnless(secure_logger.ORJSON_AVAILABLE, "orjson não instalado")
+    def test_redacao_com_orjson(self):
+        import orjson
+        for dados, esperado in CASOS_SANITIZACAO:
+            with self.subTest(dados=dados):
+                texto = orjson.dumps(dados).decode("utf-8")
+                self.assertEqual(json.loads(self.logger._redact_json(texto)), esperado)
+
+
+class TestHandlers(unittest.TestCase):
+    """Configuração preguiçosa dos handlers e troca de instância"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.nome = f"teste_handlers_{id(self)}"
+        self.addCleanup(lambda: secure_logger._stop_listener(secure_logger._QUEUE_LISTENERS.pop(self.nome, None)))
+
+    def _logger(self) -> SecureLogger:
+        return SecureLogger(name=self.nome, log_dir=self.tmp.name, production_mode=True)
+
+    def _linhas_log(self):
+        return (Path(self.tmp.name) / f"{self.nome}.log").read_text(encoding="utf-8").splitlines()
+
+    def test_primeiro_log_concorrente_configura_uma_vez(self):
+        logger = self._logger()
+        barreira = threading.Barrier(8)
+
+        def logar(i):
+            barreira.wait()
+            logger.info(f"mensagem {i}")
+
+        threads = [threading.Thread(target=logar, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(logger.logger.handlers), 1)
+        secure_logger._stop_listener(secure_logger._QUEUE_LISTENERS.pop(self.nome))
+        self.assertEqual(len(self._linhas_log()), 8)
+
+    def test_nova_instancia_para_listener_anterior(self):
+        antigo = self._logger()
+        antigo.info("antes")
+        listener_antigo = antigo._queue_listener
+
+        novo = self._logger()
+
+        self.assertIsNone(listener_antigo._thread)
+        self.assertEqual(novo.logger.handlers, [])
+        self.assertEqual(len(self._linhas_log()), 1)
+
+        novo.info("depois")
+        self.assertEqual(len(novo.logger.handlers), 1)
+        self.assertIsNot(secure_logger._QUEUE_LISTENERS[self.nome], listener_antigo)
+        secure_logger._stop_listener(secure_logger._QUEUE_LISTENERS.pop(self.nome))
+        self.assertEqual(len(self._linhas_log()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+FiscalAI MVP - Testes do Parser Fiscal Inteligente
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils.smart_fiscal_parser import parse_fiscal_document_smart, parse_fiscal_documents_smart
+
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "data" / "samples"
+
+
+class TestParseFiscalDocumentsSmart(unittest.TestCase):
+    """Processamento em lote com processos"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nfe_xml = (SAMPLES_DIR / "nfe_exemplo.xml").read_text(encoding="utf-8")
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def _nfe(self, nome: str, numero: str) -> str:
+        caminho = self.dir / nome
+        caminho.write_text(self.nfe_xml.replace("<nNF>12345</nNF>", f"<nNF>{numero}</nNF>"), encoding="utf-8")
+        return str(caminho)
+
+    def test_resultados_na_ordem_dos_caminhos(self):
+        numeros = ["4", "8", "2", "6", "1"]
+        caminhos = [self._nfe(f"nota_{i}.xml", numero) for i, numero in enumerate(numeros)]
+
+        resultados = list(parse_fiscal_documents_smart(caminhos, workers=2, chunksize=2))
+
+        self.assertEqual([r.nfe.numero for r in resultados], numeros)
+        self.assertEqual({r.document_type for r in resultados}, {"nfe"})
+
+    def test_lote_igual_ao_processamento_individual(self):
+        caminho = self._nfe("nota.xml", "10")
+
+        [lote] = parse_fiscal_documents_smart([caminho], workers=1)
+        individual = parse_fiscal_document_smart(caminho)
+
+        self.assertEqual(lote.metadata, individual.metadata)
+        self.assertEqual(lote.document_description, individual.document_description)
+
+    def test_arquivo_invalido_interrompe_lote(self):
+        caminhos = [self._nfe("a.xml", "1"), str(self.dir / "b.xml")]
+        Path(caminhos[1]).write_text("<nfeProc>", encoding="utf-8")
+
+        with self.assertRaises(ValueError):
+            list(parse_fiscal_documents_smart(caminhos, workers=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+FiscalAI MVP - Testes do Gerenciador de Tabelas Fiscais
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils import tabelas_fiscais
+from src.utils.tabelas_fiscais import GerenciadorTabelasFiscais
+
+
+NCM_CSV = (
+    "NCM;Descricao;Categoria\n"
+    "8471.30.12;Computador portátil;Informática\n"
+    "4011.10.00;Pneu novo;Borracha\n"
+    "0101.21.00;Cavalo reprodutor;Animais\n"
+)
+
+
+class TestTabelasFiscais(unittest.TestCase):
+    """Consultas às tabelas carregadas de arquivo"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.caminho_ncm = self.dir / "BaseDESC_NCM.csv"
+        self.caminho_ncm.write_text(NCM_CSV, encoding="utf-8")
+
+        patcher = mock.patch.object(tabelas_fiscais, "_CACHE_DIR", self.dir / "cache")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _gerenciador(self) -> GerenciadorTabelasFiscais:
+        manager = GerenciadorTabelasFiscais()
+        self.assertTrue(manager.inicializar(str(self.caminho_ncm), str(self.dir / "sem_cfop.xlsx")))
+        return manager
+
+    def test_buscar_ncm_csv_por_codigo(self):
+        """O mapa de um CSV é indexado pelo código NCM, não pelo número da linha"""
+        manager = self._gerenciador()
+
+        info = manager.buscar_ncm("84713012")
+        self.assertIsNotNone(info)
+        self.assertEqual(info["descricao"], "Computador portátil")
+        self.assertEqual(info["categoria"], "Informática")
+
+        self.assertIsNone(manager.buscar_ncm("0"))
+        self.assertIsNone(manager.buscar_ncm("1"))
+
+    def test_csv_com_linha_invalida(self):
+        """Linhas com campos a mais são ignoradas, como no LeitorTabelasFiscais"""
+        self.caminho_ncm.write_text(NCM_CSV + "8714.10.00;Peça;Veículos;extra\n", encoding="utf-8")
+
+        df = tabelas_fiscais._carregar_ncm_rapido(str(self.caminho_ncm))
+        self.assertEqual(sorted(df.index), ["01012100", "40111000", "84713012"])
+
+        manager = self._gerenciador()
+        self.assertTrue(manager.validar_ncm("40111000"))
+        self.assertFalse(manager.validar_ncm("12345678"))
+
+    def test_csv_com_cabecalho_entre_aspas(self):
+        """Nomes de coluna entre aspas (e BOM) são reconhecidos"""
+        self.caminho_ncm.write_text(
+            '\ufeff"ncm";"descricao"\n"8471.30.12";"Computador portátil"\n', encoding="utf-8"
+        )
+
+        df = tabelas_fiscais._carregar_ncm_rapido(str(self.caminho_ncm))
+        self.assertEqual(df.loc["84713012", "descricao"], "Computador portátil")
+
+        manager = self._gerenciador()
+        self.assertEqual(manager.buscar_ncm("84713012")["descricao"], "Computador portátil")
+        self.assertIsNone(manager.buscar_ncm("12345678"))
+
+    def test_buscar_ncm_csv_via_snapshot(self):
+        """A segunda carga vem do snapshot e continua indexada por código"""
+        self._gerenciador()
+        manager = self._gerenciador()
+
+        self.assertIsNone(manager.df_ncm)
+        self.assertTrue(manager.validar_ncm("01012100"))
+        self.assertFalse(manager.validar_ncm("0"))
+        self.assertIn("84713012", manager.obter_tabela_ncm().index)
+
+    def test_snapshot_invalidado_quando_origem_muda(self):
+        """Alterar o arquivo de origem gera snapshot novo e remove o antigo"""
+        self._gerenciador()
+        antigos = set((self.dir / "cache").iterdir())
+
+        self.caminho_ncm.write_text(NCM_CSV + "2201.10.00;Água mineral;Bebidas\n", encoding="utf-8")
+        manager = self._gerenciador()
+
+        self.assertTrue(manager.validar_ncm("22011000"))
+        atuais = set((self.dir / "cache").iterdir())
+        self.assertFalse(antigos & atuais)
+        self.assertEqual(len(atuais), 2)
+        self.assertFalse([a for a in atuais if a.suffix in (".pkl", ".tmp")])
+
+    def test_snapshot_corrompido_recarrega_da_origem(self):
+        """Tabela de snapshot ilegível é descartada e recarregada do arquivo de origem"""
+        self._gerenciador()
+        for arquivo in (self.dir / "cache").glob("*.parquet"):
+            arquivo.write_bytes(b"corrompido")
+
+        manager = self._gerenciador()
+        tabela = manager.obter_tabela_ncm()
+
+        self.assertIn("40111000", tabela.index)
+        self.assertEqual(manager.buscar_ncm("40111000")["descricao"], "Pneu novo")
+        self.assertEqual(len(list((self.dir / "cache").glob("*.parquet"))), 1)
+
+    def test_mapa_de_snapshot_corrompido_e_descartado(self):
+        """Mapa de snapshot ilegível não impede a carga da origem"""
+        self._gerenciador()
+        for arquivo in (self.dir / "cache").glob("*.json"):
+            arquivo.write_text("{", encoding="utf-8")
+
+        manager = self._gerenciador()
+
+        self.assertIsNotNone(manager.df_ncm)
+        self.assertTrue(manager.validar_ncm("84713012"))
+
+
+    def test_lote_concorda_com_consulta_individual(self):
+        """validar/buscar em lote e buscar_ncm usam o mesmo dict indexado por código"""
+        manager = self._gerenciador()
+        codigos = ["84713012", "0", "99999999", "40111000"]
+
+        validos = manager.validar_ncm_lote(codigos)
+        self.assertEqual(validos.tolist(), [manager.validar_ncm(codigo) for codigo in codigos])
+        self.assertEqual(validos.tolist(), [True, False, False, True])
+
+        registros = manager.buscar_ncm_lote(codigos)
+        self.assertEqual(list(registros.index), codigos)
+        self.assertEqual(registros.loc["40111000", "descricao"], "Pneu novo")
+        self.assertIsNone(registros.loc["0", "descricao"])
+
+    def test_lote_nao_carrega_tabela_do_snapshot(self):
+        """Consultas em lote não forçam a leitura da tabela do snapshot"""
+        self._gerenciador()
+        manager = self._gerenciador()
+
+        self.assertTrue(manager.validar_ncm_lote(["01012100"])[0])
+        manager.buscar_ncm_lote(["01012100"])
+        self.assertIsNone(manager.df_ncm)
+        self.assertIn("ncm", manager._snapshots)
+
+    def test_validar_codigos_itens(self):
+        """Um documento é validado com uma consulta em lote por tabela"""
+        manager = self._gerenciador()
+        itens = [
+            mock.Mock(ncm_declarado="84713012", cfop="1101"),
+            mock.Mock(ncm_declarado="12345678", cfop="9999"),
+        ]
+
+        resultado = manager.validar_codigos_itens(itens)
+
+        self.assertEqual(resultado["ncm"].tolist(), [True, False])
+        self.assertEqual(resultado["cfop"].tolist(), [True, False])
+
+
+
+class TestNormalizarIndice(unittest.TestCase):
+    """Índice de código único, ordenado e do tipo string"""
+
+    def test_codigos_repetidos_mantem_primeira_ocorrencia(self):
+        df = pd.DataFrame({"descricao": ["b", "a", "b2", "c"]},
+                          index=pd.Index(["2", "1", "2", "3"], name="codigo"))
+
+        resultado = GerenciadorTabelasFiscais._normalizar_indice(df)
+
+        self.assertEqual(resultado.index.tolist(), ["1", "2", "3"])
+        self.assertEqual(resultado["descricao"].tolist(), ["a", "b", "c"])
+        self.assertEqual(resultado.index.name, "codigo")
+
+    def test_repeticao_criada_pela_conversao_para_string(self):
+        df = pd.DataFrame({"descricao": ["inteiro", "texto"]},
+                          index=pd.Index([5102, "5102"], dtype=object))
+
+        resultado = GerenciadorTabelasFiscais._normalizar_indice(df)
+
+        self.assertTrue(resultado.index.is_unique)
+        self.assertEqual(resultado.loc["5102", "descricao"], "inteiro")
+
+
+if __name__ == "__main__":
+    unittest.main()
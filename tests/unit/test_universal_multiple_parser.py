@@ -0,0 +1,77 @@
+"""
+FiscalAI MVP - Testes do Parser Universal de Múltiplos XMLs
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils.universal_multiple_parser import UniversalMultipleXMLParser
+
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "data" / "samples"
+
+
+class TestParseFiles(unittest.TestCase):
+    """Parsing em lote com processos"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = UniversalMultipleXMLParser()
+        cls.nfe_xml = (SAMPLES_DIR / "nfe_exemplo.xml").read_text(encoding="utf-8")
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def _nfe(self, nome: str, numero: str) -> Path:
+        caminho = self.dir / nome
+        caminho.write_text(self.nfe_xml.replace("<nNF>12345</nNF>", f"<nNF>{numero}</nNF>"), encoding="utf-8")
+        return caminho
+
+    def test_resultados_na_ordem_dos_caminhos(self):
+        numeros = ["7", "3", "9", "1", "5", "2"]
+        caminhos = [self._nfe(f"nota_{i}.xml", numero) for i, numero in enumerate(numeros)]
+
+        resultados = list(self.parser.parse_files(caminhos, workers=2))
+
+        self.assertEqual(len(resultados), len(numeros))
+        for (nfes, doc_type, _), numero in zip(resultados, numeros):
+            self.assertEqual(doc_type, "nfe")
+            self.assertEqual([nfe.numero for nfe in nfes], [numero])
+
+    def test_arquivo_corrompido_no_meio_do_lote(self):
+        caminhos = [self._nfe("a.xml", "1"), self.dir / "b.xml", self._nfe("c.xml", "3")]
+        caminhos[1].write_text(self.nfe_xml[: len(self.nfe_xml) // 2], encoding="utf-8")
+
+        resultados = list(self.parser.parse_files(caminhos, workers=2))
+
+        self.assertEqual([r[1] for r in resultados], ["nfe", "error", "nfe"])
+        self.assertEqual(resultados[1][0], [])
+        self.assertIn("b.xml", resultados[1][2])
+        self.assertEqual(resultados[2][0][0].numero, "3")
+
+    def test_arquivo_inexistente_modo_unico(self):
+        caminhos = [self._nfe("a.xml", "1"), self.dir / "nao_existe.xml"]
+
+        resultados = list(self.parser.parse_files(caminhos, workers=1, multiple=False))
+
+        self.assertEqual(resultados[0][0].numero, "1")
+        self.assertEqual(resultados[1][:2], (None, "error"))
+
+    def test_parse_directory_ordenado_por_caminho(self):
+        for nome, numero in (("b.xml", "2"), ("a.xml", "1"), ("c.txt", "9")):
+            self._nfe(nome, numero)
+
+        resultados = list(self.parser.parse_directory(str(self.dir), pattern="*.xml", workers=2))
+
+        self.assertEqual([r[0][0].numero for r in resultados], ["1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
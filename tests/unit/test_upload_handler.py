@@ -0,0 +1,135 @@
+"""
+FiscalAI MVP - Testes do Upload Handler
+"""
+
+import unittest
+import sys
+import io
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils import upload_handler
+from src.utils.upload_handler import UploadHandler
+
+
+XML_NFE = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe">\n'
+    b'  <!-- comentario -->\n'
+    b'  <NFe>\n'
+    b'    <infNFe Id="NFe123">\n'
+    b'      <ide><nNF>1</nNF></ide>\n'
+    b'    </infNFe>\n'
+    b'  </NFe>\n'
+    b'</nfeProc>\n'
+)
+
+
+class TestHandleAndOptimize(unittest.TestCase):
+    """Upload de XML grande com otimização em uma única passada"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.st = mock.Mock()
+        for alvo, valor in (("st", self.st), ("OPTIMIZE_MIN_BYTES", 0)):
+            patcher = mock.patch.object(upload_handler, alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.handler = UploadHandler()
+        self.handler.temp_dir = Path(self.tmp.name)
+
+    def _upload(self, conteudo: bytes, nome: str = "nota.xml") -> io.BytesIO:
+        arquivo = io.BytesIO(conteudo)
+        arquivo.name = nome
+        arquivo.size = len(conteudo)
+        return arquivo
+
+    def _arquivos_temporarios(self):
+        return sorted(os.listdir(self.tmp.name))
+
+    def test_xml_valido_gravado_otimizado(self):
+        sucesso, mensagem, caminho = self.handler.handle_and_optimize(self._upload(XML_NFE))
+
+        self.assertTrue(sucesso, mensagem)
+        conteudo = Path(caminho).read_bytes()
+        self.assertNotIn(b"comentario", conteudo)
+        self.assertIn(b"<nNF>1</nNF>", conteudo)
+        self.assertNotIn(b"\n  ", conteudo)
+        self.st.progress.assert_called_with(0)
+
+    def test_xml_malformado_otimizado_como_texto(self):
+        sucesso, _, caminho = self.handler.handle_and_optimize(self._upload(XML_NFE + b"<sem_fechamento>"))
+
+        self.assertTrue(sucesso)
+        conteudo = Path(caminho).read_bytes()
+        self.assertNotIn(b"comentario", conteudo)
+        self.assertTrue(conteudo.endswith(b"<sem_fechamento>"))
+
+    def test_falha_na_otimizacao_grava_original(self):
+        with mock.patch.object(UploadHandler, "_write_optimized_upload", side_effect=RuntimeError("falha")):
+            sucesso, mensagem, caminho = self.handler.handle_and_optimize(self._upload(XML_NFE))
+
+        self.assertTrue(sucesso)
+        self.assertIn("sem otimização", mensagem)
+        self.assertEqual(Path(caminho).read_bytes(), XML_NFE)
+        self.assertEqual(self._arquivos_temporarios(), [os.path.basename(caminho)])
+
+    def test_falha_total_remove_temporario(self):
+        with mock.patch.object(UploadHandler, "_write_optimized_upload", side_effect=RuntimeError("falha")), \
+                mock.patch.object(UploadHandler, "_copy_upload", side_effect=OSError("disco cheio")):
+            sucesso, mensagem, caminho = self.handler.handle_and_optimize(self._upload(XML_NFE))
+
+        self.assertFalse(sucesso)
+        self.assertIsNone(caminho)
+        self.assertIn("disco cheio", mensagem)
+        self.assertEqual(self._arquivos_temporarios(), [])
+
+
+
+class TestStreamOptimizedXML(unittest.TestCase):
+    """Reescrita em streaming preserva todo o conteúdo além de espaços e comentários"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.handler = UploadHandler()
+        self.destino = os.path.join(self.tmp.name, "otimizado.xml")
+
+    def _otimizar(self, conteudo: bytes) -> bytes:
+        self.handler._stream_optimized_xml(io.BytesIO(conteudo), self.destino)
+        return Path(self.destino).read_bytes()
+
+    def test_texto_misto_da_raiz_preservado(self):
+        resultado = self._otimizar(b'<r a="1">lead<a>t</a>meio<b/>fim\n</r>')
+        self.assertTrue(resultado.endswith(b'<r a="1">lead<a>t</a>meio<b/>fim\n</r>'), resultado)
+
+    def test_raiz_somente_com_texto(self):
+        self.assertTrue(self._otimizar(b"<r>so texto</r>").endswith(b"<r>so texto</r>"))
+
+    def test_doctype_e_instrucoes_fora_da_raiz_preservados(self):
+        resultado = self._otimizar(
+            b'<?xml version="1.0"?>\n<!DOCTYPE r SYSTEM "r.dtd">\n<?antes a?>\n<!-- c -->\n'
+            b'<r>\n  <a>1</a>\n</r>\n<?depois z?>\n'
+        )
+        self.assertIn(b'<!DOCTYPE r SYSTEM "r.dtd">', resultado)
+        self.assertLess(resultado.index(b"<?antes a?>"), resultado.index(b"<r>"))
+        self.assertGreater(resultado.index(b"<?depois z?>"), resultado.index(b"</r>"))
+        self.assertIn(b"<r><a>1</a></r>", resultado)
+        self.assertNotIn(b"<!--", resultado)
+
+    def test_dtd_interno_otimizado_como_texto(self):
+        with self.assertRaises(upload_handler._XMLNotStreamable):
+            self._otimizar(b'<!DOCTYPE r [<!ENTITY e "x">]><r>&e;</r>')
+        self.assertFalse(os.path.exists(self.destino))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+FiscalAI MVP - Testes do Dataset de Validação
+"""
+
+import unittest
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.models import ResultadoAnalise, NivelRisco
+from src.utils.validation_dataset import ValidationDataset, iter_jsonl, _sample_metric_counts
+from src.utils.xml_parser import parse_nfe_xml
+
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "data" / "samples"
+
+
+class TestMigracaoLegado(unittest.TestCase):
+    """Conversão dos datasets .json legados para JSONL"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def test_migra_array_json_para_jsonl(self):
+        registros = [{"nfe_id": "1", "descricao": "Açúcar"}, {"nfe_id": "2"}]
+        (self.dir / "nfe_samples.json").write_text(json.dumps(registros), encoding="utf-8")
+
+        dataset = ValidationDataset(str(self.dir))
+
+        self.assertEqual(list(iter_jsonl(dataset.nfe_samples_file)), registros)
+        self.assertFalse((self.dir / "nfe_samples.json").exists())
+        self.assertEqual(list(self.dir.glob("*.tmp")), [])
+
+    def test_legado_corrompido_nao_impede_inicializacao(self):
+        legado = self.dir / "nfe_samples.json"
+        legado.write_text('[{"nfe_id": "1"', encoding="utf-8")
+
+        with self.assertLogs("src.utils.validation_dataset", level="ERROR"):
+            dataset = ValidationDataset(str(self.dir))
+
+        self.assertTrue(legado.exists())
+        self.assertEqual(list(iter_jsonl(dataset.nfe_samples_file)), [])
+
+
+def _amostra(esperados, preditos, fraudes_esperadas, fraudes_detectadas, tempo):
+    """Registro no formato gravado em nfe_samples.jsonl"""
+    return {
+        "expected_classifications": esperados,
+        "actual_classifications": {
+            item: {"ncm_predito": ncm} for item, ncm in preditos.items()
+        },
+        "expected_frauds": [{"tipo": "x"}] * fraudes_esperadas,
+        "actual_result": {"fraudes_detectadas": fraudes_detectadas},
+        "processing_time": tempo
+    }
+
+
+class TestMetricasAcuracia(unittest.TestCase):
+    """Recontagem a partir do JSONL e atualização incremental usam a mesma regra"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dataset = ValidationDataset(self.tmp.name)
+        self.amostras = [
+            _amostra({"1": "84713012", "2": "40111000"}, {"1": "84713012", "2": "99999999"}, 2, 1, 1.5),
+            _amostra({"1": "12345678"}, {"1": "12345678", "3": "00000000"}, 0, 3, 0.5),
+            _amostra({"1": "8471"}, {}, 1, 0, 2.0),
+        ]
+
+    def test_recontagem_igual_a_soma_por_amostra(self):
+        self.dataset._append_many(self.dataset.nfe_samples_file, self.amostras)
+
+        estado = self.dataset._rebuild_metrics_state(self.dataset._samples_key())
+
+        for nome in ("ncm_correct", "ncm_total", "fraud_detected", "fraud_expected", "pt_sum", "pt_count"):
+            esperado = sum(_sample_metric_counts(amostra)[nome] for amostra in self.amostras)
+            self.assertEqual(estado[nome], esperado, nome)
+        self.assertEqual((estado["ncm_correct"], estado["ncm_total"], estado["fraud_detected"]), (2, 3, 1))
+
+    def test_incremental_igual_a_recontagem(self):
+        self.dataset._append_many(self.dataset.nfe_samples_file, self.amostras[:1])
+        self.dataset.calculate_accuracy_metrics()
+
+        chave = self.dataset._samples_key()
+        self.dataset._append_many(self.dataset.nfe_samples_file, self.amostras[1:])
+        self.dataset._update_metrics_state(chave, self.amostras[1:])
+        incremental = self.dataset.calculate_accuracy_metrics()
+
+        self.dataset.metrics_state_file.unlink()
+        self.dataset.metrics_snapshot_file.unlink(missing_ok=True)
+        self.dataset._metrics_state = None
+        self.assertEqual(self.dataset.calculate_accuracy_metrics(), incremental)
+
+
+
+class TestFlushBatch(unittest.TestCase):
+    """flush_batch grava o mesmo que chamadas sucessivas de add_nfe_sample"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nfe = parse_nfe_xml(str(SAMPLES_DIR / "nfe_exemplo.xml"))
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _amostras(self):
+        resultado = ResultadoAnalise(
+            chave_acesso=self.nfe.chave_acesso,
+            score_risco_geral=40.0,
+            nivel_risco=NivelRisco.MEDIO
+        )
+        return [
+            {"nfe": self.nfe, "expected_classifications": {1: "84713012"},
+             "expected_frauds": [], "processing_time": 1.0},
+            {"nfe": self.nfe, "expected_classifications": {}, "expected_frauds": [{"tipo": "x"}],
+             "processing_time": 2.0, "actual_result": resultado},
+            {"nfe": self.nfe, "expected_classifications": {}, "expected_frauds": [],
+             "processing_time": 0.5},
+        ]
+
+    @staticmethod
+    def _sem_timestamp(caminho):
+        return [{k: v for k, v in registro.items() if k != "timestamp"} for registro in iter_jsonl(caminho)]
+
+    def test_lote_igual_a_amostras_individuais(self):
+        individual = ValidationDataset(str(Path(self.tmp.name) / "individual"))
+        for amostra in self._amostras():
+            individual.add_nfe_sample(**amostra)
+
+        lote = ValidationDataset(str(Path(self.tmp.name) / "lote"))
+        lote.flush_batch(self._amostras())
+
+        for arquivo in ("nfe_samples_file", "performance_metrics_file"):
+            with self.subTest(arquivo=arquivo):
+                self.assertEqual(self._sem_timestamp(getattr(lote, arquivo)),
+                                 self._sem_timestamp(getattr(individual, arquivo)))
+        self.assertEqual(len(list(iter_jsonl(lote.nfe_samples_file))), 3)
+        self.assertEqual(len(list(iter_jsonl(lote.performance_metrics_file))), 1)
+        self.assertEqual(lote.calculate_accuracy_metrics(), individual.calculate_accuracy_metrics())
+
+    def test_lote_vazio_nao_grava(self):
+        dataset = ValidationDataset(self.tmp.name)
+        dataset.flush_batch([])
+
+        self.assertEqual(dataset.nfe_samples_file.stat().st_size, 0)
+        self.assertEqual(dataset.performance_metrics_file.stat().st_size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+FiscalAI MVP - Testes do Parser de XML de NF-e
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils.xml_parser import parse_nfe_xml, parse_nfe_xml_batch
+
+
+SAMPLES_DIR = Path(__file__).parent.parent.parent / "data" / "samples"
+
+
+class TestParseNFeXMLBatch(unittest.TestCase):
+    """Parsing em lote com processos"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nfe_xml = (SAMPLES_DIR / "nfe_exemplo.xml").read_text(encoding="utf-8")
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def _nfe(self, nome: str, numero: str) -> Path:
+        caminho = self.dir / nome
+        caminho.write_text(self.nfe_xml.replace("<nNF>12345</nNF>", f"<nNF>{numero}</nNF>"), encoding="utf-8")
+        return caminho
+
+    def test_resultados_na_ordem_dos_caminhos(self):
+        numeros = ["7", "3", "9", "1", "5"]
+        caminhos = [self._nfe(f"nota_{i}.xml", numero) for i, numero in enumerate(numeros)]
+
+        nfes = parse_nfe_xml_batch(caminhos, max_workers=2)
+
+        self.assertEqual([nfe.numero for nfe in nfes], numeros)
+        sequencial = parse_nfe_xml(str(caminhos[0]))
+        self.assertEqual(nfes[0].model_dump(exclude={"data_processamento"}),
+                         sequencial.model_dump(exclude={"data_processamento"}))
+
+    def test_lote_vazio(self):
+        self.assertEqual(parse_nfe_xml_batch([]), [])
+
+    def test_arquivo_invalido_interrompe_lote(self):
+        caminhos = [self._nfe("a.xml", "1"), self.dir / "b.xml"]
+        caminhos[1].write_text("<nfeProc>", encoding="utf-8")
+
+        with self.assertRaises(ValueError):
+            parse_nfe_xml_batch(caminhos, max_workers=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
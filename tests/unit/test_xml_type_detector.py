@@ -0,0 +1,80 @@
+"""
+FiscalAI MVP - Testes do Detector de Tipo de XML
+"""
+
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar src ao path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.utils.xml_type_detector import XMLTypeDetector
+
+
+NS_NFE = "http://www.portalfiscal.inf.br/nfe"
+NS_CTE = "http://www.portalfiscal.inf.br/cte"
+NS_MDFE = "http://www.portalfiscal.inf.br/mdfe"
+
+
+class TestXMLTypeDetector(unittest.TestCase):
+    """Detecção por elemento raiz, namespace e conteúdo"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.detector = XMLTypeDetector()
+
+    def _arquivo(self, conteudo: str) -> str:
+        caminho = Path(self.tmp.name) / "doc.xml"
+        caminho.write_text(conteudo, encoding="utf-8")
+        return str(caminho)
+
+    def test_metadados_em_cache_nao_sao_compartilhados(self):
+        caminho = self._arquivo(f'<nfeProc xmlns="{NS_NFE}"><NFe/></nfeProc>')
+
+        _, _, metadados = self.detector.detect_type(caminho)
+        metadados["root_elements"].append("alterado")
+        metadados["extra"] = True
+
+        tipo, _, novamente = self.detector.detect_type(caminho)
+        self.assertEqual(tipo, "nfe")
+        self.assertEqual(novamente["root_elements"], ["nfeProc", "NFe", "infNFe"])
+        self.assertNotIn("extra", novamente)
+        self.assertEqual(self.detector.supported_types["nfe"]["root_elements"][-1], "infNFe")
+
+    def test_tabela_de_tipos_imutavel(self):
+        tipos = XMLTypeDetector.supported_types
+        with self.assertRaises(TypeError):
+            tipos["nfe"] = {}
+        with self.assertRaises(TypeError):
+            tipos["nfe"]["description"] = "outro"
+        with self.assertRaises(AttributeError):
+            tipos["nfe"]["root_elements"].append("outro")
+
+        tipo, descricao, metadados = self.detector.detect_type_string(f'<NFe xmlns="{NS_NFE}"/>')
+        self.assertEqual((tipo, descricao), ("nfe", "Nota Fiscal Eletrônica (NF-e)"))
+        self.assertEqual(metadados, {"root_elements": ["nfeProc", "NFe", "infNFe"], "namespaces": [NS_NFE]})
+
+    def test_prioridade_entre_namespaces_com_raiz_desconhecida(self):
+        xml = (
+            f'<lote><cte:CTe xmlns:cte="{NS_CTE}"/><mdfe:MDFe xmlns:mdfe="{NS_MDFE}"/>'
+            f'<nfe:NFe xmlns:nfe="{NS_NFE}"/></lote>'
+        )
+        self.assertEqual(self.detector.detect_type_string(xml)[0], "nfe")
+
+        xml = f'<lote><mdfe:MDFe xmlns:mdfe="{NS_MDFE}"/><cte:CTe xmlns:cte="{NS_CTE}"/></lote>'
+        self.assertEqual(self.detector.detect_type_string(xml)[0], "cte")
+
+    def test_raiz_conhecida_prevalece(self):
+        xml = f'<cteProc xmlns="{NS_CTE}"><nfe:infNFe xmlns:nfe="{NS_NFE}"/></cteProc>'
+        self.assertEqual(self.detector.detect_type_string(xml)[0], "cte")
+
+    def test_marcador_de_conteudo_sem_namespace(self):
+        self.assertEqual(self.detector.detect_type_string("<envio><infCte/></envio>")[0], "cte")
+        self.assertEqual(self.detector.detect_type_string("<envio><outro/></envio>")[0], "unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1254,10 +1254,10 @@ def analisar_nfe(xml_path: str):
             smart_parser = SmartFiscalParser()
             smart_data = smart_parser.parse_document(xml_path)
             
-            nfe = smart_data['nfe']
-            doc_type = smart_data['document_type']
-            doc_description = smart_data['document_description']
-            metadata = smart_data['metadata']
+            nfe = smart_data.nfe
+            doc_type = smart_data.document_type
+            doc_description = smart_data.document_description
+            metadata = smart_data.metadata
         
         # Mostrar informações inteligentes do documento
         col1, col2, col3 = st.columns(3)
@@ -1266,18 +1266,18 @@ def analisar_nfe(xml_path: str):
             st.info(f"📋 **Tipo:** {doc_description}")
         
         with col2:
-            st.success(f"🏢 **Emitente:** {metadata['participants']['emitente_type'].upper()}")
+            st.success(f"🏢 **Emitente:** {metadata.participants.emitente_type.upper()}")
         
         with col3:
-            st.success(f"👤 **Destinatário:** {metadata['participants']['destinatario_type'].upper()}")
+            st.success(f"👤 **Destinatário:** {metadata.participants.destinatario_type.upper()}")
         
         # Mostrar resumo inteligente
-        st.info(f"💡 **Resumo:** {metadata['document_summary']}")
+        st.info(f"💡 **Resumo:** {metadata.document_summary}")
         
         # Mostrar indicadores de qualidade
-        quality_score = metadata['quality_indicators']['data_quality_score']
-        compliance_score = metadata['quality_indicators']['compliance_score']
-        risk_score = metadata['quality_indicators']['risk_score']
+        quality_score = metadata.quality_indicators.data_quality_score
+        compliance_score = metadata.quality_indicators.compliance_score
+        risk_score = metadata.quality_indicators.risk_score
         
         col1, col2, col3 = st.columns(3)
         
@@ -2267,7 +2267,7 @@ def pagina_dashboard():
     # Mostrar dados inteligentes se disponíveis
     if st.session_state.get('smart_data'):
         smart_data = st.session_state.smart_data
-        metadata = smart_data['metadata']
+        metadata = smart_data.metadata
         
         st.markdown("---")
         st.subheader("🧠 Análise Inteligente do Documento")
@@ -2277,22 +2277,22 @@ def pagina_dashboard():
         
         with col1:
             st.markdown("**📋 Informações do Documento**")
-            st.write(f"**Tipo:** {metadata['fiscal_category'].upper()}")
-            st.write(f"**Categoria:** {metadata['transaction_type'].title()}")
-            st.write(f"**Resumo:** {metadata['document_summary']}")
+            st.write(f"**Tipo:** {metadata.fiscal_category.upper()}")
+            st.write(f"**Categoria:** {metadata.transaction_type.title()}")
+            st.write(f"**Resumo:** {metadata.document_summary}")
         
         with col2:
             st.markdown("**👥 Participantes**")
-            st.write(f"**Emitente:** {metadata['participants']['emitente_type'].upper()}")
-            st.write(f"**Destinatário:** {metadata['participants']['destinatario_type'].upper()}")
-            st.write(f"**Tipo de Transação:** {'B2B' if metadata['participants']['is_b2b'] else 'B2C' if metadata['participants']['is_b2c'] else 'Outro'}")
+            st.write(f"**Emitente:** {metadata.participants.emitente_type.upper()}")
+            st.write(f"**Destinatário:** {metadata.participants.destinatario_type.upper()}")
+            st.write(f"**Tipo de Transação:** {'B2B' if metadata.participants.is_b2b else 'B2C' if metadata.participants.is_b2c else 'Outro'}")
         
         # Indicadores de qualidade
         st.markdown("**📈 Indicadores de Qualidade**")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            quality_score = metadata['quality_indicators']['data_quality_score']
+            quality_score = metadata.quality_indicators.data_quality_score
             if quality_score >= 80:
                 st.success(f"✅ **Qualidade dos Dados:** {quality_score}%")
             elif quality_score >= 60:
@@ -2301,7 +2301,7 @@ def pagina_dashboard():
                 st.error(f"❌ **Qualidade dos Dados:** {quality_score}%")
     
         with col2:
-            compliance_score = metadata['quality_indicators']['compliance_score']
+            compliance_score = metadata.quality_indicators.compliance_score
             if compliance_score >= 70:
                 st.success(f"✅ **Conformidade:** {compliance_score}%")
             elif compliance_score >= 50:
@@ -2310,7 +2310,7 @@ def pagina_dashboard():
                 st.error(f"❌ **Conformidade:** {compliance_score}%")
         
         with col3:
-            risk_score = metadata['quality_indicators']['risk_score']
+            risk_score = metadata.quality_indicators.risk_score
             if risk_score <= 30:
                 st.success(f"✅ **Score de Risco:** {risk_score}%")
             elif risk_score <= 60:
@@ -2319,12 +2319,12 @@ def pagina_dashboard():
                 st.error(f"❌ **Score de Risco:** {risk_score}%")
         
         # Flags de processamento
-        flags = metadata['processing_flags']
-        if flags['requires_attention']:
+        flags = metadata.processing_flags
+        if flags.requires_attention:
             st.warning("⚠️ **Atenção:** Este documento requer análise adicional")
-        if flags['high_quality']:
+        if flags.high_quality:
             st.success("✅ **Alta Qualidade:** Dados bem estruturados")
-        if flags['compliant']:
+        if flags.compliant:
             st.success("✅ **Conforme:** Documento atende aos padrões")
         
         st.markdown("---")